@@ -1,16 +1,15 @@
 """Activity monitor - tracks app, website, file in use. Linux (X11) and macOS supported."""
 
 import platform
+import threading
 import time
 from dataclasses import dataclass, field
 from typing import Callable, Optional
 
-from .linux import get_active_window_x11, infer_context_type as infer_context_type_linux
-from .macos import (
-    get_active_window_macos,
-    get_reading_section_macos,
-    infer_context_type as infer_context_type_macos,
-)
+from .classifier import classify_context
+from .linux import get_active_window_x11
+from .normalize import normalize
+from .macos import get_reading_section_macos, probe_front_window_macos
 
 __all__ = ["ActivityMonitor", "ActivityContext"]
 
@@ -21,10 +20,11 @@ class ActivityContext:
 
     app_name: str
     window_title: str
-    context_type: str  # "app" | "website" | "file" | "browser" | "terminal"
+    context_type: str  # "app" | "website" | "file" | "browser" | "terminal" | rule types (activity/classifier.py)
     context_id: str
     detected_at: float = field(default_factory=time.time)
     reading_section: Optional[str] = None  # Section/region user is reading (selected text, URL, etc.)
+    page_number: Optional[int] = None  # PDF page from the title ("Page N of M") or viewer URL (#page=N)
 
     @property
     def display_name(self) -> str:
@@ -46,6 +46,8 @@ class ActivityContext:
         }
         if self.reading_section is not None:
             d["reading_section"] = self.reading_section
+        if self.page_number is not None:
+            d["page_number"] = self.page_number
         return d
 
 
@@ -53,6 +55,11 @@ class ActivityMonitor:
     """
     Monitors what the user is currently doing (app, website, file).
     Polls periodically and detects context changes.
+
+    Pull mode: call get_current_activity() (runs detection every call).
+    Push mode: start() runs one sampler thread; readers use peek() (cached,
+    no detection) and subscribe() receives every sample, so all consumers in
+    a tick see the same context.
     """
 
     def __init__(self, poll_interval: float = 2.0):
@@ -61,6 +68,10 @@ class ActivityMonitor:
         self._on_change_callbacks: list[
             Callable[[ActivityContext, Optional[ActivityContext]], None]
         ] = []
+        self._subscribers: list[Callable[[ActivityContext], None]] = []
+        self._latest: Optional[ActivityContext] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
 
     def on_context_change(
         self, callback: Callable[[ActivityContext, Optional[ActivityContext]], None]
@@ -68,32 +79,81 @@ class ActivityMonitor:
         """Register callback for when user switches context."""
         self._on_change_callbacks.append(callback)
 
+    def subscribe(self, callback: Callable[[ActivityContext], None]):
+        """Register callback for every sample taken by the sampler thread."""
+        self._subscribers.append(callback)
+
+    def start(self) -> None:
+        """Start the shared sampler thread (push mode). Idempotent."""
+        if self._sampler is not None:
+            return
+        self._stop_event = threading.Event()  # per thread: a sampler still winding down keeps its own
+        self._sampler = threading.Thread(target=self._sample_loop, args=(self._stop_event,),
+                                         name="ActivitySampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the sampler thread and wait for it; start() may be called again afterwards."""
+        sampler = self._sampler
+        if sampler is None:
+            return
+        self._stop_event.set()
+        if sampler is not threading.current_thread():  # stop() from a subscriber: don't join itself
+            sampler.join(timeout)
+        self._sampler = None
+
+    def peek(self) -> Optional[ActivityContext]:
+        """
+        Latest sampled context without running detection; ctx.detected_at is the sample time.
+        Without start() this falls back to get_current_activity().
+        """
+        if self._sampler is None:
+            return self.get_current_activity()
+        return self._latest
+
+    def _sample_loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            ctx = self.get_current_activity()
+            if ctx is not None:
+                self._latest = ctx
+                for cb in self._subscribers:
+                    try:
+                        cb(ctx)
+                    except Exception:
+                        pass
+            stop.wait(self.poll_interval)
+
     def get_current_activity(self) -> Optional[ActivityContext]:
         """Get the current activity context. Returns None if detection fails."""
         system = platform.system()
+        probe = None
         if system == "Linux":
             winfo = get_active_window_x11()
-            infer_context_type = infer_context_type_linux
         elif system == "Darwin":
-            winfo = get_active_window_macos()
-            infer_context_type = infer_context_type_macos
+            # One osascript round trip for window + URL + selection + focused value
+            probe = probe_front_window_macos()
+            winfo = probe.window if probe else None
         else:
             return self._last_context
 
         if not winfo:
             return self._last_context
 
-        context_type = infer_context_type(winfo.app_name, winfo.window_title)
+        url = probe.url if probe is not None else None
+        context_type = classify_context(winfo.app_name, winfo.window_title, url)
         reading_section = None
-        if system == "Darwin":
-            reading_section = get_reading_section_macos(winfo.app_name, winfo.window_title)
+        if probe is not None:
+            reading_section = get_reading_section_macos(winfo.app_name, winfo.window_title, probe=probe)
 
+        # Stable id: badges/spinners/clocks stripped, URL canonicalized, PDF page kept out of it
+        norm = normalize(winfo.app_name, winfo.window_title, url)
         ctx = ActivityContext(
             app_name=winfo.app_name,
-            window_title=winfo.window_title,
+            window_title=norm.title,
             context_type=context_type,
-            context_id=winfo.context_id,
-            reading_section=reading_section,
+            context_id=norm.context_id,
+            reading_section=reading_section or norm.page_label,
+            page_number=norm.page_number,
         )
 
         # Check for change
@@ -0,0 +1,258 @@
+"""Context type classification from a rule table (app name, window title, URL domain).
+
+One shared classifier replaces the per-platform substring lists. Rules are checked in order and
+the first match wins; a rule matches when every field it sets matches (any pattern within a field):
+- apps:    case-insensitive regexes searched in the app name ("chrome", "visual studio code")
+- titles:  case-insensitive regexes searched in the window title ("lecture \\d+", "CS\\s?224N")
+- domains: URL host suffixes, optionally with a path prefix ("arxiv.org", "youtube.com/watch");
+           "*" matches any http(s) URL
+
+User rules come first, from a TOML or YAML file named by ACTIVITY_CONTEXT_RULES:
+
+  [[rules]]
+  type = "lecture"
+  titles = ["CS\\s?224N", "lecture \\d+"]
+
+  [[rules]]
+  type = "paper"
+  domains = ["arxiv.org", "openreview.net"]
+
+All title patterns are also compiled into one alternation, so a title that matches none of them
+skips every title rule in one search. Patterns that can't share an alternation (inline global
+flags like "(?i)...", capture groups a backreference could point at) are searched on their own.
+Results are memoized per (app_name, title, url).
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+CONTEXT_RULES = os.environ.get("ACTIVITY_CONTEXT_RULES", "").strip()  # path to a .toml/.yaml rule file
+DEFAULT_TYPE = "app"
+CACHE_SIZE = 4096
+
+_BROWSERS = ("safari", "chrome", "firefox", "brave", "edge", "opera")
+
+
+@dataclass(frozen=True, slots=True)
+class ContextRule:
+    context_type: str
+    apps: tuple = ()
+    titles: tuple = ()
+    domains: tuple = ()
+
+
+# Built-in rules, after any user rules. The browser/file/terminal ones are the original
+# infer_context_type behaviour; the domain ones only apply when the URL is known (macOS probe).
+DEFAULT_RULES = (
+    ContextRule("paper", domains=("arxiv.org", "openreview.net", "dl.acm.org", "ieeexplore.ieee.org",
+                                  "semanticscholar.org", "biorxiv.org", "pubmed.ncbi.nlm.nih.gov", "aclanthology.org")),
+    ContextRule("video", domains=("youtube.com/watch", "youtu.be", "vimeo.com")),
+    ContextRule("lecture", domains=("coursera.org/learn", "edx.org", "instructure.com", "panopto.com")),
+    ContextRule("docs", domains=("docs.python.org", "developer.mozilla.org", "readthedocs.io", "learn.microsoft.com",
+                                 "pytorch.org/docs", "numpy.org/doc")),
+    ContextRule("website", apps=_BROWSERS, titles=("http", r"www\.", r"\.com")),
+    ContextRule("website", apps=_BROWSERS, domains=("*",)),
+    ContextRule("browser", apps=_BROWSERS),
+    ContextRule("file", apps=("cursor", "visual studio code", "code", "vim", "sublime")),
+    ContextRule("terminal", apps=("terminal", "iterm")),
+)
+
+
+def _combinable(pattern: str) -> bool:
+    """Safe inside an alternation: no global inline flags, no groups that backreferences count."""
+    try:
+        return re.compile(f"(?:{pattern})").groups == 0
+    except re.error:
+        return False
+
+
+class _AnyOf:
+    """Patterns searched one by one, for sets that can't be joined into one alternation."""
+
+    __slots__ = ("patterns",)
+
+    def __init__(self, patterns: tuple):
+        self.patterns = tuple(re.compile(p, re.IGNORECASE) for p in patterns)
+
+    def search(self, text: str) -> Optional[re.Match]:
+        for pattern in self.patterns:
+            m = pattern.search(text)
+            if m is not None:
+                return m
+        return None
+
+
+def _any(patterns: tuple):
+    if not patterns:
+        return None
+    if not all(_combinable(p) for p in patterns):
+        return _AnyOf(patterns)
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+def _host_path(url: Optional[str]) -> tuple[Optional[str], str]:
+    if not url:
+        return None, ""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None, ""
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None, ""
+    host = parts.hostname.lower()
+    return (host[4:] if host.startswith("www.") else host), parts.path or "/"
+
+
+class ContextClassifier:
+    """Compiled rule table. classify(app_name, window_title, url=None) -> context type."""
+
+    def __init__(self, rules: Iterable[ContextRule], default: str = DEFAULT_TYPE, cache_size: int = CACHE_SIZE):
+        self.rules = tuple(rules)
+        self.default = default
+        self._app_res = [_any(r.apps) for r in self.rules]
+        self._title_res = [_any(r.titles) for r in self.rules]
+        # Prefilter over the combinable title patterns; rules with any other pattern skip it
+        self._title_any = _any(tuple(p for r in self.rules for p in r.titles if _combinable(p)))
+        self._title_unfiltered = frozenset(i for i, r in enumerate(self.rules)
+                                           if any(not _combinable(p) for p in r.titles))
+        # host suffix -> [(rule index, path prefix)]
+        self._domains: dict[str, list[tuple[int, str]]] = {}
+        self._any_domain: frozenset = frozenset(i for i, r in enumerate(self.rules) if "*" in r.domains)
+        for i, rule in enumerate(self.rules):
+            for d in rule.domains:
+                if d == "*":
+                    continue
+                host, _, path = d.lower().partition("/")
+                self._domains.setdefault(host[4:] if host.startswith("www.") else host, []).append((i, "/" + path if path else ""))
+        self._app_lock = threading.Lock()
+        self._app_cache: dict[str, frozenset] = {}
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _apps_matching(self, app_name: str) -> frozenset:
+        """Indices of rules whose app patterns match (few distinct apps: cached for good)."""
+        hit = self._app_cache.get(app_name)
+        if hit is None:
+            hit = frozenset(i for i, r in enumerate(self._app_res) if r is not None and r.search(app_name))
+            with self._app_lock:
+                self._app_cache[app_name] = hit
+        return hit
+
+    def _domains_matching(self, url: Optional[str]) -> frozenset:
+        host, path = _host_path(url)
+        if host is None:
+            return frozenset()
+        hits = set(self._any_domain)
+        labels = host.split(".")
+        for k in range(len(labels) - 1):  # "a.b.example.com" -> a.b.example.com, b.example.com, example.com
+            for i, prefix in self._domains.get(".".join(labels[k:]), ()):
+                if not prefix or path.startswith(prefix):
+                    hits.add(i)
+        return frozenset(hits)
+
+    def _classify(self, app_name: str, window_title: str, url: Optional[str] = None) -> str:
+        app_name = app_name or ""
+        window_title = window_title or ""
+        apps = self._apps_matching(app_name)
+        domains = self._domains_matching(url)
+        any_title = self._title_any is not None and self._title_any.search(window_title) is not None
+        for i, rule in enumerate(self.rules):
+            if rule.apps and i not in apps:
+                continue
+            if rule.domains and i not in domains:
+                continue
+            if rule.titles:
+                if not (any_title or i in self._title_unfiltered) or not self._title_res[i].search(window_title):
+                    continue
+            return rule.context_type
+        return self.default
+
+    def cache_info(self):
+        return self.classify.cache_info()
+
+
+def _as_tuple(value) -> tuple:
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(str(v) for v in value)
+
+
+def parse_rules(data) -> list[ContextRule]:
+    """Rules from a parsed file: {"rules": [{"type": ..., "apps"/"titles"/"domains": [...]}, ...]} or a bare list."""
+    entries = data.get("rules", []) if isinstance(data, dict) else data or []
+    rules = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("type"):
+            raise ValueError(f"context rule needs a 'type': {entry!r}")
+        rule = ContextRule(
+            str(entry["type"]),
+            apps=_as_tuple(entry.get("apps")),
+            titles=_as_tuple(entry.get("titles")),
+            domains=_as_tuple(entry.get("domains")),
+        )
+        if not (rule.apps or rule.titles or rule.domains):
+            raise ValueError(f"context rule {rule.context_type!r} has no apps/titles/domains")
+        for pattern in rule.apps + rule.titles:
+            re.compile(pattern)  # fail at load time, not on the first poll
+        rules.append(rule)
+    return rules
+
+
+def load_rules(path) -> list[ContextRule]:
+    """Rules from a .toml or .yaml/.yml file."""
+    path = Path(path)
+    if path.suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise RuntimeError("pip install pyyaml")
+        return parse_rules(yaml.safe_load(path.read_text()))
+    if tomllib is None:
+        raise RuntimeError("TOML rules need Python 3.11+ (tomllib); use a .yaml file")
+    with open(path, "rb") as f:
+        return parse_rules(tomllib.load(f))
+
+
+_default: Optional[ContextClassifier] = None
+_default_lock = threading.Lock()
+
+
+def default_classifier() -> ContextClassifier:
+    """Classifier with ACTIVITY_CONTEXT_RULES (if set) ahead of DEFAULT_RULES. Built on first use."""
+    global _default
+    if _default is not None:
+        return _default
+    with _default_lock:
+        if _default is None:
+            classifier = None
+            if CONTEXT_RULES:
+                try:
+                    classifier = ContextClassifier(load_rules(CONTEXT_RULES) + list(DEFAULT_RULES))
+                except (OSError, ValueError, RuntimeError, re.error) as e:
+                    print(f"  Context rules {CONTEXT_RULES} not loaded: {e}")
+            _default = classifier if classifier is not None else ContextClassifier(DEFAULT_RULES)
+        return _default
+
+
+def classify_context(app_name: str, window_title: str, url: Optional[str] = None) -> str:
+    return default_classifier().classify(app_name, window_title, url)
+
+
+def infer_context_type(app_name: str, window_title: str) -> str:
+    """Context type from app and title only (no URL)."""
+    return default_classifier().classify(app_name, window_title, None)
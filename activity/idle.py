@@ -0,0 +1,119 @@
+"""User idle time: seconds since the last keyboard/mouse input.
+
+An idle source is any callable returning idle seconds (or None when unknown), so tests and
+other platforms can plug in their own. get_idle_source() picks one for this machine:
+- Linux: X11 MIT-SCREEN-SAVER extension over its own python-xlib connection (no fork)
+- macOS: CGEventSourceSecondsSinceLastEventType (pyobjc Quartz, no fork), else HIDIdleTime
+  from `ioreg -c IOHIDSystem`, re-read at most every MACOS_IDLE_CACHE_SEC
+Set ACTIVITY_IDLE_SOURCE=none to disable idle detection.
+"""
+
+import os
+import platform
+import re
+import subprocess
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+    from Xlib import display as xdisplay, error as xerror
+except ImportError:
+    xdisplay = None
+
+try:
+    from Quartz import (CGEventSourceSecondsSinceLastEventType, kCGAnyInputEventType,
+                        kCGEventSourceStateCombinedSessionState)
+except ImportError:
+    CGEventSourceSecondsSinceLastEventType = None
+
+IdleSource = Callable[[], Optional[float]]
+
+IDLE_SOURCE = os.environ.get("ACTIVITY_IDLE_SOURCE", "auto").lower()  # auto | none
+
+# The tracker asks on every activity sample (~1 Hz); the ioreg fallback forks once per this many
+# seconds instead. Idle thresholds are ~60 s, so a reading this old only delays going idle slightly.
+MACOS_IDLE_CACHE_SEC = 5.0
+
+_HID_IDLE_RE = re.compile(r'"HIDIdleTime"\s*=\s*(\d+)')
+
+
+class X11IdleSource:
+    """Idle seconds from the X screensaver extension. Raises RuntimeError if unavailable."""
+
+    def __init__(self, display_name: Optional[str] = None):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib not installed")
+        self._display = xdisplay.Display(display_name)
+        if not self._display.has_extension("MIT-SCREEN-SAVER"):
+            self._display.close()
+            raise RuntimeError("X server has no MIT-SCREEN-SAVER extension")
+        self._root = self._display.screen().root
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Optional[float]:
+        with self._lock:
+            try:
+                return self._root.screensaver_query_info().idle / 1000.0
+            except (xerror.XError, xerror.ConnectionClosedError):
+                return None
+
+
+class CachedIdleSource:
+    """Wraps a costly idle source: re-reads it at most every max_age seconds, else the last reading."""
+
+    def __init__(self, source: IdleSource, max_age: float = MACOS_IDLE_CACHE_SEC,
+                 clock: Callable[[], float] = time.monotonic):
+        self._source = source
+        self.max_age = max_age
+        self._clock = clock
+        self._value: Optional[float] = None
+        self._read_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Optional[float]:
+        with self._lock:
+            now = self._clock()
+            if self._read_at is None or now - self._read_at >= self.max_age:
+                self._value = self._source()
+                self._read_at = now
+            return self._value
+
+
+def quartz_idle_seconds() -> Optional[float]:
+    """Idle seconds since the last input event of any kind (Quartz event source, no fork)."""
+    try:
+        return float(CGEventSourceSecondsSinceLastEventType(kCGEventSourceStateCombinedSessionState,
+                                                            kCGAnyInputEventType))
+    except Exception:
+        return None
+
+
+def macos_idle_seconds() -> Optional[float]:
+    """Idle seconds from IOHIDSystem (HIDIdleTime is in nanoseconds)."""
+    try:
+        out = subprocess.run(
+            ["ioreg", "-c", "IOHIDSystem", "-d", "4"],
+            capture_output=True, text=True, timeout=1,
+        ).stdout
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return None
+    m = _HID_IDLE_RE.search(out)
+    return int(m.group(1)) / 1e9 if m else None
+
+
+def get_idle_source() -> Optional[IdleSource]:
+    """Idle source for this platform, or None if idle time can't be read here."""
+    if IDLE_SOURCE == "none":
+        return None
+    system = platform.system()
+    if system == "Darwin":
+        if CGEventSourceSecondsSinceLastEventType is not None:
+            return quartz_idle_seconds
+        return CachedIdleSource(macos_idle_seconds)
+    if system == "Linux" and os.environ.get("DISPLAY"):
+        try:
+            return X11IdleSource()
+        except Exception:
+            return None
+    return None
@@ -1,9 +1,28 @@
-"""Linux (X11) activity detection using xdotool."""
+"""Linux (X11) activity detection.
 
+Primary backend keeps one X display connection open (python-xlib) and tracks
+_NET_ACTIVE_WINDOW via PropertyNotify on the root window, so a poll is a cached
+read. Falls back to xdotool/xprop subprocesses when python-xlib or $DISPLAY is missing.
+Set ACTIVITY_X11_BACKEND=xdotool to force the subprocess path, or =xlib to require the
+persistent connection (RuntimeError instead of the fallback).
+"""
+
+import os
 import subprocess
+import threading
 from dataclasses import dataclass
 from typing import Optional
 
+from .classifier import infer_context_type  # noqa: F401  (shared rule table, re-exported)
+
+try:
+    from Xlib import X, Xatom, display as xdisplay, error as xerror
+    from Xlib import threaded  # noqa: F401  (real locks: stop() sends while the event thread reads)
+except ImportError:
+    xdisplay = None
+
+X11_BACKEND = os.environ.get("ACTIVITY_X11_BACKEND", "auto").lower()  # auto | xlib | xdotool
+
 
 @dataclass
 class WindowInfo:
@@ -16,8 +35,178 @@ class WindowInfo:
         return f"{self.app_name}::{self.window_title}"
 
 
+class X11WindowWatcher:
+    """
+    Long-lived X connection that caches the active window.
+    start() runs an event thread that refreshes the cache on PropertyNotify
+    (_NET_ACTIVE_WINDOW on root, _NET_WM_NAME/WM_NAME on the active window).
+    Without start(), get_active_window() queries the server directly (no fork).
+    """
+
+    def __init__(self, display_name: Optional[str] = None):
+        if xdisplay is None:
+            raise RuntimeError("pip install python-xlib")
+        self._display = xdisplay.Display(display_name)
+        self._root = self._display.screen().root
+        self._net_active_window = self._display.intern_atom("_NET_ACTIVE_WINDOW")
+        self._net_wm_name = self._display.intern_atom("_NET_WM_NAME")
+        self._utf8_string = self._display.intern_atom("UTF8_STRING")
+        self._lock = threading.Lock()
+        self._cached: Optional[WindowInfo] = None
+        self._active_win = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake_win = None  # own unmapped window: a property change on it wakes next_event()
+        self._running = False
+        self.alive = True
+
+    def start(self) -> None:
+        """Subscribe to root PropertyNotify and keep the cache fresh from an event thread."""
+        if self._thread is not None:
+            return
+        self._root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._wake_win = self._root.create_window(-1, -1, 1, 1, 0, X.CopyFromParent,
+                                                  event_mask=X.PropertyChangeMask)
+        self._display.flush()
+        self._running = True
+        self._refresh()
+        self._thread = threading.Thread(target=self._run, name="X11WindowWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Wake and join the event thread, then close the display connection."""
+        if not self.alive:
+            return
+        self._running = False
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._wake_win.change_property(self._net_wm_name, Xatom.STRING, 8, b"stop")
+                self._display.flush()
+            except (xerror.XError, xerror.ConnectionClosedError, OSError):
+                pass
+            thread.join(timeout)
+        self.alive = False
+        self._cached = None
+        try:
+            self._display.close()
+        except (xerror.ConnectionClosedError, OSError):
+            pass
+
+    def get_active_window(self) -> Optional[WindowInfo]:
+        """Cached active window when the event thread runs; else a direct query."""
+        if self._thread is not None:
+            return self._cached
+        with self._lock:
+            return self._query()
+
+    def _run(self) -> None:
+        try:
+            while self._running:
+                ev = self._display.next_event()
+                if ev.type != X.PropertyNotify:
+                    continue
+                if ev.window == self._root:
+                    if ev.atom == self._net_active_window:
+                        self._refresh()
+                elif self._active_win is not None and ev.window.id == self._active_win.id:
+                    if ev.atom in (self._net_wm_name, Xatom.WM_NAME):
+                        self._refresh()
+        except xerror.ConnectionClosedError:
+            pass
+        finally:
+            self.alive = False
+            self._cached = None
+
+    def _refresh(self) -> None:
+        """Re-read the active window and move the title subscription to it."""
+        win = self._get_active_win()
+        prev = self._active_win
+        if win is None or prev is None or win.id != prev.id:
+            catch = xerror.CatchError()
+            if prev is not None:
+                prev.change_attributes(event_mask=X.NoEventMask, onerror=catch)
+            if win is not None:
+                win.change_attributes(event_mask=X.PropertyChangeMask, onerror=catch)
+            self._display.flush()
+            self._active_win = win
+        self._cached = self._describe(win) if win is not None else None
+
+    def _query(self) -> Optional[WindowInfo]:
+        win = self._get_active_win()
+        return self._describe(win) if win is not None else None
+
+    def _get_active_win(self):
+        try:
+            prop = self._root.get_full_property(self._net_active_window, X.AnyPropertyType)
+        except xerror.XError:
+            return None
+        if prop is None or not prop.value or not prop.value[0]:
+            return None
+        return self._display.create_resource_object("window", int(prop.value[0]))
+
+    def _describe(self, win) -> Optional[WindowInfo]:
+        try:
+            title = ""
+            prop = win.get_full_property(self._net_wm_name, self._utf8_string)
+            if prop is not None and prop.value:
+                value = prop.value
+                title = value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+            else:
+                title = win.get_wm_name() or ""
+            wm_class = win.get_wm_class()
+        except xerror.XError:
+            # Window went away between the active-window read and the property reads
+            return None
+        app = wm_class[1] if wm_class and len(wm_class) > 1 else "unknown"
+        return WindowInfo(app_name=app, window_title=title.strip(), window_id=str(win.id))
+
+
+_watcher: Optional[X11WindowWatcher] = None
+_watcher_lock = threading.Lock()
+_watcher_failed = False
+
+
+def _get_watcher() -> Optional[X11WindowWatcher]:
+    """
+    Shared watcher, created on first use. None when python-xlib/$DISPLAY unavailable
+    (RuntimeError instead with ACTIVITY_X11_BACKEND=xlib).
+    """
+    global _watcher, _watcher_failed
+    if _watcher is not None and _watcher.alive:
+        return _watcher
+    required = X11_BACKEND == "xlib"
+    if required:
+        if xdisplay is None:
+            raise RuntimeError("ACTIVITY_X11_BACKEND=xlib: pip install python-xlib")
+        if not os.environ.get("DISPLAY"):
+            raise RuntimeError("ACTIVITY_X11_BACKEND=xlib: $DISPLAY is not set")
+    elif _watcher_failed or X11_BACKEND == "xdotool" or xdisplay is None or not os.environ.get("DISPLAY"):
+        return None
+    with _watcher_lock:
+        if _watcher is not None and _watcher.alive:
+            return _watcher
+        try:
+            _watcher = X11WindowWatcher()
+            _watcher.start()
+        except Exception as e:
+            _watcher = None
+            if required:
+                raise RuntimeError(f"ACTIVITY_X11_BACKEND=xlib: cannot open display: {e}") from e
+            # No X server to talk to: stay on the subprocess fallback
+            _watcher_failed = True
+    return _watcher
+
+
 def get_active_window_x11() -> Optional[WindowInfo]:
-    """Get active window on X11 via xdotool. Returns None if xdotool unavailable."""
+    """Get active window on X11. Uses the persistent Xlib connection, else xdotool/xprop."""
+    watcher = _get_watcher()
+    if watcher is not None:
+        return watcher.get_active_window()
+    return _get_active_window_xdotool()
+
+
+def _get_active_window_xdotool() -> Optional[WindowInfo]:
+    """Subprocess fallback via xdotool/xprop. Returns None if xdotool unavailable."""
     try:
         win_id = subprocess.run(
             ["xdotool", "getactivewindow"],
@@ -42,28 +231,7 @@ def get_active_window_x11() -> Optional[WindowInfo]:
         if wm_class.returncode == 0 and wm_class.stdout:
             parts = wm_class.stdout.split('"')
             if len(parts) >= 4:
-                app = parts[3]  # instance name
+                app = parts[3]  # class name
         return WindowInfo(app_name=app, window_title=title, window_id=wid)
     except (subprocess.TimeoutExpired, FileNotFoundError):
         return None
-
-
-def infer_context_type(app_name: str, window_title: str) -> str:
-    """Infer context type. Same logic as macOS for consistency."""
-    app_lower = app_name.lower()
-    title_lower = window_title.lower()
-
-    browsers = ["safari", "chrome", "firefox", "brave", "edge", "opera"]
-    if any(b in app_lower for b in browsers):
-        if "http" in title_lower or "www." in title_lower or ".com" in title_lower:
-            return "website"
-        return "browser"
-
-    editors = ["cursor", "visual studio code", "code", "vim", "sublime"]
-    if any(e in app_lower for e in editors):
-        return "file"
-
-    if "terminal" in app_lower or "iterm" in app_lower:
-        return "terminal"
-
-    return "app"
@@ -1,10 +1,91 @@
-"""macOS-specific activity detection using AppleScript."""
+"""macOS-specific activity detection using AppleScript.
 
+One combined probe returns app, window title, browser URL, selected text and
+focused value in a single osascript round trip. With ACTIVITY_MACOS_PERSISTENT=1
+(or OsascriptProbe(persistent=True)) a JXA process stays alive with the script
+compiled once and answers one request per stdin line.
+"""
+
+import json
+import os
+import select
 import subprocess
+import threading
 import time
 from dataclasses import dataclass
 from typing import Optional
 
+from .classifier import infer_context_type  # noqa: F401  (shared rule table, re-exported)
+
+OSASCRIPT = os.environ.get("OSASCRIPT", "osascript")
+PERSISTENT_PROBE = os.environ.get("ACTIVITY_MACOS_PERSISTENT", "").lower() in ("1", "true", "yes")
+
+FIELD_SEP = "\x1f"   # ASCII unit separator between probe fields
+RECORD_END = "\x1e"  # ASCII record separator terminates one persistent-mode response
+
+# Fields: app | window title | browser URL | AXSelectedText | AXValue (truncated)
+PROBE_SCRIPT = """
+set US to character id 31
+set appName to ""
+set windowName to ""
+set selText to ""
+set focVal to ""
+tell application "System Events"
+    set frontApp to first application process whose frontmost is true
+    set appName to name of frontApp
+    try
+        if (count of windows of frontApp) > 0 then
+            set windowName to name of front window of frontApp
+            set foc to focused element of front window of frontApp
+            if foc is not missing value then
+                try
+                    set v to value of attribute "AXSelectedText" of foc
+                    if v is not missing value then set selText to v as text
+                end try
+                try
+                    set v to value of attribute "AXValue" of foc
+                    if v is not missing value then set focVal to v as text
+                end try
+            end if
+        end if
+    end try
+end tell
+if (length of focVal) > 500 then set focVal to text 1 thru 500 of focVal
+set pageURL to ""
+set urlCmd to ""
+if appName is in {"Google Chrome", "Chrome", "Microsoft Edge", "Brave Browser", "Firefox"} then
+    set urlCmd to "get URL of active tab of front window"
+else if appName is "Safari" then
+    set urlCmd to "get URL of current tab of front window"
+end if
+if urlCmd is not "" then
+    try
+        set pageURL to run script "tell application \\"" & appName & "\\" to " & urlCmd
+    end try
+end if
+return appName & US & windowName & US & pageURL & US & selText & US & focVal
+"""
+
+# JXA server for persistent mode: compile PROBE_SCRIPT once, run it per stdin line.
+_SERVER_SCRIPT = """
+ObjC.import('Foundation');
+var script = $.NSAppleScript.alloc.initWithSource(%s);
+script.compileAndReturnError(null);
+var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+while (true) {
+    var data = stdin.availableData;
+    if (data.length == 0) break;
+    var out = '';
+    try {
+        var res = script.executeAndReturnError(null);
+        if (res && !res.isNil()) out = ObjC.unwrap(res.stringValue) || '';
+    } catch (e) {}
+    stdout.writeData($(out + '\\x1e\\n').dataUsingEncoding($.NSUTF8StringEncoding));
+}
+""" % json.dumps(PROBE_SCRIPT)
+
+
 @dataclass
 class WindowInfo:
     """Info about the currently focused window."""
@@ -19,182 +100,175 @@ class WindowInfo:
         return f"{self.app_name}::{self.window_title}"
 
 
-def get_active_window_macos() -> Optional[WindowInfo]:
+@dataclass
+class MacProbeResult:
+    """Everything one probe round trip returns."""
+
+    app_name: str
+    window_title: str
+    url: Optional[str] = None
+    selected_text: Optional[str] = None
+    focused_value: Optional[str] = None
+
+    @property
+    def window(self) -> WindowInfo:
+        return WindowInfo(app_name=self.app_name or "unknown", window_title=self.window_title)
+
+
+def parse_probe_output(out: str) -> Optional[MacProbeResult]:
+    """Parse one FIELD_SEP-delimited probe response. None if empty."""
+    out = out.rstrip("\n").rstrip(RECORD_END).rstrip("\n")
+    if not out.strip():
+        return None
+    parts = out.split(FIELD_SEP)
+    parts += [""] * (5 - len(parts))
+    app_name, window_title, url, selected, focused = (p.strip() for p in parts[:5])
+    return MacProbeResult(
+        app_name=app_name or "unknown",
+        window_title=window_title,
+        url=url if url.startswith(("http", "file")) else None,
+        selected_text=selected or None,
+        focused_value=focused or None,
+    )
+
+
+class OsascriptProbe:
     """
-    Get the currently active window using AppleScript (System Events).
-    Returns None if detection fails.
+    Runs PROBE_SCRIPT. Single-shot: one `osascript -e` per probe().
+    Persistent: one long-lived `osascript -l JavaScript` process, restarted on failure/timeout.
     """
-    try:
-        script = """
-        tell application "System Events"
-            set frontApp to first application process whose frontmost is true
-            set appName to name of frontApp
-            try
-                set windowName to ""
-                if (count of windows of frontApp) > 0 then
-                    set windowName to name of front window of frontApp
-                end if
-                return appName & "|||" & windowName
-            on error
-                return appName & "|||"
-            end try
-        end tell
-        """
-        result = subprocess.run(
-            ["osascript", "-e", script],
-            capture_output=True,
-            text=True,
-            timeout=2,
-        )
-        if result.returncode != 0 or not result.stdout.strip():
+
+    def __init__(self, persistent: bool = False, osascript: str = OSASCRIPT, timeout: float = 2.0):
+        self.persistent = persistent
+        self.osascript = osascript
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def probe(self) -> Optional[MacProbeResult]:
+        with self._lock:
+            if self.persistent:
+                out = self._request_persistent()
+            else:
+                out = self._run_once()
+        return parse_probe_output(out) if out else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._kill()
+
+    def _run_once(self) -> Optional[str]:
+        try:
+            result = subprocess.run(
+                [self.osascript, "-e", PROBE_SCRIPT],
+                capture_output=True,
+                text=True,
+                timeout=self.timeout,
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout
+
+    def _request_persistent(self) -> Optional[str]:
+        proc = self._proc
+        if proc is None or proc.poll() is not None:
+            try:
+                proc = self._proc = subprocess.Popen(
+                    [self.osascript, "-l", "JavaScript", "-e", _SERVER_SCRIPT],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except FileNotFoundError:
+                return None
+        try:
+            proc.stdin.write(b"probe\n")
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self._kill()
             return None
 
-        parts = result.stdout.strip().split("|||", 1)
-        app_name = parts[0].strip() if parts else "unknown"
-        window_title = parts[1].strip() if len(parts) > 1 else ""
+        fd = proc.stdout.fileno()
+        buf = b""
+        deadline = time.monotonic() + self.timeout
+        terminator = RECORD_END.encode() + b"\n"
+        while not buf.endswith(terminator):
+            remaining = deadline - time.monotonic()
+            ready = select.select([fd], [], [], remaining)[0] if remaining > 0 else []
+            if not ready:
+                self._kill()  # hung probe: drop it so the next call starts clean
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                self._kill()
+                return None
+            buf += chunk
+        return buf.decode("utf-8", "replace")
 
-        return WindowInfo(
-            app_name=app_name or "unknown",
-            window_title=window_title,
-        )
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        return None
+    def _kill(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.kill()
+                proc.wait(timeout=1)
+            except Exception:
+                pass
 
 
-def get_reading_section_macos(app_name: str, window_title: str) -> Optional[str]:
+_probe = OsascriptProbe(persistent=PERSISTENT_PROBE)
+
+
+def probe_front_window_macos() -> Optional[MacProbeResult]:
+    """Window, URL, selection and focused value in one osascript round trip."""
+    return _probe.probe()
+
+
+def get_active_window_macos() -> Optional[WindowInfo]:
+    """
+    Get the currently active window using AppleScript (System Events).
+    Returns None if detection fails.
+    """
+    probe = probe_front_window_macos()
+    return probe.window if probe else None
+
+
+def get_reading_section_macos(
+    app_name: str, window_title: str, probe: Optional[MacProbeResult] = None
+) -> Optional[str]:
     """
     Try to get which section/region the user is reading.
     Uses: selected text, browser URL (incl. #anchor), or focused text snippet.
+    Pass the probe from the same poll to avoid another osascript round trip.
     Returns None if not detectable. Requires Accessibility permission.
     """
-    result: Optional[str] = None
+    if probe is None:
+        probe = probe_front_window_macos()
+        if probe is None:
+            return None
 
     # 1. Browser: get URL (may contain #section or path like /docs/section)
     app_lower = app_name.lower()
     if any(b in app_lower for b in ["chrome", "safari", "firefox", "edge", "brave"]):
-        url = _get_browser_url_macos(app_name)
+        url = probe.url
         if url:
             # Use path + hash as section hint (e.g. /docs/api#auth, #heading-2)
             if "#" in url:
-                result = url.split("#", 1)[1].strip() or url[:80]
-            else:
-                result = url[:120] if len(url) > 120 else url
-            return result
+                return url.split("#", 1)[1].strip() or url[:80]
+            return url[:120] if len(url) > 120 else url
 
     # 2. Selected text (strong signal – user is reading/selecting)
-    selected = _get_selected_text_macos()
+    selected = probe.selected_text
     if selected and len(selected.strip()) > 2:
         # First line or first 100 chars as section hint
         first_line = selected.split("\n")[0].strip()
         return (first_line[:100] + "…") if len(first_line) > 100 else first_line
 
     # 3. Focused element value (e.g. current paragraph in editor)
-    focused_val = _get_focused_value_macos()
+    focused_val = probe.focused_value
     if focused_val and len(focused_val.strip()) > 5:
         first_line = focused_val.split("\n")[0].strip()
         return (first_line[:80] + "…") if len(first_line) > 80 else first_line
 
-    return result
-
-
-def _get_browser_url_macos(app_name: str) -> Optional[str]:
-    """Get current tab URL from browser via AppleScript."""
-    try:
-        app_map = {
-            "google chrome": "get URL of active tab of front window",
-            "chrome": "get URL of active tab of front window",
-            "safari": "get URL of current tab of front window",
-            "firefox": "get URL of active tab of front window",
-            "microsoft edge": "get URL of active tab of front window",
-            "brave browser": "get URL of active tab of front window",
-        }
-        cmd = app_map.get(app_name.lower())
-        if not cmd:
-            return None
-        script = f'tell application "{app_name}" to {cmd}'
-        r = subprocess.run(
-            ["osascript", "-e", script],
-            capture_output=True,
-            text=True,
-            timeout=2,
-        )
-        if r.returncode == 0 and r.stdout and r.stdout.strip().startswith(("http", "file")):
-            return r.stdout.strip()
-    except Exception:
-        pass
     return None
-
-
-def _get_selected_text_macos() -> Optional[str]:
-    """Get AXSelectedText via AppleScript. Requires Accessibility permission."""
-    try:
-        script = """
-        tell application "System Events"
-            set frontApp to first process whose frontmost is true
-            try
-                set foc to focused element of front window of frontApp
-                if foc is not missing value then
-                    set v to value of attribute "AXSelectedText" of foc
-                    if v is not missing value and v is not "" then
-                        return v as text
-                    end if
-                end if
-            end try
-        end tell
-        return ""
-        """
-        r = subprocess.run(["osascript", "-e", script], capture_output=True, text=True, timeout=2)
-        if r.returncode == 0 and r.stdout and r.stdout.strip():
-            return r.stdout.strip()
-    except Exception:
-        pass
-    return None
-
-
-def _get_focused_value_macos() -> Optional[str]:
-    """Get AXValue of focused element (e.g. text field content)."""
-    try:
-        script = """
-        tell application "System Events"
-            set frontApp to first process whose frontmost is true
-            try
-                set foc to focused element of front window of frontApp
-                if foc is not missing value then
-                    set v to value of attribute "AXValue" of foc
-                    if v is not missing value and v is not "" then
-                        return v as text
-                    end if
-                end if
-            end try
-        end tell
-        return ""
-        """
-        r = subprocess.run(["osascript", "-e", script], capture_output=True, text=True, timeout=2)
-        if r.returncode == 0 and r.stdout and len(r.stdout.strip()) > 2:
-            return r.stdout.strip()
-    except Exception:
-        pass
-    return None
-
-
-def infer_context_type(app_name: str, window_title: str) -> str:
-    """
-    Infer whether this is an app, website, or file based on app/title.
-    """
-    app_lower = app_name.lower()
-    title_lower = window_title.lower()
-
-    browsers = ["safari", "chrome", "firefox", "brave", "edge", "opera"]
-    if any(b in app_lower for b in browsers):
-        if "http" in title_lower or "www." in title_lower or ".com" in title_lower:
-            return "website"
-        return "browser"
-
-    editors = ["cursor", "visual studio code", "code", "vim", "sublime"]
-    if any(e in app_lower for e in editors):
-        return "file"
-
-    if "terminal" in app_lower or "iterm" in app_lower:
-        return "terminal"
-
-    return "app"
@@ -0,0 +1,167 @@
+"""Window title / URL normalization and the canonical context_id.
+
+Raw titles churn without the user moving: unread badges ("(3) Inbox"), spinner and
+unsaved-change glyphs, clocks, "Page N of M" in PDF viewers, browser name suffixes. Each
+variant used to be a new context_id, restarting the session. normalize() strips that noise
+and builds the id from, in order of preference:
+- the browser URL (host without www + path, fragment and tracking query dropped)
+- the cleaned title with per-app rules applied
+PDF "Page N of M" is kept out of the id and returned separately.
+
+Results are cached (LRU) and context_ids interned, so an unchanged window costs a dict lookup.
+
+Usage:
+  norm = normalize("Google Chrome", "(3) Inbox - me@gmail.com - Gmail", url)
+  norm.context_id, norm.title, norm.page_number
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+CACHE_SIZE = 1024
+
+# Query parameters that identify the page (kept in the id); everything else is dropped
+KEEP_QUERY_KEYS = frozenset({"v", "id", "list", "p", "q"})
+
+# Noise removed from every title
+_LEADING_NOISE = re.compile(
+    r"^(?:"
+    r"\(\d+\+?\)"              # unread badge: (3) Inbox, (99+) Slack
+    r"|\[\d+\+?\]"             # [2] ...
+    r"|[\u2800-\u28ff]"        # braille spinner frames
+    r"|[●○◐◑◒◓•✱⏺▶⏸]"         # unsaved / recording / playing markers
+    r")\s*"
+)
+_TRAILING_NOISE = re.compile(r"\s*(?:[●•*]|\(\d+\+?\))$")
+_CLOCK = re.compile(r"\(?\b\d{1,2}:\d{2}(?::\d{2})?\b\)?")
+_SPACES = re.compile(r"\s+")
+_BROWSER_SUFFIX = re.compile(
+    r"\s+[-–—|]\s+(?:Google Chrome|Chromium|Mozilla Firefox|Firefox|Safari|Brave|Microsoft\u200b? Edge|Opera|Arc)$",
+    re.IGNORECASE,
+)
+_PDF_PAGE = re.compile(
+    r"\s*(?:[-–—|,:]\s*|\()?\b(?:page|p\.)\s*(\d+)\s*(?:of|/)\s*(\d+)\)?",
+    re.IGNORECASE,
+)
+
+_URL_PAGE = re.compile(r"(?:^|[#&])page=(\d+)")  # Chrome/Firefox PDF viewer: file.pdf#page=3
+
+# Web mail counters: "Inbox (3) - me@x - Gmail"
+_MAIL_COUNT = [(re.compile(r"\b(Inbox|Sent|Drafts)\s*\(\d+\)"), r"\1")]
+# Editors' unsaved markers: "*main.py", "! main.py" (only here: elsewhere a leading * or ! is content)
+_EDITOR_MARKER = (re.compile(r"^[*!]\s*"), "")
+_EDITOR_STATE = (re.compile(r"\s+\((?:modified|Working Tree|deleted)\)", re.IGNORECASE), "")
+
+# Per-app rules: (app name substring (lowercase), [(pattern, replacement), ...]) applied in order
+APP_RULES: list[tuple[str, list[tuple[re.Pattern, str]]]] = [
+    ("chrome", _MAIL_COUNT),
+    ("safari", _MAIL_COUNT),
+    ("firefox", _MAIL_COUNT),
+    ("edge", _MAIL_COUNT),
+    ("outlook", [(re.compile(r"\b(Inbox|Sent Items|Drafts)\s*[-–]?\s*\d+\b"), r"\1")]),
+    # macOS Terminal / iTerm: "user — -zsh — 80×24", "1. python (sleep)"
+    ("terminal", [(re.compile(r"\s+[—-]\s+\d+[×x]\d+$"), ""), (re.compile(r"\s+[—-]\s+-?\w+sh$"), "")]),
+    ("iterm", [(re.compile(r"^\d+\.\s+"), ""), (re.compile(r"\s+\([^)]*\)$"), "")]),
+    # Slack: "! general (Channel) - Workspace - 3 new items" (leading ! = unread mentions)
+    ("slack", [(re.compile(r"^!\s*"), ""), (re.compile(r"\s+[-–]\s+\d+\s+new items?$", re.IGNORECASE), "")]),
+    # Editors: "● main.py - project - Visual Studio Code" (● handled globally); "main.py (modified)"
+    ("code", [_EDITOR_MARKER, _EDITOR_STATE]),
+    ("cursor", [_EDITOR_MARKER, _EDITOR_STATE]),
+    ("sublime", [_EDITOR_MARKER, (re.compile(r"\s+•$"), "")]),
+]
+
+# PDF viewers: titles carry "Page N of M". Browsers only count when the title names a .pdf, so a
+# web page titled "... page 2 of 5" keeps its page in the id.
+PDF_APPS = ("preview", "acrobat", "reader", "skim", "evince", "okular", "zathura", "pdf")
+
+
+@dataclass(frozen=True, slots=True)
+class NormalizedContext:
+    context_id: str
+    title: str  # window title without badges, spinners, clocks or browser suffix
+    url_key: Optional[str] = None  # host/path[?kept query] when a URL was available
+    page_number: Optional[int] = None
+    page_count: Optional[int] = None
+
+    @property
+    def page_label(self) -> Optional[str]:
+        if self.page_number is None:
+            return None
+        return f"Page {self.page_number} of {self.page_count}" if self.page_count else f"Page {self.page_number}"
+
+
+def canonicalize_url(url: Optional[str]) -> Optional[str]:
+    """"https://www.Example.com/a/b/?utm_source=x#sec" -> "example.com/a/b". None for non-http(s)/file URLs."""
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    if parts.scheme == "file":
+        return parts.path or None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    key = host + path
+    if parts.query:
+        kept = sorted((k, v) for k, v in parse_qsl(parts.query) if k in KEEP_QUERY_KEYS)
+        if kept:
+            key += "?" + urlencode(kept)
+    return key
+
+
+def extract_pdf_page(title: str) -> tuple[str, Optional[int], Optional[int]]:
+    """("paper.pdf — Page 3 of 12") -> ("paper.pdf", 3, 12); title unchanged and Nones if no page."""
+    m = _PDF_PAGE.search(title)
+    if m is None:
+        return title, None, None
+    stripped = (title[: m.start()] + title[m.end():]).strip(" -–—|,:")
+    return stripped or title, int(m.group(1)), int(m.group(2))
+
+
+def clean_title(app_name: str, window_title: str) -> str:
+    """Title without badges, spinner/unsaved glyphs, browser suffix, and per-app noise."""
+    title = _SPACES.sub(" ", window_title).strip()
+    prev = None
+    while prev != title:  # several leading markers: "● (2) main.py"
+        prev = title
+        title = _LEADING_NOISE.sub("", title)
+    title = _TRAILING_NOISE.sub("", title)
+    title = _BROWSER_SUFFIX.sub("", title)
+    app_lower = app_name.lower()
+    for needle, rules in APP_RULES:
+        if needle in app_lower:
+            for pattern, repl in rules:
+                title = pattern.sub(repl, title)
+    return title.strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize(app_name: str, window_title: str, url: Optional[str] = None) -> NormalizedContext:
+    """Canonical context for a window. Cached: identical inputs return the same object."""
+    title = clean_title(app_name, window_title or "")
+    page = count = None
+    key = title
+    app_lower = app_name.lower()
+    if any(a in app_lower for a in PDF_APPS) or ".pdf" in title.lower():
+        key, page, count = extract_pdf_page(title)
+    key = _SPACES.sub(" ", _CLOCK.sub("", key)).strip(" -–—|") or key
+    url_key = canonicalize_url(url)
+    if page is None and url and "#" in url:
+        m = _URL_PAGE.search(url.split("#", 1)[1])
+        if m:
+            page = int(m.group(1))
+    context_id = sys.intern(f"{app_name}::{url_key or key}")
+    return NormalizedContext(context_id=context_id, title=title, url_key=url_key, page_number=page, page_count=count)
+
+
+def cache_info():
+    return normalize.cache_info()
@@ -7,6 +7,7 @@ import time
 from typing import Any, Optional
 
 from data_schema import ActivitySnapshot, MentalStateSnapshot
+from mental_state_parser import derive_mental_state_label
 
 
 def build_agent_request(
@@ -36,18 +37,16 @@ def build_agent_request(
             "excitement": mental_state.excitement,
             "interest": mental_state.interest,
             "metrics": mental_state.metrics,
+            # Stable (smoothed, hysteresis) label when the snapshot came from MentalStateEstimator
+            "label": derive_mental_state_label(mental_state),
+            "label_seconds": mental_state.label_seconds,
         }
+        if mental_state.features:
+            mental_state_data["features"] = mental_state.features
 
     return {
         "timestamp": t,
-        "activity": {
-            "app_name": activity.app_name,
-            "window_title": activity.window_title,
-            "context_type": activity.context_type,
-            "context_id": activity.context_id,
-            "reading_section": activity.reading_section,
-            "duration_seconds": activity.duration_seconds,
-        },
+        "activity": activity.to_dict(),
         "mental_state": mental_state_data,
         "user_feedback": user_feedback,
     }
@@ -10,6 +10,9 @@ Usage:
   python app.py --eeg                      # Real Emotiv headset (requires .env)
   python app.py --long 45                  # 45 sec on page before trigger
   python app.py --no-feedback              # No overlay window
+  python app.py --frames                   # One 'frame' message per tick instead of activity/eeg/mental_state
+  python app.py --no-db                    # Don't record sessions/help/mental state to config.DB_PATH
+  python app.py --replay-cortex captures/  # Replay a Cortex capture (CORTEX_CAPTURE=captures/) as the EEG source
 """
 import argparse
 import json
@@ -29,6 +32,7 @@ except ImportError:
 
 import config
 from activity import ActivityMonitor
+from activity.idle import get_idle_source
 from agent_request import build_agent_request, build_post_eeg_body, build_reading_help_ws_message
 from data_schema import (
     ActivitySnapshot,
@@ -37,8 +41,12 @@ from data_schema import (
     MentalStateSnapshot,
 )
 from feedback_window import FeedbackWindow
-from mental_state_parser import parse_met_to_mental_state
+from help_dispatcher import HelpDispatcher
+from jetson_client import feedback_from, get_client
+from mental_state_parser import MentalStateEstimator, parse_met_to_mental_state
+from session_store import SessionStore
 from time_tracker import SessionTracker, SessionEvent, SessionEventType
+from ws_uplink import WebSocketUplink
 
 
 # Overlay window identifiers — when focused, use last real context for session/help
@@ -95,7 +103,13 @@ def run_app(
     warn_sec: float = 120,
     long_sec: float = 180,
     follow_up_interval_sec: float = 300,
-    poll_interval: float = 0.3,
+    poll_interval: float = config.POLL_INTERVAL,
+    use_frames: bool = False,
+    use_features: bool = False,
+    smooth_met: bool = True,
+    record_history: bool = True,
+    replay_path: str | None = None,
+    replay_speed: float = 1.0,
 ) -> None:
     if not websocket:
         print("Error: pip install websocket-client")
@@ -103,13 +117,17 @@ def run_app(
 
     state = AppState()
     running = True
-    ws_ref: dict = {"ws": None}
     activity = ActivityMonitor(poll_interval=poll_interval)
     session_tracker = SessionTracker(
         warn_threshold_sec=min(warn_sec, max(1, long_sec - 30)),
         long_threshold_sec=long_sec,
         follow_up_interval_sec=follow_up_interval_sec,
+        idle_source=get_idle_source(),  # no input for IDLE_THRESHOLD_SEC pauses the dwell clock
     )
+    # Session/help/mental-state history in SQLite (write-behind: never blocks these loops)
+    history = SessionStore() if record_history else None
+    if history:
+        history.attach(session_tracker)
 
     # Overlay exclusion: when overlay is focused, use last real context for session/help
     last_real_context = [None]  # list to allow mutation in closure
@@ -129,11 +147,25 @@ def run_app(
         win.root.protocol("WM_DELETE_WINDOW", lambda: (stop(), win.root.destroy()))
         win.update_feedback("Monitoring... Stay on a difficult page to trigger help.")
 
+    # WebSocket uplink: reconnects with backoff, buffers while down and replays in order
+    def on_message(message):
+        try:
+            data = json.loads(message)
+            if data.get("type") == "feedback" and feedback_cb:
+                feedback_cb(data.get("feedback", ""))
+        except (json.JSONDecodeError, KeyError):
+            pass
+
+    uplink = WebSocketUplink(
+        jetson_ws_url,
+        on_message=on_message if feedback_cb else None,
+        on_open=lambda: print("  Connected to Jetson"),
+        on_close=lambda: print("  Disconnected from Jetson"),
+    )
+
     def send_payload(payload: CollectorPayload):
-        if ws_ref["ws"] and ws_ref["ws"].sock and ws_ref["ws"].sock.connected:
-            try:
-                d = payload.to_dict()
-                ws_ref["ws"].send(json.dumps(d))
+        try:
+            if uplink.send(payload):
                 act = payload.activity
                 ms = payload.mental_state
                 parts = []
@@ -152,15 +184,43 @@ def run_app(
                         ms_parts.append(f"relax={ms.relaxation:.2f}")
                     parts.append(f"mental_state=[{', '.join(ms_parts) or 'metrics'}]")
                 print(f"  [WS] Sent to backend: {payload.type}" + (" | " + " | ".join(parts) if parts else ""))
-            except Exception as e:
-                print("  Send error:", e)
+        except Exception as e:
+            print("  Send error:", e)
 
     def _make_activity_snapshot(duration_seconds: float | None = None) -> ActivitySnapshot | None:
-        ctx = activity.get_current_activity()
+        ctx = activity.peek()
         if not ctx:
             return None
         return _ctx_to_snapshot(ctx, duration_seconds)
 
+    jetson = get_client(jetson_http_base)
+
+    def post_help(body: dict) -> str | None:
+        context_id = body["context"]["context_id"]
+        started = time.monotonic()
+        try:
+            r = jetson.post_json("/eeg", body)
+        except Exception as e:
+            if history:
+                history.record_help_response(context_id, error=str(e), latency_seconds=time.monotonic() - started)
+            raise
+        print(f"  [HTTP] POST {jetson_http_base}/eeg -> {r.status_code}")
+        fb = feedback_from(r)
+        if history:
+            history.record_help_response(context_id, feedback=fb, error=None if r.ok else f"HTTP {r.status_code}",
+                                         latency_seconds=time.monotonic() - started)
+        if fb:
+            print(f"  >>> {fb[:60]}...")
+        return fb
+
+    help_dispatcher = None
+    if feedback_cb:
+        help_dispatcher = HelpDispatcher(
+            send=post_help,
+            on_result=feedback_cb,
+            on_error=lambda _e: feedback_cb("(No response from Jetson – check connection)"),
+        )
+
     # Session events → help request (POST /eeg + WebSocket reading_help)
     def on_session_event(event: SessionEvent):
         if event.event_type not in (SessionEventType.LONG_THRESHOLD, SessionEventType.FOLLOW_UP):
@@ -173,84 +233,61 @@ def run_app(
         ms = state.get_mental_state()
         act = _ctx_to_snapshot(event.context, event.duration_seconds)
         req = build_agent_request(act, ms, user_feedback=user_feedback)
+        if history:
+            history.record_help_request(act.context_id, req)
 
         # WebSocket: reading_help
-        if ws_ref["ws"] and ws_ref["ws"].sock and ws_ref["ws"].sock.connected:
-            try:
-                d = build_reading_help_ws_message(req)
-                ws_ref["ws"].send(json.dumps(d))
+        try:
+            if uplink.send(build_reading_help_ws_message(req)):
                 title = (act.window_title or "")[:35]
                 desc = f"{act.app_name} | {title}{'...' if len(act.window_title or '') > 35 else ''} | {act.context_type}"
                 print(f"  [WS] Sent to backend: reading_help | {desc}")
-            except Exception:
-                pass
+        except Exception:
+            pass
         print(f"[{event.event_type.value}] {event.duration_seconds:.0f}s on: {event.context.display_name}")
 
-        # POST /eeg for immediate feedback
-        if feedback_cb:
-            try:
-                import requests
-                streams_met = ms.metrics if ms and ms.metrics else None
-                body = build_post_eeg_body(req, streams_met=streams_met)
-                r = requests.post(
-                    f"{jetson_http_base}/eeg",
-                    json=body,
-                    headers={"Content-Type": "application/json", "ngrok-skip-browser-warning": "1"},
-                    timeout=30,
-                )
-                print(f"  [HTTP] POST {jetson_http_base}/eeg -> {r.status_code}")
-                if r.status_code == 200 and r.text:
-                    data = r.json()
-                    fb = data.get("feedback") or data.get("message")
-                    if fb:
-                        feedback_cb(fb)
-                        print(f"  >>> {fb[:60]}...")
-            except Exception:
-                if feedback_cb:
-                    feedback_cb("(No response from Jetson – check connection)")
+        # POST /eeg for immediate feedback (off-thread: a slow Jetson must not stall session tracking)
+        if help_dispatcher:
+            streams_met = ms.metrics if ms and ms.metrics else None
+            body = build_post_eeg_body(req, streams_met=streams_met)
+            help_dispatcher.submit(act.context_id, body)
 
     session_tracker.on_session_event(on_session_event)
 
-    # WebSocket
-    def on_message(ws, message):
-        try:
-            data = json.loads(message)
-            if data.get("type") == "feedback" and feedback_cb:
-                feedback_cb(data.get("feedback", ""))
-        except (json.JSONDecodeError, KeyError):
-            pass
-
-    def on_open(ws):
-        print("  Connected to Jetson")
-
-    def on_close(ws, *args):
-        print("  Disconnected from Jetson")
-
-    ws = websocket.WebSocketApp(
-        jetson_ws_url,
-        on_message=on_message if feedback_cb else None,
-        on_open=on_open,
-        on_close=on_close,
-    )
-    ws_ref["ws"] = ws
-    ws_thread = threading.Thread(target=lambda: ws.run_forever(), daemon=True)
-    ws_thread.start()
+    uplink.start()
 
     time.sleep(1)
 
+    # --- Activity sampler: one detection per tick, fanned out to session tracker (with overlay exclusion) ---
+    def on_activity_sample(ctx):
+        if ctx and not _is_overlay(ctx):
+            last_real_context[0] = ctx
+        # Feed session tracker with last real context when overlay is focused
+        effective = ctx if not _is_overlay(ctx) else last_real_context[0]
+        session_tracker.update(effective)
+        # User moved on: drop help requests still pending for the previous page
+        if effective and help_dispatcher:
+            help_dispatcher.cancel_others(effective.context_id)
+
+    activity.subscribe(on_activity_sample)
+    activity.start()
+
+    # Smoothed values + stable labels (median/EMA + hysteresis) instead of raw per-sample met. The
+    # estimator's label travels on each snapshot (ms.label) to history, payloads and help requests.
+    estimator = MentalStateEstimator() if smooth_met else None
+    to_mental_state = estimator.update if estimator is not None else parse_met_to_mental_state
+
     # --- EEG source ---
     if use_mock_eeg:
-        MOCK_MET = {"met": [True, 0.65, True, 0.42, 0.38, True, 0.55], "time": 0}
         mock_count = [0]
 
         def mock_eeg_loop():
             while running:
                 mock_count[0] += 1
                 t = time.time()
-                met = dict(MOCK_MET)
-                met["time"] = t
                 c = mock_count[0]
-                ms = parse_met_to_mental_state({
+                # One raw met sample per tick: eeg.metrics in both payload shapes, and mental_state's source
+                met = {
                     "met": [
                         True, 0.55 + 0.15 * ((c % 5) / 5),  # eng.isActive, eng
                         True, 0.4, 0.35,                     # exc.isActive, exc, lex
@@ -260,14 +297,19 @@ def run_app(
                         True, 0.5 + 0.2 * ((c % 11) / 11),   # attention.isActive, attention
                     ],
                     "time": t,
-                })
+                }
+                ms = to_mental_state(met)
                 state.set_mental_state(ms)
-                ctx = activity.get_current_activity()
+                ctx = activity.peek()
                 # Overlay exclusion: use last real context for payloads
                 effective_ctx = last_real_context[0] if _is_overlay(ctx) else ctx
-                sess = session_tracker.get_current_session()
-                dur = sess.duration_seconds if sess else None
-                if effective_ctx:
+                if history:
+                    history.record_mental_state(ms, t, effective_ctx.context_id if effective_ctx else None, label=ms.label)
+                dur = session_tracker.dwell_seconds()
+                if effective_ctx and use_frames:
+                    act = _ctx_to_snapshot(effective_ctx, dur)
+                    send_payload(CollectorPayload.frame(t, act, EEGMetricsSnapshot(metrics=met), ms))
+                elif effective_ctx:
                     act = _ctx_to_snapshot(effective_ctx, dur)
                     send_payload(CollectorPayload(type="activity", timestamp=t, activity=act))
                     send_payload(CollectorPayload(
@@ -280,21 +322,36 @@ def run_app(
 
         eeg_thread = threading.Thread(target=mock_eeg_loop, daemon=True)
     else:
-        if not config.EMOTIV_CLIENT_ID or not config.EMOTIV_CLIENT_SECRET:
+        if not replay_path and (not config.EMOTIV_CLIENT_ID or not config.EMOTIV_CLIENT_SECRET):
             print("Error: Real EEG requires EMOTIV_CLIENT_ID and EMOTIV_CLIENT_SECRET in .env")
             sys.exit(1)
         try:
             from eeg import EmotivCortexClient
 
+            store = features = None
+            if use_features:
+                from eeg_features import FeatureExtractor
+                from stream_store import StreamStore
+
+                store = StreamStore()
+                features = FeatureExtractor(store)
+
             def on_metrics(metrics: dict):
                 t = time.time()
-                ms = parse_met_to_mental_state(metrics)
+                ms = to_mental_state(metrics)
+                if features is not None:
+                    ms.features = features.update() or features.latest
                 state.set_mental_state(ms)
-                ctx = activity.get_current_activity()
+                ctx = activity.peek()
                 effective_ctx = last_real_context[0] if _is_overlay(ctx) else ctx
-                sess = session_tracker.get_current_session()
-                if effective_ctx:
-                    act = _ctx_to_snapshot(effective_ctx, sess.duration_seconds if sess else None)
+                if history:
+                    history.record_mental_state(ms, t, effective_ctx.context_id if effective_ctx else None, label=ms.label)
+                dur = session_tracker.dwell_seconds()
+                if effective_ctx and use_frames:
+                    act = _ctx_to_snapshot(effective_ctx, dur)
+                    send_payload(CollectorPayload.frame(t, act, EEGMetricsSnapshot(metrics=metrics), ms))
+                elif effective_ctx:
+                    act = _ctx_to_snapshot(effective_ctx, dur)
                     send_payload(CollectorPayload(
                         type="eeg", timestamp=t,
                         eeg=EEGMetricsSnapshot(metrics=metrics),
@@ -306,19 +363,24 @@ def run_app(
                 client_id=config.EMOTIV_CLIENT_ID,
                 client_secret=config.EMOTIV_CLIENT_SECRET,
                 on_metrics=on_metrics,
-                streams=["met"],
+                streams=["met", "pow", "eeg", "dev"] if use_features else ["met"],
                 profile_name=getattr(config, "EMOTIV_PROFILE", "Elijah"),
+                store=store,
             )
-            emotiv.connect()
-            print(f"  Emotiv Cortex: connecting... (met only, profile={getattr(config, 'EMOTIV_PROFILE', 'Elijah')})")
+            if replay_path:
+                emotiv.replay(replay_path, replay_speed)
+                print(f"  Emotiv Cortex: replaying {replay_path} at {replay_speed or 'max'}x")
+            else:
+                emotiv.connect()
+            print(f"  Emotiv Cortex: {'replay' if replay_path else 'connecting...'} ({'met + pow/eeg/dev features' if use_features else 'met only'}, "
+                  f"profile={getattr(config, 'EMOTIV_PROFILE', 'Elijah')})")
 
             def activity_sender():
                 while running:
-                    ctx = activity.get_current_activity()
+                    ctx = activity.peek()
                     effective_ctx = last_real_context[0] if _is_overlay(ctx) else ctx
                     if effective_ctx:
-                        sess = session_tracker.get_current_session()
-                        dur = sess.duration_seconds if sess else None
+                        dur = session_tracker.dwell_seconds()
                         act = _ctx_to_snapshot(effective_ctx, dur)
                         send_payload(CollectorPayload(type="activity", timestamp=time.time(), activity=act))
                     time.sleep(config.POLL_INTERVAL)
@@ -330,24 +392,10 @@ def run_app(
 
     eeg_thread.start()
 
-    # --- Main poll loop: activity + session tracker (with overlay exclusion) ---
-    def poll_loop():
-        while running:
-            ctx = activity.get_current_activity()
-            if ctx and not _is_overlay(ctx):
-                last_real_context[0] = ctx
-            # Feed session tracker with last real context when overlay is focused
-            effective = ctx if not _is_overlay(ctx) else last_real_context[0]
-            session_tracker.update(effective)
-            time.sleep(poll_interval)
-
-    poll_thread = threading.Thread(target=poll_loop, daemon=True)
-    poll_thread.start()
-
     print("\n--- Focus Agent ---")
     print(f"  Jetson WS: {jetson_ws_url}")
     print(f"  Activity: real (app, window, context type)")
-    print(f"  EEG: {'mock' if use_mock_eeg else 'real Emotiv'}")
+    print(f"  EEG: {'mock' if use_mock_eeg else 'Cortex capture replay' if replay_path else 'real Emotiv'}")
     print(f"  Triggers: warn={warn_sec}s, long={long_sec}s")
     if show_feedback:
         print("  Feedback: overlay window")
@@ -359,6 +407,23 @@ def run_app(
         while running:
             time.sleep(0.5)
 
+    st = uplink.stats()
+    print(f"  WebSocket: {st['sent']} sent, {st['dropped']} dropped, {st['buffered']} unsent, {st['reconnects']} reconnects")
+    session_tracker.close()
+    uplink.stop()
+    if help_dispatcher:
+        st = help_dispatcher.stats()
+        print(f"  Help requests: {st['completed']} ok, {st['failed']} failed, {st['coalesced']} coalesced, "
+              f"{st['cancelled']} cancelled, mean latency {st['latency']['mean'] or 0:.2f}s")
+        help_dispatcher.stop()
+    if estimator is not None and estimator.label is not None:
+        dwell = ", ".join(f"{label} {sec:.0f}s" for label, sec in sorted(estimator.dwell_summary().items()))
+        print(f"  Mental state: {estimator.transitions} label changes ({dwell})")
+    if history:
+        history.end_session(session_tracker.get_current_session())
+        history.close()
+        st = history.stats()
+        print(f"  History: {st['written']} rows written to {history.path}, {st['dropped']} dropped")
     print("\nStopped.")
 
 
@@ -369,7 +434,15 @@ def main():
     p.add_argument("--no-feedback", action="store_true", help="No overlay window")
     p.add_argument("--warn", type=float, default=None, help="Warn threshold (sec). Default: from config or 120.")
     p.add_argument("--long", type=int, default=None, help="Seconds on page before stuck trigger. Default: from config or 180.")
-    p.add_argument("--poll", type=float, default=0.3)
+    p.add_argument("--poll", type=float, default=config.POLL_INTERVAL,
+                   help="Activity sampling interval (sec). Thresholds are timer-driven, so this only bounds context-switch latency")
+    p.add_argument("--frames", action="store_true", help="Send one 'frame' message per tick (activity + eeg + mental_state) instead of three")
+    p.add_argument("--features", action="store_true", help="With --eeg: also subscribe pow/eeg/dev and attach windowed band-power features to mental_state")
+    p.add_argument("--raw-met", action="store_true", help="Send per-sample mental_state values (no median/EMA smoothing)")
+    p.add_argument("--replay-cortex", default=None, metavar="PATH",
+                   help="Feed a Cortex capture (CORTEX_CAPTURE=dir python app.py --eeg) through the EEG pipeline instead of the headset")
+    p.add_argument("--replay-speed", type=float, default=1.0, help="With --replay-cortex: 1 = real time, 0 = as fast as possible")
+    p.add_argument("--no-db", action="store_true", help="Don't record session/help/mental-state history to config.DB_PATH")
     args = p.parse_args()
 
     base = args.url or config.JETSON_BASE.rstrip("/")
@@ -382,12 +455,18 @@ def main():
     run_app(
         jetson_ws_url=ws_url,
         jetson_http_base=base,
-        use_mock_eeg=not args.real_eeg,
+        use_mock_eeg=not (args.real_eeg or args.replay_cortex),
         show_feedback=not args.no_feedback,
         warn_sec=warn_sec,
         long_sec=long_sec,
         follow_up_interval_sec=follow_up,
         poll_interval=args.poll,
+        use_frames=args.frames,
+        use_features=args.features,
+        smooth_met=not args.raw_met,
+        record_history=not args.no_db,
+        replay_path=args.replay_cortex,
+        replay_speed=args.replay_speed,
     )
 
 
@@ -0,0 +1,437 @@
+"""
+asyncio Cortex client: the same request methods as cortex.Cortex, on one event loop, no threads.
+
+cortex.Cortex runs websocket-client on its own thread and chains the startup steps through
+Dispatcher events; EmotivCortexClient wraps that in another thread. AsyncCortex talks to Cortex
+with the `websockets` package on the caller's loop, so one loop can drive Cortex, the Jetson
+uplink and timers:
+- every request method is a coroutine returning the response's "result"; failures raise
+  CortexError / TimeoutError / ConnectionError, and independent requests can be gathered
+- prepare() runs access -> authorize -> headset -> session as plain awaits
+- stream(name) is an async iterator over one stream's decoded samples, through a bounded queue.
+  overflow picks the backpressure policy when the consumer falls behind:
+    "drop_oldest" (default) keep the newest samples, count the dropped ones
+    "drop_newest"           keep the queued samples, count the dropped new ones
+    "block"                 stop reading the socket until there is room (stalls every stream and
+                            response on the connection; Cortex buffers on its side)
+
+Usage:
+  async with AsyncCortex(client_id, client_secret) as cortex:
+      await cortex.prepare()
+      await cortex.subscribe(["met"])
+      async for t, met in cortex.stream("met", maxsize=64):   # stream_format="tuple"
+          ...
+
+Request methods must be called from the loop the client was connected on.
+"""
+import asyncio
+import itertools
+import json
+import ssl
+import warnings
+from pathlib import Path
+
+from cortex import (
+    CORTEX_URL, Cortex, CortexError, CORTEX_STOP_ALL_STREAMS, FIRST_REQUEST_ID, HEADSET_SCANNING_FINISHED,
+    REQUEST_TIMEOUT_SEC, STREAM_EVENTS, decode_stream_message, json_loads, stream_decoders,
+)
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+STREAM_QUEUE_SIZE = 256
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+HEADSET_POLL_SEC = 1.0
+HEADSET_CONNECT_TIMEOUT_SEC = 60.0
+
+_EVENT_STREAMS = {event: key for key, event in STREAM_EVENTS.items()}
+_CLOSED = object()  # end-of-stream marker in a subscription queue
+
+# Request builders shared with cortex.Cortex. They only read the client's fields (auth,
+# session_id, headset_id, ...) and hand the request to self._send(), which here returns an
+# asyncio future instead of a concurrent one.
+_REQUEST_METHODS = (
+    "query_headset", "connect_headset", "request_access", "has_access_right", "get_cortex_info",
+    "unsub_request", "query_profile", "get_current_profile", "setup_profile", "train_request",
+    "query_records", "request_download_records", "stop_record", "inject_marker_request",
+    "update_marker_request", "get_mental_command_action_sensitivity",
+    "set_mental_command_action_sensitivity", "get_mental_command_active_action",
+    "set_mental_command_active_action", "get_mental_command_brain_map",
+    "get_mental_command_training_threshold", "refresh_headset_list", "sync_with_headset_clock",
+)
+
+
+def _certificate_ssl_context():
+    """Emotiv's self-signed root if certificates/rootCA.pem exists, else no verification."""
+    certificate_path = Path(__file__).resolve().parent / "certificates" / "rootCA.pem"
+    if certificate_path.exists():
+        return ssl.create_default_context(cafile=str(certificate_path))
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class StreamSubscription:
+    """Async iterator over one stream's samples (see AsyncCortex.stream)."""
+
+    def __init__(self, cortex, name, maxsize, overflow):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of " + ", ".join(OVERFLOW_POLICIES))
+        self.name = name
+        self.overflow = overflow
+        self.received = 0
+        self.dropped = 0
+        self._cortex = cortex
+        self._queue = asyncio.Queue(maxsize)
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+        item = await self._queue.get()
+        if item is _CLOSED:
+            raise StopAsyncIteration
+        return item
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def close(self):
+        """Stop receiving; the iterator ends after the queued samples."""
+        self._cortex._unregister(self)
+        self._end()
+
+    def _offer(self, item):
+        """Queue without waiting. False only for "block" with a full queue."""
+        if self._closed:
+            return True
+        self.received += 1
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            if self.overflow == "block":
+                return False
+        self.dropped += 1
+        if self.overflow == "drop_oldest":
+            self._queue.get_nowait()
+            self._queue.put_nowait(item)
+        return True
+
+    def _end(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put_nowait(_CLOSED)  # wakes a waiting consumer
+        except asyncio.QueueFull:
+            pass  # nobody is waiting; __anext__ stops once the queue is drained
+
+
+def _borrow(name):
+    build = getattr(Cortex, name)
+
+    async def method(self, *args, **kwargs):
+        future = build(self, *args, **kwargs)
+        return None if future is None else await future
+
+    method.__name__ = name
+    method.__qualname__ = "AsyncCortex." + name
+    method.__doc__ = "Cortex.{0}(), awaited: the response result.".format(name)
+    return method
+
+
+class AsyncCortex:
+    """Cortex JSON-RPC client on asyncio. Same request methods as cortex.Cortex, as coroutines."""
+
+    def __init__(self, client_id, client_secret, debug_mode=False, url=CORTEX_URL, headset_id="",
+                 license="", debit=10, stream_format="dict", request_timeout=REQUEST_TIMEOUT_SEC, ssl_context=None):
+        if client_id == "" or client_secret == "":
+            raise ValueError("Empty client_id / client_secret. Fill in your Cortex app credentials.")
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.debug = debug_mode
+        self.url = url
+        self.headset_id = headset_id
+        self.license = license
+        self.debit = debit
+        self.stream_format = stream_format
+        self.request_timeout = request_timeout
+        self.ssl_context = ssl_context
+        self.auth = ""
+        self.session_id = ""
+        self.record_id = ""
+        self.headset_list = []
+        self.labels = {}  # stream name -> column labels from subscribe()
+        self.on_warning = None  # optional callback(code, message)
+
+        self._stream_decoders = stream_decoders(stream_format)
+        self._ids = itertools.count(FIRST_REQUEST_ID)
+        self._pending = {}  # request id -> (method, future, timeout handle)
+        self._streams = {}  # stream key -> [StreamSubscription]
+        self._outgoing = None
+        self._ws = None
+        self._loop = None
+        self._tasks = []
+
+    # --- connection ---
+
+    async def connect(self):
+        if websockets is None:
+            raise RuntimeError("pip install websockets")
+        self._loop = asyncio.get_running_loop()
+        ssl_context = None
+        if self.url.startswith("wss://"):
+            ssl_context = self.ssl_context or _certificate_ssl_context()
+        self._ws = await websockets.connect(self.url, ssl=ssl_context)
+        self._outgoing = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._read_loop(), name="AsyncCortex.read"),
+            asyncio.create_task(self._write_loop(), name="AsyncCortex.write"),
+        ]
+        return self
+
+    async def close(self):
+        self._shutdown(ConnectionError("Cortex client closed"))  # streams end; samples are discarded from here on
+        for task in self._tasks:
+            task.cancel()  # the reader may be waiting on a full "block" queue
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._ws is not None:
+            # keep reading while closing: with unread frames backed up the close frame is never seen
+            drain = asyncio.create_task(self._discard_incoming())
+            await self._ws.close()
+            drain.cancel()
+            await asyncio.gather(drain, return_exceptions=True)
+
+    async def _discard_incoming(self):
+        try:
+            async for _ in self._ws:
+                pass
+        except websockets.ConnectionClosed:
+            pass
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # --- requests ---
+
+    async def request(self, method, params=None, timeout=None):
+        """Send a JSON-RPC request; returns its result."""
+        request = {"jsonrpc": "2.0", "id": None, "method": method}
+        if params is not None:
+            request["params"] = params
+        return await self._send(request, timeout)
+
+    def _send(self, request, timeout=None):
+        if self._ws is None or self._outgoing is None:
+            raise ConnectionError("AsyncCortex is not connected")
+        req_id = next(self._ids)
+        request["id"] = req_id
+        future = self._loop.create_future()
+        if timeout is None:
+            timeout = self.request_timeout
+        handle = None
+        if timeout is not None:
+            handle = self._loop.call_later(timeout, self._expire, req_id)
+        self._pending[req_id] = (request["method"], future, handle)
+        self._outgoing.put_nowait(json.dumps(request))
+        return future
+
+    def _expire(self, req_id):
+        entry = self._pending.pop(req_id, None)
+        if entry is not None and not entry[1].done():
+            entry[1].set_exception(TimeoutError(entry[0] + " got no response"))
+
+    def _resolve(self, recv_dic):
+        entry = self._pending.pop(recv_dic.get("id"), None)
+        if entry is None:
+            if self.debug:
+                print("No pending request for response " + str(recv_dic.get("id")))
+            return
+        method, future, handle = entry
+        if handle is not None:
+            handle.cancel()
+        if future.done():  # cancelled by the caller
+            return
+        if "error" in recv_dic:
+            future.set_exception(CortexError(method, recv_dic["error"]))
+        else:
+            future.set_result(recv_dic["result"])
+
+    # Requests that update the client's state; the rest are borrowed from Cortex below
+
+    async def authorize(self):
+        result = await Cortex.authorize(self)
+        self.auth = result["cortexToken"]
+        return result
+
+    async def create_session(self):
+        if self.session_id != "":
+            warnings.warn("There is existed session " + self.session_id)
+            return None
+        result = await Cortex.create_session(self)
+        self.session_id = result["id"]
+        return result
+
+    async def close_session(self):
+        result = await Cortex.close_session(self)
+        self.session_id = ""
+        return result
+
+    async def disconnect_headset(self):
+        result = await Cortex.disconnect_headset(self)
+        self.headset_id = ""
+        return result
+
+    async def sub_request(self, stream):
+        result = await Cortex.sub_request(self, stream)
+        for entry in result["success"]:
+            cols = entry["cols"]
+            if entry["streamName"] == "eeg":
+                cols = cols[:-1]  # MARKERS
+            elif entry["streamName"] == "dev":
+                cols = cols[2]
+            self.labels[entry["streamName"]] = cols
+        for entry in result["failure"]:
+            print("The data stream " + entry["streamName"] + " is subscribed unsuccessfully. Because: " + entry["message"])
+        return result
+
+    subscribe = sub_request
+
+    async def create_record(self, title, **kwargs):
+        if len(title) == 0:
+            raise ValueError("Empty record title")
+        result = await Cortex.create_record(self, title, **kwargs)
+        self.record_id = result["record"]["uuid"]
+        return result
+
+    async def export_record(self, folder, stream_types, export_format, record_ids, version, **kwargs):
+        if len(folder) == 0:
+            raise ValueError("Invalid folder parameter. Set a writable destination folder for exporting data.")
+        return await Cortex.export_record(self, folder, stream_types, export_format, record_ids, version, **kwargs)
+
+    # --- startup ---
+
+    async def prepare(self, connect_timeout=HEADSET_CONNECT_TIMEOUT_SEC):
+        """Access right -> authorize -> wanted (or first) headset connected -> session. Returns the session id."""
+        access = await self.has_access_right()
+        if not access["accessGranted"]:
+            access = await self.request_access()
+            if not access["accessGranted"]:
+                raise CortexError("requestAccess", {"message": access.get("message", "access not granted")})
+        await self.authorize()
+        await self.refresh_headset_list()
+        await self.wait_for_headset(connect_timeout)
+        await self.create_session()
+        return self.session_id
+
+    async def wait_for_headset(self, timeout=HEADSET_CONNECT_TIMEOUT_SEC):
+        """Poll queryHeadsets until the wanted headset is connected, connecting it when discovered."""
+        deadline = self._loop.time() + timeout
+        connect_sent = False
+        while True:
+            self.headset_list = await self.query_headset()
+            if self.headset_id == "" and self.headset_list:
+                self.headset_id = self.headset_list[0]["id"]
+            status = next((h["status"] for h in self.headset_list if h["id"] == self.headset_id), None)
+            if status == "connected":
+                return self.headset_id
+            if status == "discovered" and not connect_sent:
+                await self.connect_headset(self.headset_id)
+                connect_sent = True
+            if self._loop.time() >= deadline:
+                raise TimeoutError("headset {0} not connected (status: {1})".format(self.headset_id or "-", status))
+            await asyncio.sleep(HEADSET_POLL_SEC)
+
+    # --- streams ---
+
+    def stream(self, name, maxsize=STREAM_QUEUE_SIZE, overflow="drop_oldest"):
+        """Async iterator over samples of one subscribed stream ('met', 'eeg', 'pow', ...)."""
+        if name not in STREAM_EVENTS:
+            raise ValueError("unknown stream " + repr(name))
+        subscription = StreamSubscription(self, name, maxsize, overflow)
+        self._streams.setdefault(name, []).append(subscription)
+        return subscription
+
+    def _unregister(self, subscription):
+        subs = self._streams.get(subscription.name, [])
+        if subscription in subs:
+            subs.remove(subscription)
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "streams": {
+                name: [{"received": s.received, "dropped": s.dropped, "queued": s.qsize()} for s in subs]
+                for name, subs in self._streams.items()
+            },
+        }
+
+    # --- loops ---
+
+    async def _write_loop(self):
+        while True:
+            text = await self._outgoing.get()
+            await self._ws.send(text)
+
+    async def _read_loop(self):
+        try:
+            async for message in self._ws:
+                recv_dic = json_loads(message)
+                if "sid" in recv_dic:
+                    decoded = decode_stream_message(recv_dic, self._stream_decoders)
+                    if decoded is None:
+                        continue
+                    for subscription in self._streams.get(_EVENT_STREAMS[decoded[0]], ()):
+                        if not subscription._offer(decoded[1]):
+                            await subscription._queue.put(decoded[1])  # "block": wait for the consumer
+                elif "result" in recv_dic or "error" in recv_dic:
+                    self._resolve(recv_dic)
+                elif "warning" in recv_dic:
+                    self._handle_warning(recv_dic["warning"])
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._shutdown(ConnectionError("Cortex connection closed"))
+
+    def _handle_warning(self, warning):
+        code, message = warning.get("code"), warning.get("message")
+        if self.debug:
+            print(warning)
+        if code == CORTEX_STOP_ALL_STREAMS and isinstance(message, dict) and message.get("sessionId") == self.session_id:
+            self.session_id = ""
+            for subs in self._streams.values():
+                for subscription in subs:
+                    subscription._end()
+        elif code == HEADSET_SCANNING_FINISHED and not self.session_id:
+            # keep scanning until a headset connects; nobody awaits this one
+            Cortex.refresh_headset_list(self).add_done_callback(lambda f: f.cancelled() or f.exception())
+        if self.on_warning is not None:
+            self.on_warning(code, message)
+
+    def _shutdown(self, exc):
+        pending, self._pending = self._pending, {}
+        for method, future, handle in pending.values():
+            if handle is not None:
+                handle.cancel()
+            if not future.done():
+                future.set_exception(exc)
+        for subs in self._streams.values():
+            for subscription in subs:
+                subscription._end()
+
+
+for _name in _REQUEST_METHODS:
+    setattr(AsyncCortex, _name, _borrow(_name))
+del _name
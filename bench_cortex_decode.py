@@ -0,0 +1,142 @@
+"""
+Benchmark Cortex.on_message: replay a message log and report messages/sec.
+
+Compares the old path (json.loads + if/elif over every stream + eeg .pop()) with the
+table-driven decoder in each stream_format. JSON decoder in use: orjson > ujson > json.
+
+Log format: one raw Cortex frame (JSON text) per line. Without --log a synthetic
+minute is generated: eeg 128 Hz, mot 32 Hz, pow 8 Hz, met 2 Hz, dev 2 Hz.
+
+Usage:
+  python bench_cortex_decode.py
+  python bench_cortex_decode.py --log cortex_frames.jsonl --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import cortex
+from cortex import Cortex
+
+EEG_CHANNELS = ["AF3", "F7", "F3", "FC5", "T7", "P7", "O1", "O2", "P8", "T8", "FC6", "F4", "F8", "AF4"]
+
+
+def synthetic_log(seconds: int = 60) -> list[str]:
+    rnd = random.Random(0)
+    t0 = 1739612345.0
+    frames = []
+    rates = {"eeg": 128, "mot": 32, "pow": 8, "met": 2, "dev": 2}
+    for stream, hz in rates.items():
+        for i in range(seconds * hz):
+            t = t0 + i / hz
+            if stream == "eeg":
+                values = [i % 128, 0] + [round(rnd.uniform(4000, 4400), 6) for _ in EEG_CHANNELS] + [0, 0, []]
+            elif stream == "mot":
+                values = [i, 0] + [round(rnd.uniform(-1, 1), 6) for _ in range(10)]
+            elif stream == "pow":
+                values = [round(rnd.uniform(0, 20), 3) for _ in range(len(EEG_CHANNELS) * 5)]
+            elif stream == "met":
+                values = [True, rnd.random(), True, rnd.random(), rnd.random(), True, rnd.random(),
+                          True, rnd.random(), True, rnd.random(), True, rnd.random()]
+            else:
+                values = [4, 2, [4] * len(EEG_CHANNELS), 90]
+            frames.append((t, json.dumps({"sid": "c1a5c7b2-0000-4000-8000-000000000000", "time": t, stream: values})))
+    frames.sort()
+    return [f for _, f in frames]
+
+
+class LegacyCortex(Cortex):
+    """The previous on_message/handle_stream_data, kept here for comparison."""
+
+    def on_message(self, *args):
+        recv_dic = json.loads(args[1])
+        if 'sid' in recv_dic:
+            self.handle_stream_data(recv_dic)
+        elif 'result' in recv_dic:
+            self.handle_result(recv_dic)
+        elif 'error' in recv_dic:
+            self.handle_error(recv_dic)
+        elif 'warning' in recv_dic:
+            self.handle_warning(recv_dic['warning'])
+        else:
+            raise KeyError
+
+    def handle_stream_data(self, result_dic):
+        if result_dic.get('com') != None:
+            self.emit('new_com_data', data={'action': result_dic['com'][0], 'power': result_dic['com'][1], 'time': result_dic['time']})
+        elif result_dic.get('fac') != None:
+            fac = result_dic['fac']
+            self.emit('new_fe_data', data={'eyeAct': fac[0], 'uAct': fac[1], 'uPow': fac[2], 'lAct': fac[3], 'lPow': fac[4], 'time': result_dic['time']})
+        elif result_dic.get('eeg') != None:
+            eeg_data = {}
+            eeg_data['eeg'] = result_dic['eeg']
+            eeg_data['eeg'].pop()
+            eeg_data['time'] = result_dic['time']
+            self.emit('new_eeg_data', data=eeg_data)
+        elif result_dic.get('mot') != None:
+            self.emit('new_mot_data', data={'mot': result_dic['mot'], 'time': result_dic['time']})
+        elif result_dic.get('dev') != None:
+            dev = result_dic['dev']
+            self.emit('new_dev_data', data={'signal': dev[1], 'dev': dev[2], 'batteryPercent': dev[3], 'time': result_dic['time']})
+        elif result_dic.get('met') != None:
+            self.emit('new_met_data', data={'met': result_dic['met'], 'time': result_dic['time']})
+        elif result_dic.get('pow') != None:
+            self.emit('new_pow_data', data={'pow': result_dic['pow'], 'time': result_dic['time']})
+        elif result_dic.get('sys') != None:
+            self.emit('new_sys_data', data=result_dic['sys'])
+
+
+def _quiet(cls, **kwargs):
+    # Cortex.__init__ prints every kwarg; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return cls("bench", "bench", **kwargs)
+
+
+def run(client: Cortex, frames: list[str], repeat: int) -> float:
+    received = [0]
+
+    def sink(*args, **kwargs):
+        received[0] += 1
+
+    client.bind(**{event: sink for event in cortex.STREAM_EVENTS.values()})
+    on_message = client.on_message
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            on_message(None, frame)
+    elapsed = time.perf_counter() - t0
+    assert received[0] == len(frames) * repeat, received[0]
+    return len(frames) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Cortex frames through on_message")
+    parser.add_argument("--log", help="JSON-lines file of raw Cortex frames (default: synthetic)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.log:
+        frames = [line for line in Path(args.log).read_text().splitlines() if '"sid"' in line]
+    else:
+        frames = synthetic_log()
+    print(f"{len(frames)} stream frames x {args.repeat}, JSON decoder: {cortex.json_loads.__module__}")
+
+    rows = [("legacy (json + if/elif)", lambda: _quiet(LegacyCortex))]
+    for fmt in cortex.STREAM_FORMATS:
+        if fmt == "numpy" and cortex.np is None:
+            continue
+        rows.append((f"table, {fmt}", lambda fmt=fmt: _quiet(Cortex, stream_format=fmt)))
+    for name, make in rows:
+        rate = run(make(), frames, args.repeat)
+        print(f"  {name:24s} {rate:10,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark windowed EEG features: incremental FeatureExtractor vs naive per-window recompute.
+
+Feeds a synthetic session (eeg 128 Hz x 14 channels, pow 8 Hz x 70 band columns, dev 2 Hz)
+into a StreamStore and, every hop, either updates the running window sums (FeatureExtractor)
+or recomputes mean/var over the whole window from the ring (naive). Reports time per hop.
+
+Usage:
+  python bench_eeg_features.py
+  python bench_eeg_features.py --window 4 --hop 0.5 --minutes 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from eeg_features import BANDS, EEG_NON_CHANNELS, FeatureExtractor
+from stream_store import StreamStore
+
+CHANNELS = ["AF3", "F7", "F3", "FC5", "T7", "P7", "O1", "O2", "P8", "T8", "FC6", "F4", "F8", "AF4"]
+EEG_LABELS = ["COUNTER", "INTERPOLATED"] + CHANNELS + ["RAW_CQ", "MARKER_HARDWARE"]
+POW_LABELS = [f"{ch}/{band}" for ch in CHANNELS for band in BANDS]
+
+
+def make_store(seconds: float) -> StreamStore:
+    store = StreamStore(seconds=seconds, rates={"eeg": 128})
+    store._on_labels(data={"streamName": "eeg", "labels": EEG_LABELS})
+    store._on_labels(data={"streamName": "pow", "labels": POW_LABELS})
+    store._on_labels(data={"streamName": "dev", "labels": CHANNELS})
+    return store
+
+
+def naive_features(store: StreamStore, window_sec: float) -> dict:
+    """Same statistics, recomputed from every sample in the window."""
+    pow_ring = store.ring("pow")
+    _, x = pow_ring.last(window_sec)
+    grid = np.array([[pow_ring.column(f"{ch}/{b}") for ch in CHANNELS] for b in BANDS])
+    means, vars_ = x.mean(axis=0)[grid], x.var(axis=0)[grid]
+    row = store.ring("dev").last_samples(1)[1][0]
+    w = np.clip(row / 4.0, 0, 1)
+    bp = means @ w / w.sum()
+    eeg_ring = store.ring("eeg")
+    cols = [i for i, label in enumerate(eeg_ring.labels) if label not in EEG_NON_CHANNELS]
+    _, e = eeg_ring.last(window_sec)
+    alpha = means[1]
+    return {
+        "band_power": dict(zip(BANDS, bp.tolist())),
+        "band_var": dict(zip(BANDS, (vars_ @ w / w.sum()).tolist())),
+        "theta_beta_ratio": bp[0] / (bp[2] + bp[3]),
+        "alpha_asymmetry": float(np.log(alpha[CHANNELS.index("F4")]) - np.log(alpha[CHANNELS.index("F3")])),
+        "eeg_var": float(e[:, cols].var(axis=0).mean()),
+    }
+
+
+def run(mode: str, minutes: float, window_sec: float, hop_sec: float) -> tuple[float, int, dict]:
+    rng = np.random.default_rng(0)
+    store = make_store(seconds=window_sec * 2 + 2)
+    fx = FeatureExtractor(store, window_sec=window_sec, hop_sec=hop_sec)
+    spent, hops, last = 0.0, 0, {}
+    next_hop = window_sec
+    eeg_block = rng.normal(4200, 30, size=(16, len(EEG_LABELS)))
+    for tick in range(int(minutes * 60 * 8)):  # one pow sample per tick
+        t = tick / 8
+        for k in range(16):  # 128 Hz eeg
+            store.add("eeg", (t + k / 128, eeg_block[k]))
+        store.add("pow", (t, rng.uniform(1, 10, len(POW_LABELS))))
+        if tick % 4 == 0:
+            store.add("dev", {"dev": [4] * len(CHANNELS), "time": t})
+        if t + 1e-9 < next_hop:
+            continue
+        next_hop += hop_sec
+        t0 = time.perf_counter()
+        if mode == "incremental":
+            last = fx.update(force=True)
+        else:
+            last = naive_features(store, window_sec)
+        spent += time.perf_counter() - t0
+        hops += 1
+    return spent / hops * 1e6, hops, last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental vs naive windowed EEG features")
+    parser.add_argument("--minutes", type=float, default=3)
+    parser.add_argument("--window", type=float, default=30.0, help="Window length (s)")
+    parser.add_argument("--hop", type=float, default=0.25, help="Hop (s)")
+    args = parser.parse_args()
+
+    print(f"{args.minutes} min, window {args.window}s, hop {args.hop}s")
+    results = {}
+    for mode in ("naive", "incremental"):
+        us, hops, last = run(mode, args.minutes, args.window, args.hop)
+        results[mode] = last
+        print(f"  {mode:12s} {us:8.1f} us/hop  ({hops} hops)")
+    a, b = results["naive"], results["incremental"]
+    ok = all(np.isclose(a["band_power"][k], b["band_power"][k]) for k in BANDS) and np.isclose(a["eeg_var"], b["eeg_var"])
+    print(f"  results match: {ok}")
+
+
+if __name__ == "__main__":
+    main()
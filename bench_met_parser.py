@@ -0,0 +1,89 @@
+"""
+Throughput of met parsing: the old per-sample parse (indices rebuilt from cols every call)
+vs MetParser with indices resolved once, and MetParser.parse_batch into columns.
+
+Usage:
+  python bench_met_parser.py
+  python bench_met_parser.py --samples 200000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from data_schema import MentalStateSnapshot
+from mental_state_parser import FALLBACK_INDICES, MetParser, _indices_from_cols, np, parse_met_to_mental_state
+
+COLS = ["eng.isActive", "eng", "exc.isActive", "exc", "lex", "str.isActive", "str",
+        "rel.isActive", "rel", "int.isActive", "int", "attention.isActive", "attention"]
+
+
+def legacy_parse(metrics: dict) -> MentalStateSnapshot:
+    """parse_met_to_mental_state before MetParser."""
+    met_arr = metrics.get("met")
+    if not met_arr or not isinstance(met_arr, (list, tuple)):
+        return MentalStateSnapshot(metrics=metrics)
+    cols = metrics.get("cols")
+    indices = _indices_from_cols(cols) if cols else FALLBACK_INDICES
+    arr = met_arr
+
+    def _val(label: str):
+        idx = indices.get(label)
+        if idx is not None and 0 <= idx < len(arr):
+            v = arr[idx]
+            if v is not None and not isinstance(v, bool):
+                try:
+                    return float(v)
+                except (TypeError, ValueError):
+                    pass
+        return None
+
+    return MentalStateSnapshot(
+        engagement=_val("eng"), stress=_val("str") or _val("cognitiveStress"),
+        relaxation=_val("rel"), focus=_val("attention") or _val("foc"),
+        excitement=_val("exc"), interest=_val("int"), metrics=metrics,
+    )
+
+
+def samples(n: int) -> list[dict]:
+    rnd = random.Random(0)
+    out = []
+    for i in range(n):
+        met = [True, rnd.random(), True, rnd.random(), rnd.random(), True, rnd.random(),
+               True, rnd.random(), rnd.random() > 0.1, rnd.random(), True, rnd.random()]
+        out.append({"met": met, "time": 1739612345.0 + i * 0.5, "cols": COLS})
+    return out
+
+
+def rate(fn, data) -> float:
+    t0 = time.perf_counter()
+    fn(data)
+    return len(data) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="met parsing throughput")
+    parser.add_argument("--samples", type=int, default=100000)
+    args = parser.parse_args()
+    data = samples(args.samples)
+
+    assert all(legacy_parse(m) == parse_met_to_mental_state(m) for m in data[:1000])
+    compiled = MetParser(COLS)
+    rows = [
+        ("legacy parse (per call)", lambda d: [legacy_parse(m) for m in d]),
+        ("parse_met_to_mental_state", lambda d: [parse_met_to_mental_state(m) for m in d]),
+        ("MetParser.parse", lambda d: [compiled.parse(m) for m in d]),
+        ("MetParser.values", lambda d: [compiled.values(m["met"]) for m in d]),
+    ]
+    if np is not None:
+        rows.append(("MetParser.parse_batch", lambda d: compiled.parse_batch([m["met"] for m in d], [m["time"] for m in d])))
+    print(f"{args.samples} met samples")
+    for name, fn in rows:
+        print(f"  {name:28s} {rate(fn, data):12,.0f} samples/s")
+
+
+if __name__ == "__main__":
+    main()
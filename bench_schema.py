@@ -0,0 +1,119 @@
+"""
+Micro-benchmark: per-tick cost of building + serializing the activity part of a payload.
+
+"before" re-creates the plain dataclasses and rebuilds the activity dict every tick (the old
+_ctx_to_snapshot + to_dict); "after" uses the slotted ActivitySnapshot and its to_dict().
+Reports time per tick and bytes allocated per tick (tracemalloc).
+
+Usage:
+  python bench_schema.py
+  python bench_schema.py --ticks 50000 --tick-sec 0.1
+  python bench_schema.py --tick-sec 0     # duration unchanged (collector.py sends none)
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity import ActivityContext
+from data_schema import ActivitySnapshot, CollectorPayload
+
+
+@dataclass
+class LegacyActivitySnapshot:
+    app_name: str = ""
+    window_title: str = ""
+    context_type: str = ""
+    context_id: str = ""
+    reading_section: Optional[str] = None
+    duration_seconds: Optional[float] = None
+
+
+@dataclass
+class LegacyCollectorPayload:
+    type: str
+    timestamp: float = 0.0
+    eeg: Optional[dict] = None
+    mental_state: Optional[dict] = None
+    mental_command: Optional[dict] = None
+    activity: Optional[LegacyActivitySnapshot] = None
+
+    def to_dict(self) -> dict:
+        d = {"type": self.type, "timestamp": self.timestamp}
+        if self.activity:
+            d["activity"] = {
+                "app_name": self.activity.app_name,
+                "window_title": self.activity.window_title,
+                "context_type": self.activity.context_type,
+                "context_id": self.activity.context_id,
+                "reading_section": self.activity.reading_section,
+                "duration_seconds": self.activity.duration_seconds,
+            }
+        return d
+
+
+def legacy_tick(ctx, dur: float) -> dict:
+    act = LegacyActivitySnapshot(
+        app_name=ctx.app_name, window_title=ctx.window_title, context_type=ctx.context_type,
+        context_id=ctx.context_id, reading_section=ctx.reading_section, duration_seconds=dur,
+    )
+    return LegacyCollectorPayload(type="activity", timestamp=0.0, activity=act).to_dict()
+
+
+def new_tick(ctx, dur: float) -> dict:
+    act = ActivitySnapshot(
+        app_name=ctx.app_name, window_title=ctx.window_title, context_type=ctx.context_type,
+        context_id=ctx.context_id, reading_section=ctx.reading_section, duration_seconds=dur,
+    )
+    return CollectorPayload(type="activity", timestamp=0.0, activity=act).to_dict()
+
+
+def measure(tick, ctx, ticks: int, tick_sec: float, sends_per_tick: int) -> tuple[float, float]:
+    """(microseconds per tick, bytes allocated per tick). Each tick builds sends_per_tick payloads."""
+    keep = []  # hold results like a send buffer would, so allocations are not freed immediately
+    t0 = time.perf_counter()
+    for i in range(ticks):
+        for _ in range(sends_per_tick):
+            keep.append(tick(ctx, i * tick_sec))
+        if len(keep) > 256:
+            keep.clear()
+    elapsed = time.perf_counter() - t0
+    keep.clear()
+
+    tracemalloc.start()
+    total = 0
+    for i in range(min(ticks, 2000)):
+        snap0 = tracemalloc.get_traced_memory()[0]
+        for _ in range(sends_per_tick):
+            keep.append(tick(ctx, i * tick_sec))
+        total += tracemalloc.get_traced_memory()[0] - snap0
+        if len(keep) > 256:
+            keep.clear()
+    tracemalloc.stop()
+    return elapsed / ticks * 1e6, total / min(ticks, 2000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-tick schema build/serialize benchmark")
+    parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--tick-sec", type=float, default=1.0, help="Duration step per tick")
+    parser.add_argument("--sends", type=int, default=2, help="Activity snapshots built per tick (frame + reading_help etc.)")
+    args = parser.parse_args()
+
+    ctx = ActivityContext(
+        app_name="Google Chrome", window_title="Lecture 5 — Backprop", context_type="lecture",
+        context_id="Google Chrome::Lecture 5 — Backprop", reading_section="chain-rule",
+    )
+    print(f"{args.ticks} ticks, duration step {args.tick_sec}s, {args.sends} snapshot(s) per tick")
+    for name, tick in (("before", legacy_tick), ("after", new_tick)):
+        us, alloc = measure(tick, ctx, args.ticks, args.tick_sec, args.sends)
+        print(f"  {name:6s}  {us:7.2f} us/tick   {alloc:7.0f} B allocated/tick")
+
+
+if __name__ == "__main__":
+    main()
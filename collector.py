@@ -26,6 +26,7 @@ except ImportError:
 import config
 from data_schema import CollectorPayload, EEGMetricsSnapshot, MentalStateSnapshot, ActivitySnapshot
 from activity import ActivityMonitor
+from ws_uplink import WebSocketUplink
 
 
 def run_collector(jetson_url: str, show_feedback: bool = False):
@@ -34,26 +35,32 @@ def run_collector(jetson_url: str, show_feedback: bool = False):
         print("Error: pip install websocket-client")
         sys.exit(1)
 
-    ws_ref = {"ws": None}
     emotiv_client = [None]
     activity = ActivityMonitor(poll_interval=config.POLL_INTERVAL)
+    activity.start()
 
     if not config.EMOTIV_CLIENT_ID or not config.EMOTIV_CLIENT_SECRET:
         print("Error: Set client_id and client_secret in .env (or EMOTIV_CLIENT_ID, EMOTIV_CLIENT_SECRET)")
         sys.exit(1)
 
+    # Buffers until connected (and while reconnecting); replays in order
+    uplink = WebSocketUplink(
+        jetson_url,
+        on_open=lambda: print("  Connected to Jetson"),
+        on_close=lambda: print("  Disconnected from Jetson"),
+    )
+
     def send_payload(payload: CollectorPayload):
-        if ws_ref["ws"] and ws_ref["ws"].sock and ws_ref["ws"].sock.connected:
-            try:
-                ws_ref["ws"].send(json.dumps(payload.to_dict()))
-            except Exception as e:
-                print("  Send error:", e)
+        try:
+            uplink.send(payload)
+        except Exception as e:
+            print("  Send error:", e)
 
     try:
         from eeg import EmotivCortexClient
 
         def on_eeg_metrics(metrics: dict):
-            ctx = activity.get_current_activity()
+            ctx = activity.peek()
             act = None
             if ctx:
                 act = ActivitySnapshot(
@@ -107,33 +114,15 @@ def run_collector(jetson_url: str, show_feedback: bool = False):
         feedback_cb = win.update_feedback
         win.root.protocol("WM_DELETE_WINDOW", lambda: (stop(), win.root.destroy()))
 
-    def connect_ws():
-        def on_message(ws, message):
-            try:
-                data = json.loads(message)
-                if data.get("type") == "feedback" and feedback_cb:
-                    feedback_cb(data.get("feedback", ""))
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        def on_open(ws):
-            print("  Connected to Jetson")
-
-        def on_close(ws, close_status, close_msg):
-            print("  Disconnected from Jetson")
-
-        def on_error(ws, err):
-            print("  WebSocket error:", err)
-
-        ws = websocket.WebSocketApp(
-            jetson_url,
-            on_message=on_message if feedback_cb else None,
-            on_open=on_open,
-            on_close=on_close,
-            on_error=on_error,
-        )
-        ws_ref["ws"] = ws
-        return ws
+    def on_message(message):
+        try:
+            data = json.loads(message)
+            if data.get("type") == "feedback" and feedback_cb:
+                feedback_cb(data.get("feedback", ""))
+        except (json.JSONDecodeError, KeyError):
+            pass
+
+    uplink.on_message = on_message if feedback_cb else None
 
     print("EEG Collector starting...")
     print(f"  Target: {jetson_url}")
@@ -145,7 +134,7 @@ def run_collector(jetson_url: str, show_feedback: bool = False):
     def activity_sender():
         """Send monitoring/activity to backend at steady rate (EEG can be sparse)."""
         while running:
-            ctx = activity.get_current_activity()
+            ctx = activity.peek()
             if ctx:
                 act = ActivitySnapshot(
                     app_name=ctx.app_name,
@@ -157,10 +146,7 @@ def run_collector(jetson_url: str, show_feedback: bool = False):
                 send_payload(CollectorPayload(type="activity", timestamp=time.time(), activity=act))
             time.sleep(config.POLL_INTERVAL)
 
-    ws = connect_ws()
-    ws_thread = threading.Thread(target=lambda: ws.run_forever())
-    ws_thread.daemon = True
-    ws_thread.start()
+    uplink.start()
     act_thread = threading.Thread(target=activity_sender)
     act_thread.daemon = True
     act_thread.start()
@@ -175,7 +161,9 @@ def run_collector(jetson_url: str, show_feedback: bool = False):
 
     if emotiv_client[0]:
         emotiv_client[0].close()
-    print("\nStopped.")
+    st = uplink.stats()
+    uplink.stop()
+    print(f"\nStopped. WebSocket: {st['sent']} sent, {st['dropped']} dropped, {st['buffered']} unsent")
 
 
 def main():
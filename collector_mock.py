@@ -21,17 +21,17 @@ except ImportError:
 import config
 from data_schema import CollectorPayload, EEGMetricsSnapshot, MentalStateSnapshot, ActivitySnapshot
 from activity import ActivityMonitor
+from ws_uplink import WebSocketUplink
 
 # Mock data (real format from Emotiv)
 MOCK_MET = {"met": [True, 0.65, True, 0.42, 0.38, True, 0.55, True, 0.72, True, 0.48, True, 0.58], "time": 0}
 
 
-def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: float = 2.0):
+def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: float = 2.0, frames: bool = False):
     if not websocket:
         print("Error: pip install websocket-client")
         sys.exit(1)
 
-    ws_ref = {"ws": None}
     running = True
 
     def stop(_=None, __=None):
@@ -51,14 +51,14 @@ def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: f
         win.root.protocol("WM_DELETE_WINDOW", lambda: (stop(), win.root.destroy()))
 
     def send_payload(payload: CollectorPayload):
-        if ws_ref["ws"] and ws_ref["ws"].sock and ws_ref["ws"].sock.connected:
-            try:
-                ws_ref["ws"].send(json.dumps(payload.to_dict()))
+        # Buffered while disconnected; replayed in order on reconnect
+        try:
+            if uplink.send(payload):
                 print("  Sent:", payload.type)
-            except Exception as e:
-                print("  Send error:", e)
+        except Exception as e:
+            print("  Send error:", e)
 
-    def on_message(ws, message):
+    def on_message(message):
         try:
             data = json.loads(message)
             if data.get("type") == "feedback" and feedback_cb:
@@ -67,6 +67,13 @@ def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: f
         except (json.JSONDecodeError, KeyError):
             pass
 
+    uplink = WebSocketUplink(
+        jetson_url,
+        on_message=on_message if feedback_cb else None,
+        on_open=lambda: print("  Connected to Jetson"),
+        on_close=lambda: print("  Disconnected"),
+    )
+
     def _make_activity_snapshot():
         ctx = activity.get_current_activity()
         if not ctx:
@@ -86,6 +93,25 @@ def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: f
             t = time.time()
             act = _make_activity_snapshot()
 
+            if frames:
+                # One message: activity + eeg + mental state, raw met carried once
+                met = dict(MOCK_MET)
+                met["time"] = t
+                send_payload(CollectorPayload.frame(
+                    t,
+                    activity=act,
+                    eeg=EEGMetricsSnapshot(metrics=met),
+                    mental_state=MentalStateSnapshot(
+                        engagement=0.55 + 0.15 * ((count % 5) / 5),
+                        stress=0.35 + 0.2 * ((count % 7) / 7),
+                        relaxation=0.4 + 0.2 * ((count % 3) / 3),
+                        focus=0.5 + 0.2 * ((count % 11) / 11),
+                        metrics=met,
+                    ),
+                ))
+                time.sleep(interval)
+                continue
+
             # 1. Activity/monitoring (dedicated payload so backend always gets it)
             if act:
                 send_payload(CollectorPayload(type="activity", timestamp=t, activity=act))
@@ -117,14 +143,6 @@ def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: f
 
             time.sleep(interval)
 
-    ws = websocket.WebSocketApp(
-        jetson_url,
-        on_message=on_message if feedback_cb else None,
-        on_open=lambda ws: print("  Connected to Jetson"),
-        on_close=lambda ws, a, b: print("  Disconnected"),
-        on_error=lambda ws, err: print("  WebSocket error:", err),
-    )
-    ws_ref["ws"] = ws
 
     print("Mock Collector starting...")
     print(f"  Target: {jetson_url}")
@@ -133,8 +151,7 @@ def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: f
         print("  Feedback window: open")
     print("  Ctrl+C or close window to stop\n")
 
-    ws_thread = threading.Thread(target=lambda: ws.run_forever(), daemon=True)
-    ws_thread.start()
+    uplink.start()
     sender_thread = threading.Thread(target=mock_sender, daemon=True)
     sender_thread.start()
 
@@ -149,7 +166,9 @@ def run_mock_collector(jetson_url: str, show_feedback: bool = False, interval: f
         except KeyboardInterrupt:
             stop()
 
-    print("\nStopped.")
+    st = uplink.stats()
+    uplink.stop()
+    print(f"\nStopped. WebSocket: {st['sent']} sent, {st['dropped']} dropped, {st['buffered']} unsent")
 
 
 def main():
@@ -157,8 +176,9 @@ def main():
     p.add_argument("--url", default=config.JETSON_WS_URL, help="WebSocket URL")
     p.add_argument("--show-feedback", action="store_true", help="Show feedback overlay")
     p.add_argument("--interval", type=float, default=2.0, help="Send interval (seconds)")
+    p.add_argument("--frames", action="store_true", help="Send one 'frame' message per tick instead of three")
     args = p.parse_args()
-    run_mock_collector(args.url, show_feedback=args.show_feedback, interval=args.interval)
+    run_mock_collector(args.url, show_feedback=args.show_feedback, interval=args.interval, frames=args.frames)
 
 
 if __name__ == "__main__":
@@ -21,13 +21,40 @@ except ImportError:
     sys.exit(1)
 # --- END: Simplified environment checks ---
 
+import itertools
+import os
 import threading
 import ssl
 import time
 import json
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError
 from datetime import datetime
 from pathlib import Path
 
+from cortex_capture import CaptureWriter
+from scheduler import default_scheduler
+
+# Optional faster JSON decoder for incoming frames (stream data arrives at up to 256 Hz)
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        json_loads = ujson.loads
+    except ImportError:
+        json_loads = json.loads
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Cortex service URL; point it at cortex_simulator.py (e.g. ws://127.0.0.1:6868) to run without a Launcher
+CORTEX_URL = os.environ.get('CORTEX_URL', 'wss://localhost:6868')
+CORTEX_CAPTURE = os.environ.get('CORTEX_CAPTURE')  # directory: capture inbound frames (see cortex_capture.py)
+
 # define request id
 QUERY_HEADSET_ID                    =   1
 CONNECT_HEADSET_ID                  =   2
@@ -57,6 +84,26 @@ REFRESH_HEADSET_LIST_ID             =   25
 QUERY_RECORDS_ID                    =   26
 REQUEST_DOWNLOAD_RECORDS_ID         =   27
 SYNC_WITH_HEADSET_CLOCK_ID          =   28
+UPDATE_SESSION_ID                   =   29
+
+# The ids above name the response handler; the id actually sent is allocated per request
+# (starting above them), so two outstanding requests of the same kind never collide.
+FIRST_REQUEST_ID = 1000
+REQUEST_TIMEOUT_SEC = 30.0
+# Timed-out requests remembered so a late response still reaches its handler (the startup chain
+# moves on from handlers, so a slow exportRecord or createSession must not be dropped)
+EXPIRED_KEEP = 64
+
+# Headset discovery: driven by queryHeadsets results and warnings 102/103/104/142. While a headset
+# is being looked for or connected, queryHeadsets is re-sent on a timer (0.5, 1, 2, 4, 5, 5, ... s)
+# in case the warning that would move things on never comes.
+HEADSET_IDLE = 'idle'
+HEADSET_SCANNING = 'scanning'      # no (wanted) headset in the list yet
+HEADSET_CONNECTING = 'connecting'  # controlDevice connect sent / Cortex reports connecting
+HEADSET_CONNECTED = 'connected'
+HEADSET_RETRY_SEC = 0.5
+HEADSET_RETRY_BACKOFF = 2.0
+HEADSET_RETRY_MAX_SEC = 5.0
 
 #define error_code
 ERR_PROFILE_ACCESS_DENIED = -32046
@@ -82,6 +129,101 @@ HEADSET_CANNOT_WORK_WITH_BTLE = 112
 HEADSET_CANNOT_CONNECT_DISABLE_MOTION = 113
 HEADSET_SCANNING_FINISHED = 142
 
+# --- stream data decoding ---
+# Each stream message is {"sid": ..., "time": ..., "<stream>": [...]}. The decoders below map the
+# stream key straight to (event name, decode(values, time)) instead of probing every stream in turn.
+# Formats:
+#   'dict'  - same dicts as before, e.g. {'eeg': [...], 'time': t} (default)
+#   'tuple' - (time, values) with no per-sample dict; eeg values exclude MARKERS
+#   'numpy' - like 'tuple', but eeg/mot/pow/met values are float64 rows (None -> nan)
+# The incoming list is never mutated (eeg MARKERS are sliced off, not popped).
+STREAM_FORMATS = ('dict', 'tuple', 'numpy')
+STREAM_EVENTS = {
+    'com': 'new_com_data', 'fac': 'new_fe_data', 'eeg': 'new_eeg_data', 'mot': 'new_mot_data',
+    'dev': 'new_dev_data', 'met': 'new_met_data', 'pow': 'new_pow_data', 'sys': 'new_sys_data',
+}
+
+_DICT_DECODERS = {
+    'com': lambda v, t: {'action': v[0], 'power': v[1], 'time': t},
+    'fac': lambda v, t: {'eyeAct': v[0], 'uAct': v[1], 'uPow': v[2], 'lAct': v[3], 'lPow': v[4], 'time': t},
+    'eeg': lambda v, t: {'eeg': v[:-1], 'time': t},  # drop MARKERS
+    'mot': lambda v, t: {'mot': v, 'time': t},
+    'dev': lambda v, t: {'signal': v[1], 'dev': v[2], 'batteryPercent': v[3], 'time': t},
+    'met': lambda v, t: {'met': v, 'time': t},
+    'pow': lambda v, t: {'pow': v, 'time': t},
+    'sys': lambda v, t: v,
+}
+
+
+def _float_row(values):
+    """Row of numbers/bools/None as float64 (None -> nan)."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except TypeError:
+        return np.array([np.nan if x is None else x for x in values], dtype=np.float64)
+
+
+def stream_decoders(stream_format='dict'):
+    """Table: stream key -> (event name, decode(values, time))."""
+    if stream_format not in STREAM_FORMATS:
+        raise ValueError('stream_format must be one of ' + ', '.join(STREAM_FORMATS))
+    if stream_format == 'dict':
+        decoders = dict(_DICT_DECODERS)
+    else:
+        decoders = {key: (lambda v, t: (t, v)) for key in STREAM_EVENTS}
+        decoders['eeg'] = lambda v, t: (t, v[:-1])
+        decoders['sys'] = _DICT_DECODERS['sys']
+        if stream_format == 'numpy':
+            if np is None:
+                raise RuntimeError("stream_format='numpy' needs numpy (pip install numpy)")
+            decoders['eeg'] = lambda v, t: (t, np.array(v[:-1], dtype=np.float64))
+            for key in ('mot', 'pow', 'met'):
+                decoders[key] = lambda v, t: (t, _float_row(v))
+    return {key: (STREAM_EVENTS[key], decode) for key, decode in decoders.items()}
+
+
+def decode_stream_message(recv_dic, decoders):
+    """(event name, data) for a stream message, or None if it carries no known stream."""
+    for key in recv_dic:
+        entry = decoders.get(key)
+        if entry is not None:
+            event, decode = entry
+            return event, decode(recv_dic[key], recv_dic.get('time'))
+    return None
+
+
+class CortexError(Exception):
+    """JSON-RPC error response to a request."""
+
+    def __init__(self, method, error):
+        self.method = method
+        self.error = error
+        self.code = error.get('code') if isinstance(error, dict) else None
+        message = error.get('message') if isinstance(error, dict) else error
+        super().__init__('{0} failed ({1}): {2}'.format(method, self.code, message))
+
+
+class _PendingRequest:
+    """Outstanding request: method, legacy handler id, future for the result, timeout timer."""
+
+    __slots__ = ('method', 'handler_id', 'future', 'timer')
+
+    def __init__(self, method, handler_id):
+        self.method = method
+        self.handler_id = handler_id
+        self.future = Future()
+        self.timer = None
+
+    def resolve(self, result=None, exc=None):
+        try:
+            if exc is None:
+                self.future.set_result(result)
+            else:
+                self.future.set_exception(exc)
+        except InvalidStateError:  # cancelled by the caller
+            pass
+
+
 class Cortex(Dispatcher):
 
     _events_ = ['inform_error', 'authorize_done', 'create_session_done', 'query_profile_done', 'load_unload_profile_done', 
@@ -103,6 +245,11 @@ class Cortex(Dispatcher):
                 debit (int, optional): Debit value for usage.
                 headset_id (str, optional): ID of the headset to connect.
                 auto_create_session (bool, optional): Automatically create session if True. For export and query records, don't need to create session.
+                stream_format (str, optional): 'dict' (default), 'tuple' or 'numpy'. Shape of the data passed to new_*_data events.
+                request_timeout (float, optional): Seconds before an unanswered request fails with TimeoutError. None waits forever.
+                url (str, optional): Cortex service URL. Defaults to CORTEX_URL (env CORTEX_URL, else wss://localhost:6868).
+                scheduler (DeadlineScheduler, optional): Runs request timeouts and headset discovery retries. Defaults to the shared scheduler.
+                capture (str or CaptureWriter, optional): Directory (or writer) capturing every inbound frame for replay. Defaults to CORTEX_CAPTURE (env), else off; None turns it off.
         Raises:
             ValueError: If client_id or client_secret is empty.
         Description:
@@ -116,7 +263,19 @@ class Cortex(Dispatcher):
         self.debit = 10
         self.license = ''
         self.isHeadsetConnected = False
+        self.headset_state = HEADSET_IDLE
+        self._headset_retry = None  # scheduler.PeriodicCall re-querying headsets
         self.auto_create_session = True
+        self.stream_format = 'dict'
+        self.request_timeout = REQUEST_TIMEOUT_SEC
+        self.url = CORTEX_URL
+        self._scheduler = None
+        self._ids = itertools.count(FIRST_REQUEST_ID)
+        self._pending = {}  # request id -> _PendingRequest
+        self._expired = OrderedDict()  # request id -> _PendingRequest that timed out (last EXPIRED_KEEP)
+        self._pending_lock = threading.Lock()
+        self._capture = None  # cortex_capture.CaptureWriter
+        self.websock_thread = None
 
         if client_id == '':
             raise ValueError('Empty your_app_client_id. Please fill in your_app_client_id before running the example.')
@@ -138,9 +297,25 @@ class Cortex(Dispatcher):
                 self.headset_id = value
             elif  key == 'auto_create_session':
                 self.auto_create_session = value
+            elif  key == 'stream_format':
+                self.stream_format = value
+            elif  key == 'request_timeout':
+                self.request_timeout = value
+            elif  key == 'scheduler':
+                self._scheduler = value
+            elif  key == 'url':
+                self.url = value
+            elif  key == 'capture':
+                self._capture = value
+
+        self._stream_decoders = stream_decoders(self.stream_format)
+        if 'capture' not in kwargs and CORTEX_CAPTURE:
+            self._capture = CORTEX_CAPTURE
+        if self._capture is not None and not isinstance(self._capture, CaptureWriter):
+            self.start_capture(self._capture)
 
     def open(self):
-        url = "wss://localhost:6868"
+        url = self.url
         # websocket.enableTrace(True)
         self.ws = websocket.WebSocketApp(url, 
                                         on_message=self.on_message,
@@ -163,7 +338,22 @@ class Cortex(Dispatcher):
         self.websock_thread.join()
 
     def close(self):
+        self._set_headset_state(HEADSET_IDLE)
         self.ws.close()
+        self.stop_capture()
+
+    def start_capture(self, directory, **options):
+        """Append every inbound frame to segment files in directory (options: see CaptureWriter)."""
+        self.stop_capture()
+        self._capture = CaptureWriter(directory, **options)
+        print('capturing cortex frames to ' + str(self._capture.directory))
+        return self._capture
+
+    def stop_capture(self):
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.close()
+        return capture
 
     def set_wanted_headset(self, headset_id):
         self.headset_id = headset_id
@@ -182,6 +372,10 @@ class Cortex(Dispatcher):
     def on_close(self, *args, **kwargs):
         print("on_close")
         print(args[1])
+        self._set_headset_state(HEADSET_IDLE)
+        self._fail_pending(ConnectionError('websocket closed'))
+        if self._capture is not None:
+            self._capture.flush()
 
     def handle_result(self, recv_dic):
         if self.debug:
@@ -190,12 +384,25 @@ class Cortex(Dispatcher):
         req_id = recv_dic['id']
         result_dic = recv_dic['result']
 
+        entry = self._pop_pending(req_id)
+        late = self._pop_expired(req_id) if entry is None else None
+        origin = entry or late
+        # Allocated ids route through the request's handler id, also after a timeout; fixed ids
+        # (sent by older code) directly
+        handler_id = req_id if origin is None else origin.handler_id
         # Dictionary dispatch pattern for better readability and performance
-        handler = self._get_result_handler(req_id)
-        if handler:
-            handler(result_dic)
-        else:
-            print('No handling for response of request ' + str(req_id))
+        handler = self._get_result_handler(handler_id)
+        try:
+            if late is not None:
+                print('Late response of request ' + str(req_id) + ' (' + late.method + ')')
+            if handler:
+                handler(result_dic)
+            elif origin is None:
+                print('No handling for response of request ' + str(req_id))
+        finally:
+            # after the handler, so waiters see the state it sets (auth token, session id, ...)
+            if entry is not None:
+                entry.resolve(result_dic)
 
     def _get_result_handler(self, req_id):
         """Return the appropriate handler function for the given request ID."""
@@ -252,47 +459,70 @@ class Cortex(Dispatcher):
         if self.auto_create_session:
             #After successful authorization, the app will call the API refresh headset list for the first time
             self.refresh_headset_list()
-            # query headsets
+            # query headsets; re-queried on a timer until the headset is connected
+            self._set_headset_state(HEADSET_SCANNING)
             self.query_headset()
         else:
             self.emit('authorize_done')
 
     def _handle_query_headset(self, result_dic):
         self.headset_list = result_dic
-        found_headset = False
-        headset_status = ''
+        headset_status = None
         for ele in self.headset_list:
             hs_id = ele['id']
             status = ele['status']
             connected_by = ele['connectedBy']
             print('headsetId: {0}, status: {1}, connected_by: {2}'.format(hs_id, status, connected_by))
-            if self.headset_id != '' and self.headset_id == hs_id:
-                found_headset = True
-                headset_status = status
+        if self.headset_id == '' and len(self.headset_list) > 0:
+            # set first headset is default headset
+            self.headset_id = self.headset_list[0]['id']
+        for ele in self.headset_list:
+            if ele['id'] == self.headset_id:
+                headset_status = ele['status']
 
         if len(self.headset_list) == 0:
             self.isHeadsetConnected = False
-            warnings.warn("No headset available. Please turn on a headset.")
-        elif self.headset_id == '':
-            # set first headset is default headset
-            self.headset_id = self.headset_list[0]['id']
-            # call query headet again
-            self.query_headset()
-        elif found_headset == False:
-            warnings.warn("Can not found the headset " + self.headset_id + ". Please make sure the id is correct.")
-        elif found_headset == True:
-            if headset_status == 'connected':
-                self.isHeadsetConnected = True
+            if self.headset_state != HEADSET_SCANNING:
+                warnings.warn("No headset available. Please turn on a headset.")
+            self._set_headset_state(HEADSET_SCANNING)
+        elif headset_status is None:
+            if self.headset_state != HEADSET_SCANNING:
+                warnings.warn("Can not found the headset " + self.headset_id + ". Please make sure the id is correct.")
+            self._set_headset_state(HEADSET_SCANNING)
+        elif headset_status == 'connected':
+            self.isHeadsetConnected = True
+            if self.headset_state != HEADSET_CONNECTED:
+                self._set_headset_state(HEADSET_CONNECTED)
                 # create session with the headset
                 self.create_session()
-            elif headset_status == 'discovered':
+        elif headset_status == 'discovered':
+            if self.headset_state != HEADSET_CONNECTING:  # one connect per attempt; 102 starts a new one
+                self._set_headset_state(HEADSET_CONNECTING)
                 self.connect_headset(self.headset_id)
-            elif headset_status == 'connecting':
-                # wait 3 seconds and query headset again
-                time.sleep(3)
-                self.query_headset()
-            else:
-                warnings.warn('query_headset resp: Invalid connection status ' + headset_status)
+        elif headset_status == 'connecting':
+            # HEADSET_CONNECTED (104) or the retry timer queries again; never block the message thread
+            self._set_headset_state(HEADSET_CONNECTING)
+        else:
+            warnings.warn('query_headset resp: Invalid connection status ' + headset_status)
+
+    def _set_headset_state(self, state):
+        """Discovery state; the retry timer runs while scanning or connecting and restarts its backoff on a change."""
+        previous, self.headset_state = self.headset_state, state
+        if state in (HEADSET_SCANNING, HEADSET_CONNECTING):
+            if self._headset_retry is None:
+                self._headset_retry = self._get_scheduler().call_every(
+                    HEADSET_RETRY_SEC, self._retry_query_headset,
+                    backoff=HEADSET_RETRY_BACKOFF, max_interval=HEADSET_RETRY_MAX_SEC)
+            elif state != previous:
+                self._headset_retry.reset()
+        elif self._headset_retry is not None:
+            self._headset_retry.cancel()
+            self._headset_retry = None
+
+    def _retry_query_headset(self):
+        # scheduler thread: only sends; the response is handled on the websocket thread
+        if self.headset_state in (HEADSET_SCANNING, HEADSET_CONNECTING):
+            self.query_headset()
 
     def _handle_create_session(self, result_dic):
         self.session_id = result_dic['id']
@@ -429,8 +659,15 @@ class Cortex(Dispatcher):
 
     def handle_error(self, recv_dic):
         req_id = recv_dic['id']
-        print('handle_error: request Id ' + str(req_id))
-        self.emit('inform_error', error_data=recv_dic['error'])
+        entry = self._pop_pending(req_id)
+        origin = entry or self._pop_expired(req_id)
+        method = origin.method if origin is not None else None
+        print('handle_error: request Id ' + str(req_id) + ('' if method is None else ' (' + method + ')'))
+        try:
+            self.emit('inform_error', error_data=recv_dic['error'])
+        finally:
+            if entry is not None:
+                entry.resolve(exc=CortexError(method, recv_dic['error']))
     
     def handle_warning(self, warning_dic):
         if self.debug:
@@ -450,6 +687,8 @@ class Cortex(Dispatcher):
         handlers = {
             ACCESS_RIGHT_GRANTED: self._handle_access_right_granted,
             HEADSET_CONNECTED: self._handle_headset_connected,
+            HEADSET_CANNOT_CONNECT_TIMEOUT: self._handle_headset_connect_failed,
+            HEADSET_DISCONNECTED_TIMEOUT: self._handle_headset_connect_failed,
             CORTEX_AUTO_UNLOAD_PROFILE: self._handle_cortex_auto_unload_profile,
             CORTEX_STOP_ALL_STREAMS: self._handle_cortex_stop_all_streams,
             CORTEX_RECORD_POST_PROCESSING_DONE: self._handle_cortex_record_post_processing_done,
@@ -465,6 +704,13 @@ class Cortex(Dispatcher):
         # query headset again then create session
         self.query_headset()
 
+    def _handle_headset_connect_failed(self, warning_msg):
+        # connect timed out or the headset dropped: back to scanning, the next 'discovered' reconnects
+        warnings.warn('Headset ' + self.headset_id + ': ' + str(warning_msg))
+        self.isHeadsetConnected = False
+        self._set_headset_state(HEADSET_SCANNING)
+        self.query_headset()
+
     def _handle_cortex_auto_unload_profile(self, warning_msg):
         self.profile_name = ''
 
@@ -483,60 +729,24 @@ class Cortex(Dispatcher):
         # After headset scanning finishes, if no headset is connected yet, the app should call the controlDevice("refresh") again
         # We recommend the app should NOT call controlDevice("refresh") when a headset is connected, to have the best data stream quality.
         if (self.isHeadsetConnected == False):
+            self.query_headset()  # pick up what this scan found
             self.refresh_headset_list()
 
     def handle_stream_data(self, result_dic):
-        if result_dic.get('com') != None:
-            com_data = {}
-            com_data['action'] = result_dic['com'][0]
-            com_data['power'] = result_dic['com'][1]
-            com_data['time'] = result_dic['time']
-            self.emit('new_com_data', data=com_data)
-        elif result_dic.get('fac') != None:
-            fe_data = {}
-            fe_data['eyeAct'] = result_dic['fac'][0]    #eye action
-            fe_data['uAct'] = result_dic['fac'][1]      #upper action
-            fe_data['uPow'] = result_dic['fac'][2]      #upper action power
-            fe_data['lAct'] = result_dic['fac'][3]      #lower action
-            fe_data['lPow'] = result_dic['fac'][4]      #lower action power
-            fe_data['time'] = result_dic['time']
-            self.emit('new_fe_data', data=fe_data)
-        elif result_dic.get('eeg') != None:
-            eeg_data = {}
-            eeg_data['eeg'] = result_dic['eeg']
-            eeg_data['eeg'].pop() # remove markers
-            eeg_data['time'] = result_dic['time']
-            self.emit('new_eeg_data', data=eeg_data)
-        elif result_dic.get('mot') != None:
-            mot_data = {}
-            mot_data['mot'] = result_dic['mot']
-            mot_data['time'] = result_dic['time']
-            self.emit('new_mot_data', data=mot_data)
-        elif result_dic.get('dev') != None:
-            dev_data = {}
-            dev_data['signal'] = result_dic['dev'][1]
-            dev_data['dev'] = result_dic['dev'][2]
-            dev_data['batteryPercent'] = result_dic['dev'][3]
-            dev_data['time'] = result_dic['time']
-            self.emit('new_dev_data', data=dev_data)
-        elif result_dic.get('met') != None:
-            met_data = {}
-            met_data['met'] = result_dic['met']
-            met_data['time'] = result_dic['time']
-            self.emit('new_met_data', data=met_data)
-        elif result_dic.get('pow') != None:
-            pow_data = {}
-            pow_data['pow'] = result_dic['pow']
-            pow_data['time'] = result_dic['time']
-            self.emit('new_pow_data', data=pow_data)
-        elif result_dic.get('sys') != None:
-            sys_data = result_dic['sys']
-            self.emit('new_sys_data', data=sys_data)
-        else :
+        decoded = decode_stream_message(result_dic, self._stream_decoders)
+        if decoded is None:
             print(result_dic)
+            return
+        event, data = decoded
+        self.emit(event, data=data)
 
     def on_message(self, *args):
-        recv_dic = json.loads(args[1])
+        capture = self._capture
+        if capture is not None:
+            received = time.monotonic()
+        recv_dic = json_loads(args[1])
+        if capture is not None:
+            capture.write(self._capture_frame(args[1], recv_dic), received)
         if 'sid' in recv_dic:
             self.handle_stream_data(recv_dic)
         elif 'result' in recv_dic:
@@ -548,6 +758,99 @@ class Cortex(Dispatcher):
         else:
             raise KeyError
 
+    # --- request/response correlation ---
+    # Every request method returns a concurrent.futures.Future resolved with the response's
+    # "result" (or failed with CortexError / TimeoutError / ConnectionError), so independent
+    # requests can be in flight together:
+    #   profiles = cortex.query_profile(); info = cortex.get_cortex_info()
+    #   profiles.result(5), info.result(5)            # blocking (not on the websocket thread)
+    #   await asyncio.wrap_future(cortex.query_headset())  # awaitable
+    # The Dispatcher events fire as before; the future resolves after the event handler ran.
+
+    def request(self, method, params=None, timeout=None, handler_id=None):
+        """Send a JSON-RPC request with a fresh id. Returns a Future for its result."""
+        request = {"jsonrpc": "2.0", "id": handler_id, "method": method}
+        if params is not None:
+            request["params"] = params
+        return self._send(request, timeout)
+
+    def call(self, method, params=None, timeout=None):
+        """Blocking request(): the result, or raises CortexError / TimeoutError."""
+        if threading.current_thread() is self.websock_thread:
+            raise RuntimeError('Cortex.call() would block the websocket thread; use request() and a callback')
+        future = self.request(method, params, timeout)
+        return future.result()
+
+    def pending_requests(self):
+        """{request id: method} of requests still waiting for a response."""
+        with self._pending_lock:
+            return {req_id: entry.method for req_id, entry in self._pending.items()}
+
+    def _send(self, request, timeout=None):
+        # request["id"] on entry is the legacy handler id (or None); it is replaced by a fresh one
+        entry = _PendingRequest(request["method"], request.get("id"))
+        req_id = next(self._ids)
+        request["id"] = req_id
+        with self._pending_lock:
+            self._pending[req_id] = entry
+        if timeout is None:
+            timeout = self.request_timeout
+        if timeout is not None:
+            entry.timer = self._get_scheduler().call_later(timeout, self._expire, req_id)
+        try:
+            self.ws.send(json.dumps(request))
+        except Exception:
+            self._pop_pending(req_id)
+            raise
+        return entry.future
+
+    def _capture_frame(self, text, recv_dic):
+        # Responses are stored under the request's fixed handler id (e.g. QUERY_HEADSET_ID): the
+        # allocated id means nothing without the outgoing request, the handler id replays as-is.
+        # Late responses (request already timed out) are looked up among the expired requests.
+        if 'sid' in recv_dic or 'id' not in recv_dic:
+            return text
+        with self._pending_lock:
+            entry = self._pending.get(recv_dic['id']) or self._expired.get(recv_dic['id'])
+        if entry is None or entry.handler_id is None:
+            return text
+        return json.dumps(dict(recv_dic, id=entry.handler_id))
+
+    def _get_scheduler(self):
+        if self._scheduler is None:
+            self._scheduler = default_scheduler()
+        return self._scheduler
+
+    def _pop_pending(self, req_id):
+        with self._pending_lock:
+            entry = self._pending.pop(req_id, None)
+        if entry is not None and entry.timer is not None:
+            entry.timer.cancel()
+        return entry
+
+    def _pop_expired(self, req_id):
+        with self._pending_lock:
+            return self._expired.pop(req_id, None)
+
+    def _expire(self, req_id):
+        entry = self._pop_pending(req_id)
+        if entry is not None:
+            with self._pending_lock:
+                self._expired[req_id] = entry
+                if len(self._expired) > EXPIRED_KEEP:
+                    self._expired.popitem(last=False)
+            print('Request ' + str(req_id) + ' (' + entry.method + ') timed out')
+            entry.resolve(exc=TimeoutError(entry.method + ' got no response'))
+
+    def _fail_pending(self, exc):
+        with self._pending_lock:
+            entries = list(self._pending.values())
+            self._pending.clear()
+        for entry in entries:
+            if entry.timer is not None:
+                entry.timer.cancel()
+            entry.resolve(exc=exc)
+
     def query_headset(self):
         print('query headset --------------------------------')
         query_headset_request = {
@@ -559,7 +862,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('queryHeadsets request \n', json.dumps(query_headset_request, indent=4))
 
-        self.ws.send(json.dumps(query_headset_request, indent=4))
+        return self._send(query_headset_request)
 
     def connect_headset(self, headset_id):
         print('connect headset --------------------------------')
@@ -575,7 +878,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('controlDevice request \n', json.dumps(connect_headset_request, indent=4))
 
-        self.ws.send(json.dumps(connect_headset_request, indent=4))
+        return self._send(connect_headset_request)
 
     def request_access(self):
         print('request access --------------------------------')
@@ -589,7 +892,7 @@ class Cortex(Dispatcher):
             "id": REQUEST_ACCESS_ID
         }
 
-        self.ws.send(json.dumps(request_access_request, indent=4))
+        return self._send(request_access_request)
 
     def has_access_right(self):
         print('check has access right --------------------------------')
@@ -602,7 +905,7 @@ class Cortex(Dispatcher):
             },
             "id": HAS_ACCESS_RIGHT_ID
         }
-        self.ws.send(json.dumps(has_access_request, indent=4))
+        return self._send(has_access_request)
 
     def authorize(self):
         print('authorize --------------------------------')
@@ -621,7 +924,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('auth request \n', json.dumps(authorize_request, indent=4))
 
-        self.ws.send(json.dumps(authorize_request))
+        return self._send(authorize_request)
 
     def create_session(self):
         if self.session_id != '':
@@ -643,13 +946,13 @@ class Cortex(Dispatcher):
         if self.debug:
             print('create session request \n', json.dumps(create_session_request, indent=4))
 
-        self.ws.send(json.dumps(create_session_request))
+        return self._send(create_session_request)
 
     def close_session(self):
         print('close session --------------------------------')
         close_session_request = { 
             "jsonrpc": "2.0",
-            "id": CREATE_SESSION_ID,
+            "id": UPDATE_SESSION_ID,
             "method": "updateSession",
             "params": {
                 "cortexToken": self.auth,
@@ -658,7 +961,7 @@ class Cortex(Dispatcher):
             }
         }
 
-        self.ws.send(json.dumps(close_session_request))
+        return self._send(close_session_request)
 
     def get_cortex_info(self):
         print('get cortex version --------------------------------')
@@ -668,7 +971,7 @@ class Cortex(Dispatcher):
             "id":GET_CORTEX_INFO_ID
         }
 
-        self.ws.send(json.dumps(get_cortex_info_request))
+        return self._send(get_cortex_info_request)
 
     """
         Prepare steps include:
@@ -699,7 +1002,7 @@ class Cortex(Dispatcher):
             }
         }
 
-        self.ws.send(json.dumps(disconnect_headset_request))
+        return self._send(disconnect_headset_request)
 
     def sub_request(self, stream):
         print('subscribe request --------------------------------')
@@ -716,7 +1019,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('subscribe request \n', json.dumps(sub_request_json, indent=4))
 
-        self.ws.send(json.dumps(sub_request_json))
+        return self._send(sub_request_json)
 
     def unsub_request(self, stream):
         print('unsubscribe request --------------------------------')
@@ -733,7 +1036,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('unsubscribe request \n', json.dumps(unsub_request_json, indent=4))
 
-        self.ws.send(json.dumps(unsub_request_json))
+        return self._send(unsub_request_json)
 
     def extract_data_labels(self, stream_name, stream_cols):
         labels = {}
@@ -768,7 +1071,7 @@ class Cortex(Dispatcher):
             print('query profile request \n', json.dumps(query_profile_json, indent=4))
             print('\n')
 
-        self.ws.send(json.dumps(query_profile_json))
+        return self._send(query_profile_json)
 
     def get_current_profile(self):
         print('get current profile:')
@@ -786,7 +1089,7 @@ class Cortex(Dispatcher):
             print('get current profile json:\n', json.dumps(get_profile_json, indent=4))
             print('\n')
 
-        self.ws.send(json.dumps(get_profile_json))
+        return self._send(get_profile_json)
 
     def setup_profile(self, profile_name, status):
         print('setup profile: ' + status + ' -------------------------------- ')
@@ -806,7 +1109,7 @@ class Cortex(Dispatcher):
             print('setup profile json:\n', json.dumps(setup_profile_json, indent=4))
             print('\n')
 
-        self.ws.send(json.dumps(setup_profile_json))
+        return self._send(setup_profile_json)
 
     def train_request(self, detection, action, status):
         print('train request --------------------------------')
@@ -826,7 +1129,7 @@ class Cortex(Dispatcher):
             print('training request:\n', json.dumps(train_request_json, indent=4))
             print('\n')
 
-        self.ws.send(json.dumps(train_request_json))
+        return self._send(train_request_json)
 
     def query_records(self, query_params):
         print('query records --------------------------------')
@@ -845,7 +1148,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('query records request:\n', json.dumps(query_records_request, indent=4))
 
-        self.ws.send(json.dumps(query_records_request))
+        return self._send(query_records_request)
     
     def request_download_records(self, recordIds):
         print('request to download records --------------------------------')
@@ -861,7 +1164,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('requestToDownloadRecordData request:\n', json.dumps(download_records_request, indent=4))
 
-        self.ws.send(json.dumps(download_records_request))
+        return self._send(download_records_request)
 
     def create_record(self, title, **kwargs):
         print('create record --------------------------------')
@@ -886,7 +1189,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('create record request:\n', json.dumps(create_record_request, indent=4))
 
-        self.ws.send(json.dumps(create_record_request))
+        return self._send(create_record_request)
 
     def stop_record(self):
         print('stop record --------------------------------')
@@ -902,7 +1205,7 @@ class Cortex(Dispatcher):
         }
         if self.debug:
             print('stop record request:\n', json.dumps(stop_record_request, indent=4))
-        self.ws.send(json.dumps(stop_record_request))
+        return self._send(stop_record_request)
 
     def export_record(self, folder, stream_types, export_format, record_ids,
                       version, **kwargs):
@@ -937,7 +1240,7 @@ class Cortex(Dispatcher):
             print('export record request \n',
                 json.dumps(export_record_request, indent=4))
         
-        self.ws.send(json.dumps(export_record_request))
+        return self._send(export_record_request)
 
     def inject_marker_request(self, time, value, label, **kwargs):
         print('inject marker --------------------------------')
@@ -958,7 +1261,7 @@ class Cortex(Dispatcher):
         }
         if self.debug:
             print('inject marker request \n', json.dumps(inject_marker_request, indent=4))
-        self.ws.send(json.dumps(inject_marker_request))
+        return self._send(inject_marker_request)
 
     def update_marker_request(self, marker_id, time, **kwargs):
         print('update marker --------------------------------')
@@ -978,7 +1281,7 @@ class Cortex(Dispatcher):
         }
         if self.debug:
             print('update marker request \n', json.dumps(update_marker_request, indent=4))
-        self.ws.send(json.dumps(update_marker_request))
+        return self._send(update_marker_request)
 
     def get_mental_command_action_sensitivity(self, profile_name):
         print('get mental command sensitivity ------------------')
@@ -995,7 +1298,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('get mental command sensitivity \n', json.dumps(sensitivity_request, indent=4))
 
-        self.ws.send(json.dumps(sensitivity_request))
+        return self._send(sensitivity_request)
 
     def set_mental_command_action_sensitivity(self, profile_name, values):
         print('set mental command sensitivity ------------------')
@@ -1014,7 +1317,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('set mental command sensitivity \n', json.dumps(sensitivity_request, indent=4))
             
-        self.ws.send(json.dumps(sensitivity_request))
+        return self._send(sensitivity_request)
 
     def get_mental_command_active_action(self, profile_name):
         print('get mental command active action ------------------')
@@ -1031,7 +1334,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('get mental command active action \n', json.dumps(command_active_request, indent=4))
 
-        self.ws.send(json.dumps(command_active_request))
+        return self._send(command_active_request)
 
     def set_mental_command_active_action(self, actions):
         print('set mental command active action ------------------')
@@ -1050,7 +1353,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('set mental command active action \n', json.dumps(command_active_request, indent=4))
 
-        self.ws.send(json.dumps(command_active_request))
+        return self._send(command_active_request)
 
     def get_mental_command_brain_map(self, profile_name):
         print('get mental command brain map ------------------')
@@ -1066,7 +1369,7 @@ class Cortex(Dispatcher):
         }
         if self.debug:
             print('get mental command brain map \n', json.dumps(brain_map_request, indent=4))
-        self.ws.send(json.dumps(brain_map_request))
+        return self._send(brain_map_request)
 
     def get_mental_command_training_threshold(self, profile_name):
         print('get mental command training threshold -------------')
@@ -1081,7 +1384,7 @@ class Cortex(Dispatcher):
         }
         if self.debug:
             print('get mental command training threshold \n', json.dumps(training_threshold_request, indent=4))
-        self.ws.send(json.dumps(training_threshold_request))
+        return self._send(training_threshold_request)
 
     def refresh_headset_list(self):
         print('refresh headset list --------------------------------')
@@ -1096,7 +1399,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('controlDevice refresh request \n', json.dumps(refresh_request, indent=4))
 
-        self.ws.send(json.dumps(refresh_request, indent=4))
+        return self._send(refresh_request)
 
     def sync_with_headset_clock(self, headset_id=None):
         print('sync with headset clock --------------------------------')
@@ -1119,7 +1422,7 @@ class Cortex(Dispatcher):
         if self.debug:
             print('sync with headset clock request \n', json.dumps(sync_request, indent=4))
 
-        self.ws.send(json.dumps(sync_request))
+        return self._send(sync_request)
 
 # -------------------------------------------------------------------
 # -------------------------------------------------------------------
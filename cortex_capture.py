@@ -0,0 +1,315 @@
+"""
+Capture and replay of raw Cortex traffic: every inbound frame with its receive time, on disk.
+
+Capture (Cortex(..., capture="captures/") or env CORTEX_CAPTURE=captures/) appends frames to
+segment files <prefix>-<start>-NNNN.cxcap, rotated at SEGMENT_BYTES:
+
+  header  "CXCAP" version:u8 flags:u8 pad:u8 wall_start:f64 monotonic_start:f64   (24 bytes)
+  blocks  stored_len:u32 raw_len:u32 payload                                       (repeated)
+          payload = records, zstd-compressed when flags & FLAG_ZSTD
+  record  receive_time:f64 (time.monotonic) length:u32 frame:utf-8                 (repeated)
+
+Frames are buffered into blocks of BLOCK_BYTES, so capturing costs an append per frame and a
+write (plus compression) per block. A truncated last block (crash, capture still running) is
+ignored on read.
+
+Replay reads segments through mmap one block at a time, so captures of any length stream from
+disk, and feeds each frame to Cortex.on_message (or any callable) at 1x, Nx or full speed:
+
+  replay("captures/", Cortex(client_id, client_secret, stream_format="numpy"), speed=0)
+
+Usage:
+  python cortex_capture.py info captures/
+  python cortex_capture.py replay captures/ --speed 0 --format numpy   # on_message throughput
+"""
+import argparse
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+MAGIC = b"CXCAP"
+VERSION = 1
+FLAG_ZSTD = 1
+SUFFIX = ".cxcap"
+BLOCK_BYTES = 256 * 1024
+SEGMENT_BYTES = 256 * 1024 * 1024
+ZSTD_LEVEL = 3
+DEFAULT_COMPRESS = "zstd" if zstd is not None else None
+
+_HEADER = struct.Struct("<5sBBxdd")  # magic, version, flags, wall start, monotonic start
+_BLOCK = struct.Struct("<II")  # stored bytes, raw bytes
+_RECORD = struct.Struct("<dI")  # receive time, frame bytes
+
+
+class CaptureWriter:
+    """Appends frames to rotating segment files in a directory. Thread-safe."""
+
+    def __init__(self, directory, compress: Optional[str] = DEFAULT_COMPRESS, level: int = ZSTD_LEVEL,
+                 block_bytes: int = BLOCK_BYTES, segment_bytes: int = SEGMENT_BYTES, prefix: str = "cortex",
+                 clock: Callable[[], float] = time.monotonic):
+        if compress not in (None, "zstd"):
+            raise ValueError("compress must be None or 'zstd'")
+        if compress == "zstd" and zstd is None:
+            raise RuntimeError("pip install zstandard")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.block_bytes = block_bytes
+        self.segment_bytes = segment_bytes
+        self.clock = clock
+        self.stem = "{0}-{1:%Y%m%d-%H%M%S}".format(prefix, datetime.now())
+        self.segments: list[Path] = []
+        self.frames = 0
+        self.bytes_raw = 0
+        self.bytes_written = 0
+        self._compressor = zstd.ZstdCompressor(level=level) if compress else None
+        self._flags = FLAG_ZSTD if compress else 0
+        self._buf = bytearray()
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_size = 0
+        self._open_segment()
+
+    def write(self, frame, t: Optional[float] = None) -> None:
+        """Append one frame (str or bytes) received at t (default clock())."""
+        data = frame.encode("utf-8") if isinstance(frame, str) else frame
+        if t is None:
+            t = self.clock()
+        with self._lock:
+            if self._file is None:
+                return
+            self._buf += _RECORD.pack(t, len(data))
+            self._buf += data
+            self.frames += 1
+            if len(self._buf) >= self.block_bytes:
+                self._write_block()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            if self._buf:
+                self._write_block()
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            if self._buf:
+                self._write_block()
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"frames": self.frames, "bytes_raw": self.bytes_raw, "bytes_written": self.bytes_written,
+                    "segments": len(self.segments)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- internals (call with self._lock held) ---
+
+    def _open_segment(self) -> None:
+        path = self.directory / "{0}-{1:04d}{2}".format(self.stem, len(self.segments), SUFFIX)
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self._flags, time.time(), self.clock()))
+        self._segment_size = _HEADER.size
+        self.segments.append(path)
+
+    def _write_block(self) -> None:
+        if self._segment_size >= self.segment_bytes:  # rotate lazily: no empty trailing segment
+            self._file.close()
+            self._open_segment()
+        raw_len = len(self._buf)
+        stored = self._compressor.compress(bytes(self._buf)) if self._compressor is not None else self._buf
+        self._file.write(_BLOCK.pack(len(stored), raw_len))
+        self._file.write(stored)
+        self._buf = bytearray()
+        size = _BLOCK.size + len(stored)
+        self._segment_size += size
+        self.bytes_raw += raw_len
+        self.bytes_written += size
+
+
+def segment_paths(path) -> list[Path]:
+    """A segment file, or every segment in a directory in name (= capture time) order."""
+    path = Path(path)
+    if path.is_dir():
+        return sorted(path.glob("*" + SUFFIX))
+    return [path]
+
+
+def is_capture(path) -> bool:
+    path = Path(path)
+    return path.is_dir() or path.suffix == SUFFIX
+
+
+def _records(block) -> Iterator[tuple[float, str]]:
+    off, end = 0, len(block)
+    while off + _RECORD.size <= end:
+        t, length = _RECORD.unpack_from(block, off)
+        off += _RECORD.size
+        yield t, str(block[off:off + length], "utf-8")
+        off += length
+
+
+def _read_segment(path: Path) -> Iterator[tuple[float, str]]:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, flags, _, _ = _HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path}: not a version {VERSION} Cortex capture")
+            decompressor = None
+            if flags & FLAG_ZSTD:
+                if zstd is None:
+                    raise RuntimeError("pip install zstandard")
+                decompressor = zstd.ZstdDecompressor()
+            view = memoryview(mm)
+            block = None
+            try:
+                pos = _HEADER.size
+                while pos + _BLOCK.size <= size:
+                    stored, raw_len = _BLOCK.unpack_from(mm, pos)
+                    pos += _BLOCK.size
+                    if pos + stored > size:
+                        break  # truncated last block
+                    if decompressor is not None:
+                        block = decompressor.decompress(view[pos:pos + stored], max_output_size=raw_len)
+                    else:
+                        block = view[pos:pos + stored]  # no copy
+                    pos += stored
+                    yield from _records(block)
+            finally:
+                # Views into the mmap must be gone before it closes, also when the caller stops early
+                if isinstance(block, memoryview):
+                    block.release()
+                view.release()
+
+
+def read_frames(path) -> Iterator[tuple[float, str]]:
+    """(receive time, frame text) for every captured frame, segment by segment."""
+    for segment in segment_paths(path):
+        yield from _read_segment(segment)
+
+
+def capture_info(path) -> dict:
+    frames = streams = 0
+    first = last = None
+    for t, text in read_frames(path):
+        frames += 1
+        streams += text.startswith('{"sid"') or '"sid"' in text
+        if first is None:
+            first = t
+        last = t
+    segments = segment_paths(path)
+    return {"segments": len(segments), "bytes": sum(p.stat().st_size for p in segments), "frames": frames,
+            "stream_frames": streams, "seconds": (last - first) if frames else 0.0}
+
+
+class NullWebSocket:
+    """Stands in for the websocket while replaying: requests sent by the handlers go nowhere."""
+
+    def send(self, *args, **kwargs):
+        pass
+
+    def close(self, *args, **kwargs):
+        pass
+
+
+def replay(path, target, speed: float = 1.0, limit: Optional[int] = None,
+           clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep) -> dict:
+    """
+    Feed captured frames to target.on_message(None, frame) (a Cortex) or target(frame).
+    speed: 1.0 real time, N times faster, 0 as fast as possible. Time going backwards between
+    segments of different captures counts as no gap. A Cortex without a websocket gets a
+    NullWebSocket for the replay (and is closed afterwards).
+    """
+    deliver = target
+    detached = False
+    if hasattr(target, "on_message"):
+        if getattr(target, "ws", None) is None:
+            target.ws = NullWebSocket()
+            target.request_timeout = None  # nothing will answer
+            detached = True
+        deliver = lambda frame: target.on_message(None, frame)
+    frames = 0
+    elapsed = 0.0  # capture time since the first frame
+    prev = None
+    start = clock()
+    try:
+        for t, text in read_frames(path):
+            if prev is not None:
+                elapsed += max(0.0, t - prev)
+            prev = t
+            if speed:
+                delay = start + elapsed / speed - clock()
+                if delay > 0.0005:
+                    sleep(delay)
+            deliver(text)
+            frames += 1
+            if limit is not None and frames >= limit:
+                break
+    finally:
+        if detached:
+            target.close()
+    seconds = clock() - start
+    return {"frames": frames, "capture_seconds": elapsed, "seconds": seconds,
+            "frames_per_sec": frames / seconds if seconds > 0 else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay Cortex captures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info_p = sub.add_parser("info", help="frames, duration and size of a capture")
+    info_p.add_argument("path")
+    replay_p = sub.add_parser("replay", help="replay through Cortex.on_message and report throughput")
+    replay_p.add_argument("path")
+    replay_p.add_argument("--speed", type=float, default=0.0, help="1 = real time, 0 = as fast as possible")
+    replay_p.add_argument("--format", default="dict", help="Cortex stream_format: dict, tuple or numpy")
+    replay_p.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        for key, value in capture_info(args.path).items():
+            print(f"  {key:14} {value:,.1f}" if isinstance(value, float) else f"  {key:14} {value:,}")
+        return
+
+    import contextlib
+    import io
+    from cortex import Cortex
+    with contextlib.redirect_stdout(io.StringIO()):  # Cortex prints every kwarg and request
+        client = Cortex("replay", "replay", stream_format=args.format)
+    counts = {}
+
+    class _Counter:
+        def on_data(self, *a, **kw):
+            counts["samples"] = counts.get("samples", 0) + 1
+
+    counter = _Counter()
+    from cortex import STREAM_EVENTS
+    client.bind(**{event: counter.on_data for event in STREAM_EVENTS.values()})
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = replay(args.path, client, speed=args.speed, limit=args.limit)
+    print(f"  {result['frames']:,} frames ({counts.get('samples', 0):,} stream samples) in {result['seconds']:.2f} s"
+          f" = {result['frames_per_sec']:,.0f} frames/s (capture: {result['capture_seconds']:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
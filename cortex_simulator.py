@@ -0,0 +1,669 @@
+"""
+Local Cortex service simulator: JSON-RPC over WebSocket, no EMOTIV Launcher or headset needed.
+
+Implements the methods cortex.py sends (authorize, queryHeadsets, controlDevice, createSession,
+subscribe, setupProfile, createRecord, injectMarker, exportRecord, training, the mental command
+methods, ...) closely enough for eeg.py, sub_data.py, record.py, marker.py, live_advance.py and
+the training scripts to run end to end. Subscribed streams are synthetic (eeg 128 Hz, mot 32 Hz,
+fac 32 Hz, pow 8 Hz, com 8 Hz, met 2 Hz, dev 2 Hz) or replayed from a log of raw Cortex frames
+(one JSON frame per line, as bench_cortex_decode.py --log reads), at real rate x speed
+(speed=0: as fast as the socket takes them).
+
+Faults for regression tests: per-response latency and jitter, a fraction of requests answered
+with an error or never answered, methods that always fail, dropped stream samples, and
+disconnecting a client some seconds after it subscribes.
+
+Serves ws:// by default; pass a certificate/key for wss://. Point clients at it with
+CORTEX_URL=ws://127.0.0.1:6868 (cortex.Cortex(url=...), AsyncCortex(url=...)).
+
+Usage:
+  python cortex_simulator.py                          # ws://127.0.0.1:6868
+  python cortex_simulator.py --speed 4 --latency 0.05 --error-rate 0.01
+  python cortex_simulator.py --replay cortex_frames.jsonl --headset-status connected
+
+  sim = CortexSimulator(port=0, speed=10, faults=Faults(drop_rate=0.1))
+  url = sim.start_in_thread()                         # tests: serve from a background loop
+  ...
+  sim.stop_in_thread()
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import ssl
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 6868
+HEADSET_ID = "EPOCX-SIM00001"
+EEG_CHANNELS = ["AF3", "F7", "F3", "FC5", "T7", "P7", "O1", "O2", "P8", "T8", "FC6", "F4", "F8", "AF4"]
+BANDS = ("theta", "alpha", "betaL", "betaH", "gamma")
+MET_METRICS = ("eng", "exc", "lex", "str", "rel", "int", "attention")  # lex has no isActive flag
+
+STREAM_RATES = {"eeg": 128, "mot": 32, "fac": 32, "pow": 8, "com": 8, "met": 2, "dev": 2}  # Hz at speed 1
+STREAM_COLS = {
+    "eeg": ["COUNTER", "INTERPOLATED"] + EEG_CHANNELS + ["RAW_CQ", "MARKER_HARDWARE", "MARKERS"],
+    "mot": ["COUNTER_MEMS", "INTERPOLATED_MEMS", "Q0", "Q1", "Q2", "Q3", "ACCX", "ACCY", "ACCZ", "MAGX", "MAGY", "MAGZ"],
+    "fac": ["eyeAct", "uAct", "uPow", "lAct", "lPow"],
+    "pow": [f"{ch}/{band}" for ch in EEG_CHANNELS for band in BANDS],
+    "com": ["act", "pow"],
+    "met": [c for m in MET_METRICS for c in ((m,) if m == "lex" else (m + ".isActive", m))],
+    "dev": ["Battery", "Signal", EEG_CHANNELS + ["OVERALL"], "BatteryPercent"],
+    "sys": ["data"],
+}
+
+# Warning codes (same values as cortex.py)
+HEADSET_CONNECTED = 104
+HEADSET_SCANNING_FINISHED = 142
+CORTEX_RECORD_POST_PROCESSING_DONE = 30
+
+# Error codes
+ERR_METHOD_NOT_FOUND = -32601
+ERR_INVALID_PARAMS = -32602
+ERR_INVALID_TOKEN = -32014
+ERR_SESSION_NOT_FOUND = -32005
+ERR_HEADSET_NOT_CONNECTED = -32152
+ERR_STREAM_UNSUPPORTED = -32016
+ERR_SIMULATED = -32000  # injected fault
+
+NO_TOKEN_METHODS = frozenset({"hasAccessRight", "requestAccess", "authorize", "getCortexInfo",
+                              "queryHeadsets", "controlDevice", "syncWithHeadsetClock"})
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0                     # seconds added before every response
+    jitter: float = 0.0                      # plus uniform(0, jitter)
+    error_rate: float = 0.0                  # fraction of requests answered with ERR_SIMULATED
+    drop_rate: float = 0.0                   # fraction of requests never answered
+    fail_methods: frozenset = frozenset()    # methods always answered with ERR_SIMULATED
+    sample_drop_rate: float = 0.0            # fraction of stream samples not sent
+    disconnect_after: Optional[float] = None  # close a connection this many seconds after its first subscribe
+
+
+def _frame_lines(path):
+    from cortex_capture import is_capture, read_frames
+
+    if is_capture(path):
+        for _, text in read_frames(path):
+            yield text
+    else:
+        with open(path) as f:
+            yield from f
+
+
+def load_replay(path) -> dict:
+    """
+    Raw frame log (JSON lines, or a cortex_capture.py capture) -> {stream: [(seconds since the
+    stream's first frame, values), ...]}.
+    """
+    frames: dict = {}
+    for line in _frame_lines(path):
+        line = line.strip()
+        if not line:
+            continue
+        msg = json.loads(line)
+        if "sid" not in msg:
+            continue
+        for key, values in msg.items():
+            if key in STREAM_COLS:
+                frames.setdefault(key, []).append((float(msg.get("time", 0.0)), values))
+    replay = {}
+    for key, rows in frames.items():
+        rows.sort(key=lambda r: r[0])
+        t0 = rows[0][0]
+        replay[key] = [(t - t0, values) for t, values in rows]
+    return replay
+
+
+class SyntheticSignals:
+    """Plausible stream values: eeg alpha/beta sines plus noise, slow random walks for met/pow."""
+
+    def __init__(self, seed: int = 0):
+        self.rnd = random.Random(seed)
+        self.met = {m: 0.5 for m in MET_METRICS}
+        self.active_action = "neutral"
+
+    def _walk(self, value: float, step: float = 0.02) -> float:
+        return min(1.0, max(0.0, value + self.rnd.uniform(-step, step)))
+
+    def sample(self, stream: str, n: int, markers: list) -> list:
+        rnd = self.rnd
+        if stream == "eeg":
+            t = n / STREAM_RATES["eeg"]
+            values = [n % 128, 0]
+            for i, _ in enumerate(EEG_CHANNELS):
+                wave = 12.0 * math.sin(2 * math.pi * 10.0 * t + i) + 4.0 * math.sin(2 * math.pi * 20.0 * t + 2 * i)
+                values.append(round(4200.0 + wave + rnd.gauss(0.0, 3.0), 6))
+            return values + [0, 0, markers]
+        if stream == "mot":
+            return [n % 128, 0] + [round(rnd.uniform(-1, 1), 6) for _ in range(10)]
+        if stream == "fac":
+            return ["neutral", "neutral", 0.0, "neutral", 0.0] if rnd.random() > 0.05 else ["blink", "surprise", 0.4, "smile", 0.3]
+        if stream == "pow":
+            return [round(rnd.uniform(0.5, 6.0) * (2.0 if band == "alpha" else 1.0), 3) for _ in EEG_CHANNELS for band in BANDS]
+        if stream == "com":
+            if rnd.random() < 0.02:
+                self.active_action = "push" if self.active_action == "neutral" else "neutral"
+            return [self.active_action, round(rnd.uniform(0.4, 0.9), 3) if self.active_action != "neutral" else 0.0]
+        if stream == "met":
+            values = []
+            for m in MET_METRICS:
+                self.met[m] = self._walk(self.met[m])
+                values.extend((round(self.met[m], 6),) if m == "lex" else (True, round(self.met[m], 6)))
+            return values
+        if stream == "dev":
+            return [4, 1.0, [4] * len(EEG_CHANNELS) + [100], 90]
+        raise KeyError(stream)
+
+
+class _Connection:
+    """Per-client state: token, session, subscriptions, pending markers."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.token = None
+        self.session_id = None
+        self.streams: dict = {}  # stream -> asyncio.Task
+        self.record_id = None
+        self.markers: list = []  # injected markers, reported in the next eeg sample
+        self.disconnect_task = None
+
+    async def send(self, message: dict) -> None:
+        await self.ws.send(json.dumps(message))
+
+    def cancel_streams(self, streams=None) -> None:
+        for name in list(self.streams if streams is None else streams):
+            task = self.streams.pop(name, None)
+            if task is not None:
+                task.cancel()
+
+
+class CortexSimulator:
+    """Cortex JSON-RPC server on one asyncio loop. speed multiplies stream rates and timed events."""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, speed: float = 1.0,
+                 faults: Optional[Faults] = None, replay=None, headset_status: str = "discovered",
+                 connect_delay: float = 0.5, scan_delay: float = 1.0, training_seconds: float = 8.0,
+                 profiles: tuple = ("sim-profile",), certfile=None, keyfile=None, seed: int = 0, verbose: bool = False):
+        if websockets is None:
+            raise RuntimeError("pip install websockets")
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.faults = faults or Faults()
+        self.replay = load_replay(replay) if isinstance(replay, (str, Path)) else replay
+        self.connect_delay = connect_delay
+        self.scan_delay = scan_delay
+        self.training_seconds = training_seconds
+        self.verbose = verbose
+        self.headsets = [{"id": HEADSET_ID, "status": headset_status, "connectedBy": "dongle",
+                          "sensors": list(EEG_CHANNELS), "motionSensors": STREAM_COLS["mot"][2:]}]
+        self.profiles = {name: {"name": name, "readOnly": False, "uuid": str(uuid.uuid4())} for name in profiles}
+        self.loaded_profile = None
+        self.active_actions = ["neutral", "push"]
+        self.sensitivity = [5, 5, 5, 5]
+        self.records: dict = {}
+        self.ssl_context = None
+        if certfile:
+            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.ssl_context.load_cert_chain(certfile, keyfile)
+        self.requests = 0
+        self.samples_sent = 0
+        self._rnd = random.Random(seed)
+        self._signals = SyntheticSignals(seed)
+        self._connections: set = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._methods = {
+            "hasAccessRight": self._has_access_right, "requestAccess": self._has_access_right,
+            "authorize": self._authorize, "getCortexInfo": self._get_cortex_info,
+            "queryHeadsets": self._query_headsets, "controlDevice": self._control_device,
+            "syncWithHeadsetClock": self._sync_with_headset_clock,
+            "createSession": self._create_session, "updateSession": self._update_session,
+            "subscribe": self._subscribe, "unsubscribe": self._unsubscribe,
+            "queryProfile": self._query_profile, "getCurrentProfile": self._get_current_profile,
+            "setupProfile": self._setup_profile,
+            "createRecord": self._create_record, "stopRecord": self._stop_record,
+            "queryRecords": self._query_records, "exportRecord": self._export_record,
+            "requestToDownloadRecordData": self._request_download_records,
+            "injectMarker": self._inject_marker, "updateMarker": self._update_marker,
+            "training": self._training,
+            "mentalCommandActiveAction": self._mc_active_action, "mentalCommandBrainMap": self._mc_brain_map,
+            "mentalCommandTrainingThreshold": self._mc_training_threshold,
+            "mentalCommandActionSensitivity": self._mc_action_sensitivity,
+        }
+
+    @property
+    def url(self) -> str:
+        return f"{'wss' if self.ssl_context else 'ws'}://{self.host}:{self.port}"
+
+    # --- lifecycle ---
+
+    async def start(self) -> str:
+        self._loop = asyncio.get_running_loop()
+        self._server = await websockets.serve(self._serve, self.host, self.port, ssl=self.ssl_context, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]  # port=0: pick a free one
+        return self.url
+
+    async def stop(self) -> None:
+        for conn in list(self._connections):
+            conn.cancel_streams()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print(f"Cortex simulator on {self.url} (speed x{self.speed})")
+        try:
+            await asyncio.Future()
+        finally:
+            await self.stop()
+
+    def start_in_thread(self) -> str:
+        """Serve from a background thread's loop. Returns the URL once listening."""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_thread, args=(ready,), name="CortexSimulator", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.url
+
+    def stop_in_thread(self, timeout: float = 5.0) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    def _run_thread(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self.start())
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def stats(self) -> dict:
+        return {"connections": len(self._connections), "requests": self.requests, "samples_sent": self.samples_sent}
+
+    def _later(self, delay: float, coro) -> None:
+        """Run coro after delay / speed (timed device events follow the simulation speed)."""
+        async def run():
+            await asyncio.sleep(delay / self.speed if self.speed else 0)
+            await coro
+        asyncio.ensure_future(run())
+
+    # --- connection ---
+
+    async def _serve(self, ws) -> None:
+        conn = _Connection(ws)
+        self._connections.add(conn)
+        try:
+            async for text in ws:
+                try:
+                    request = json.loads(text)
+                except ValueError:
+                    await conn.send({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+                    continue
+                asyncio.ensure_future(self._handle(conn, request))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            conn.cancel_streams()
+            if conn.disconnect_task is not None:
+                conn.disconnect_task.cancel()
+            self._connections.discard(conn)
+
+    async def _handle(self, conn: _Connection, request: dict) -> None:
+        self.requests += 1
+        req_id, method = request.get("id"), request.get("method")
+        params = request.get("params") or {}
+        faults = self.faults
+        if self.verbose:
+            print("->", method, params)
+        if faults.drop_rate and self._rnd.random() < faults.drop_rate:
+            return
+        if faults.latency or faults.jitter:
+            await asyncio.sleep(faults.latency + self._rnd.uniform(0.0, faults.jitter))
+        handler = self._methods.get(method)
+        if method in faults.fail_methods or (faults.error_rate and self._rnd.random() < faults.error_rate):
+            error = {"code": ERR_SIMULATED, "message": f"Simulated failure of {method}"}
+        elif handler is None:
+            error = {"code": ERR_METHOD_NOT_FOUND, "message": f"Method not found: {method}"}
+        elif method not in NO_TOKEN_METHODS and params.get("cortexToken") != conn.token:
+            error = {"code": ERR_INVALID_TOKEN, "message": "Invalid cortex token."}
+        else:
+            try:
+                result = handler(conn, params)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                error = None
+            except _RpcError as e:
+                error = {"code": e.code, "message": e.message}
+        response = {"jsonrpc": "2.0", "id": req_id}
+        if error is None:
+            response["result"] = result
+        else:
+            response["error"] = error
+        try:
+            await conn.send(response)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _warn(self, conn: _Connection, code: int, message) -> None:
+        try:
+            await conn.send({"jsonrpc": "2.0", "warning": {"code": code, "message": message}})
+        except websockets.ConnectionClosed:
+            pass
+
+    def _session(self, conn: _Connection, params: dict) -> str:
+        session = params.get("session")
+        if session is None or session != conn.session_id:
+            raise _RpcError(ERR_SESSION_NOT_FOUND, "Session does not exist.")
+        return session
+
+    def _headset(self, headset_id: Optional[str]) -> dict:
+        for headset in self.headsets:
+            if headset_id in (None, "", headset["id"]):
+                return headset
+        raise _RpcError(ERR_INVALID_PARAMS, f"Headset {headset_id} not found.")
+
+    # --- auth / headsets / sessions ---
+
+    def _has_access_right(self, conn, params):
+        return {"accessGranted": True, "message": "The user has granted access right to this application."}
+
+    def _authorize(self, conn, params):
+        if not params.get("clientId") or not params.get("clientSecret"):
+            raise _RpcError(ERR_INVALID_PARAMS, "clientId and clientSecret are required.")
+        conn.token = "sim-" + uuid.uuid4().hex
+        return {"cortexToken": conn.token, "message": "Authorized (simulator)."}
+
+    def _get_cortex_info(self, conn, params):
+        return {"buildDate": "simulator", "buildNumber": "0", "version": "simulator"}
+
+    def _query_headsets(self, conn, params):
+        return [dict(h) for h in self.headsets]
+
+    def _control_device(self, conn, params):
+        command = params.get("command")
+        if command == "refresh":
+            self._later(self.scan_delay, self._warn(conn, HEADSET_SCANNING_FINISHED, {
+                "behavior": "Headset scanning finished.", "headsetId": HEADSET_ID}))
+            return {"command": "refresh", "message": "Refreshing the headset list."}
+        headset = self._headset(params.get("headset"))
+        if command == "connect":
+            if headset["status"] == "discovered":
+                headset["status"] = "connecting"
+                self._later(self.connect_delay, self._finish_connect(conn, headset))
+            return {"command": "connect", "message": "Start connecting to headset " + headset["id"]}
+        if command == "disconnect":
+            headset["status"] = "discovered"
+            for other in self._connections:
+                other.cancel_streams()
+            return {"command": "disconnect", "message": "Disconnected headset " + headset["id"]}
+        raise _RpcError(ERR_INVALID_PARAMS, f"Unknown controlDevice command {command!r}.")
+
+    async def _finish_connect(self, conn, headset):
+        headset["status"] = "connected"
+        await self._warn(conn, HEADSET_CONNECTED, {"behavior": "Headset is connected.", "headsetId": headset["id"]})
+
+    def _sync_with_headset_clock(self, conn, params):
+        return {"adjustment": 0.0, "headset": params.get("headset", HEADSET_ID)}
+
+    def _create_session(self, conn, params):
+        headset = self._headset(params.get("headset"))
+        if headset["status"] != "connected":
+            raise _RpcError(ERR_HEADSET_NOT_CONNECTED, "The headset is not connected.")
+        conn.session_id = str(uuid.uuid4())
+        return {"id": conn.session_id, "headset": dict(headset), "status": params.get("status", "active"),
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    def _update_session(self, conn, params):
+        session = self._session(conn, params)
+        if params.get("status") == "close":
+            conn.cancel_streams()
+            conn.session_id = None
+        return {"id": session, "status": params.get("status")}
+
+    # --- streams ---
+
+    def _subscribe(self, conn, params):
+        self._session(conn, params)
+        success, failure = [], []
+        for name in params.get("streams", []):
+            if name not in STREAM_COLS:
+                failure.append({"streamName": name, "code": ERR_STREAM_UNSUPPORTED, "message": "Stream is not supported."})
+                continue
+            if name == "sys":
+                conn.streams.setdefault("sys", None)  # training events only, no task
+            elif name not in conn.streams:
+                conn.streams[name] = asyncio.ensure_future(self._stream(conn, name))
+            success.append({"streamName": name, "cols": STREAM_COLS[name], "sid": conn.session_id})
+        if success and self.faults.disconnect_after is not None and conn.disconnect_task is None:
+            conn.disconnect_task = asyncio.ensure_future(self._disconnect_later(conn, self.faults.disconnect_after))
+        return {"success": success, "failure": failure}
+
+    def _unsubscribe(self, conn, params):
+        self._session(conn, params)
+        names = [n for n in params.get("streams", []) if n in conn.streams]
+        conn.cancel_streams(names)
+        return {"success": [{"streamName": n, "message": "Unsubscribed."} for n in names],
+                "failure": [{"streamName": n, "code": ERR_STREAM_UNSUPPORTED, "message": "Not subscribed."}
+                            for n in params.get("streams", []) if n not in names]}
+
+    async def _disconnect_later(self, conn, delay):
+        await asyncio.sleep(delay)
+        await conn.ws.close(code=1011, reason="simulated disconnect")
+
+    async def _stream(self, conn: _Connection, name: str) -> None:
+        """Send one stream at its rate x speed (replayed frames keep their recorded spacing; streams
+        missing from the replay log are synthetic)."""
+        loop = asyncio.get_running_loop()
+        rows = self.replay.get(name) if self.replay is not None else None
+        rate = STREAM_RATES[name]
+        period = (rows[-1][0] + 1.0 / rate) if rows else None  # replay loops
+        sample_time0 = time.time()
+        start = loop.time()
+        drop_rate = self.faults.sample_drop_rate
+        rnd = self._rnd
+        for n in itertools.count():
+            if rows:
+                lap, i = divmod(n, len(rows))
+                offset = lap * period + rows[i][0]
+                values = rows[i][1]
+                if name == "eeg" and conn.markers:
+                    values = values[:-1] + [conn.markers]
+            else:
+                offset = n / rate
+                values = self._signals.sample(name, n, conn.markers if name == "eeg" else [])
+            if name == "eeg" and conn.markers:
+                conn.markers = []
+            if self.speed:
+                delay = start + offset / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif n % 256 == 0:
+                await asyncio.sleep(0)
+            if drop_rate and rnd.random() < drop_rate:
+                continue
+            try:
+                await conn.send({"sid": conn.session_id, "time": round(sample_time0 + offset, 6), name: values})
+            except websockets.ConnectionClosed:
+                return
+            self.samples_sent += 1
+
+    async def _sys_event(self, conn, detection, event):
+        if "sys" in conn.streams and conn.session_id:
+            try:
+                await conn.send({"sid": conn.session_id, "time": time.time(), "sys": [detection, event]})
+            except websockets.ConnectionClosed:
+                pass
+
+    # --- profiles ---
+
+    def _query_profile(self, conn, params):
+        return [dict(p) for p in self.profiles.values()]
+
+    def _get_current_profile(self, conn, params):
+        return {"name": self.loaded_profile, "loadedByThisApp": True}
+
+    def _setup_profile(self, conn, params):
+        status, name = params.get("status"), params.get("profile")
+        if status == "create":
+            self.profiles.setdefault(name, {"name": name, "readOnly": False, "uuid": str(uuid.uuid4())})
+        elif status in ("load", "save", "unload", "delete", "rename") and name not in self.profiles and name != self.loaded_profile:
+            raise _RpcError(ERR_INVALID_PARAMS, f"Profile {name} does not exist.")
+        if status == "load":
+            self.loaded_profile = name
+        elif status == "unload":
+            self.loaded_profile = None
+        elif status == "delete":
+            self.profiles.pop(name, None)
+        return {"action": status, "name": name, "message": f"{status} profile {name} (simulator)"}
+
+    # --- records and markers ---
+
+    def _create_record(self, conn, params):
+        session = self._session(conn, params)
+        record = {"uuid": str(uuid.uuid4()), "title": params.get("title", ""), "sessionId": session,
+                  "description": params.get("description", ""), "startDatetime": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "markers": []}
+        self.records[record["uuid"]] = record
+        conn.record_id = record["uuid"]
+        return {"record": record, "sessionId": session}
+
+    def _stop_record(self, conn, params):
+        session = self._session(conn, params)
+        record = self.records.get(conn.record_id)
+        if record is None:
+            raise _RpcError(ERR_INVALID_PARAMS, "No record in progress.")
+        record["endDatetime"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        conn.record_id = None
+        self._later(0.5, self._warn(conn, CORTEX_RECORD_POST_PROCESSING_DONE, {
+            "recordId": record["uuid"], "behavior": "Data post processing finished."}))
+        return {"record": record, "sessionId": session}
+
+    def _query_records(self, conn, params):
+        records = list(self.records.values())
+        limit, offset = params.get("limit", 0), params.get("offset", 0)
+        page = records[offset:offset + limit] if limit else records[offset:]
+        return {"records": page, "count": len(records), "limit": limit, "offset": offset}
+
+    def _export_record(self, conn, params):
+        ids = params.get("recordIds", [])
+        return {"success": [{"recordId": r} for r in ids if r in self.records],
+                "failure": [{"recordId": r, "code": ERR_INVALID_PARAMS, "message": "Record not found."}
+                            for r in ids if r not in self.records]}
+
+    def _request_download_records(self, conn, params):
+        ids = params.get("recordIds", [])
+        return {"success": [{"recordId": r} for r in ids if r in self.records],
+                "failure": [{"recordId": r, "code": ERR_INVALID_PARAMS, "message": "Record not found."}
+                            for r in ids if r not in self.records]}
+
+    def _inject_marker(self, conn, params):
+        self._session(conn, params)
+        marker = {"uuid": str(uuid.uuid4()), "type": "instance", "value": params.get("value"),
+                  "label": params.get("label"), "startDatetime": params.get("time", time.time() * 1000)}
+        conn.markers.append({"value": marker["value"], "label": marker["label"]})
+        record = self.records.get(conn.record_id)
+        if record is not None:
+            record["markers"].append(marker)
+        return {"marker": marker}
+
+    def _update_marker(self, conn, params):
+        self._session(conn, params)
+        return {"marker": {"uuid": params.get("markerId"), "type": "interval", "endDatetime": params.get("time")}}
+
+    # --- training and mental commands ---
+
+    def _training(self, conn, params):
+        self._session(conn, params)
+        detection, action, status = params.get("detection"), params.get("action"), params.get("status")
+        prefix = "MC_" if detection == "mentalCommand" else "FE_"
+        if status == "start":
+            self._later(0.1, self._sys_event(conn, detection, prefix + "Started"))
+            self._later(self.training_seconds, self._sys_event(conn, detection, prefix + "Succeeded"))
+        elif status == "accept":
+            self._later(0.1, self._sys_event(conn, detection, prefix + "Completed"))
+        elif status == "reject":
+            self._later(0.1, self._sys_event(conn, detection, prefix + "Rejected"))
+        return {"action": action, "status": status, "message": f"Set up training {action} {status} successfully."}
+
+    def _mc_active_action(self, conn, params):
+        if params.get("status") == "set":
+            self.active_actions = list(params.get("actions", []))
+            return {"actions": self.active_actions, "message": "Set active actions successfully."}
+        return list(self.active_actions)
+
+    def _mc_brain_map(self, conn, params):
+        rnd = random.Random(len(self.active_actions))
+        return [{"action": a, "coordinates": [round(rnd.uniform(-1, 1), 4), round(rnd.uniform(-1, 1), 4)]}
+                for a in self.active_actions]
+
+    def _mc_training_threshold(self, conn, params):
+        return {"currentThreshold": 0.5, "lastTrainingScore": 0.62}
+
+    def _mc_action_sensitivity(self, conn, params):
+        if params.get("status") == "set":
+            self.sensitivity = list(params.get("values", []))
+            return "success"
+        return list(self.sensitivity)
+
+
+class _RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Cortex service simulator (JSON-RPC over WebSocket)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--speed", type=float, default=1.0, help="stream rate multiplier (0: as fast as possible)")
+    parser.add_argument("--replay", help="JSON-lines log of raw Cortex frames to stream instead of synthetic data")
+    parser.add_argument("--headset-status", default="discovered", choices=("discovered", "connected"))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of requests never answered")
+    parser.add_argument("--fail", action="append", default=[], metavar="METHOD", help="method that always fails")
+    parser.add_argument("--sample-drop-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-after", type=float, default=None)
+    parser.add_argument("--cert", help="TLS certificate (serve wss://)")
+    parser.add_argument("--key", help="TLS private key")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    faults = Faults(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, drop_rate=args.drop_rate,
+                    fail_methods=frozenset(args.fail), sample_drop_rate=args.sample_drop_rate,
+                    disconnect_after=args.disconnect_after)
+    sim = CortexSimulator(args.host, args.port, speed=args.speed, faults=faults, replay=args.replay,
+                          headset_status=args.headset_status, certfile=args.cert, keyfile=args.key, verbose=args.verbose)
+    try:
+        asyncio.run(sim.serve_forever())
+    except KeyboardInterrupt:
+        print("stats:", sim.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,30 @@
-"""Payload schema for collector → Jetson."""
+"""Payload schema for collector → Jetson, plus the wire codecs (JSON / MessagePack / CBOR)."""
+import array
+import json
+import sys
 from dataclasses import dataclass, field
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
-@dataclass
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+# Slotted: several of these are built every tick. Not frozen: frozen dataclass __init__ is ~2x
+# slower, and duration_seconds changes every tick, so sharing snapshots doesn't pay off.
+@dataclass(slots=True)
 class EEGMetricsSnapshot:
     """Performance metrics (met stream)."""
     metrics: dict = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class MentalStateSnapshot:
     """Mental/cognitive state from met (engagement, stress, focus, etc.). Used by agent for feedback."""
     engagement: Optional[float] = None
@@ -19,16 +34,19 @@ class MentalStateSnapshot:
     excitement: Optional[float] = None
     interest: Optional[float] = None
     metrics: dict = field(default_factory=dict)  # raw met for full detail
+    features: dict = field(default_factory=dict)  # windowed EEG features (eeg_features.FeatureExtractor), if enabled
+    label: Optional[str] = None  # stable label (MentalStateEstimator: hysteresis + dwell); None if unsmoothed
+    label_seconds: Optional[float] = None  # how long `label` has held
 
 
-@dataclass
+@dataclass(slots=True)
 class MentalCommandSnapshot:
     """Mental command (com stream: push, pull, etc.). Reserved for restaurant suggestions."""
     action: str = "neutral"
     power: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class ActivitySnapshot:
     """Current activity context."""
     app_name: str = ""
@@ -38,17 +56,39 @@ class ActivitySnapshot:
     reading_section: Optional[str] = None
     duration_seconds: Optional[float] = None  # time on this context (for reading-help)
 
+    def to_dict(self) -> dict:
+        """Wire form (a new dict on every call)."""
+        return {
+            "app_name": self.app_name,
+            "window_title": self.window_title,
+            "context_type": self.context_type,
+            "context_id": self.context_id,
+            "reading_section": self.reading_section,
+            "duration_seconds": self.duration_seconds,
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class CollectorPayload:
     """Payload sent to Jetson via WebSocket."""
-    type: str  # "eeg" | "mental_state" | "mental_command" | "activity"
+    type: str  # "eeg" | "mental_state" | "mental_command" | "activity" | "frame"
     timestamp: float = 0.0
     eeg: Optional[EEGMetricsSnapshot] = None
     mental_state: Optional[MentalStateSnapshot] = None
     mental_command: Optional[MentalCommandSnapshot] = None  # for restaurant suggestions only
     activity: Optional[ActivitySnapshot] = None
 
+    @classmethod
+    def frame(
+        cls,
+        timestamp: float,
+        activity: Optional[ActivitySnapshot] = None,
+        eeg: Optional[EEGMetricsSnapshot] = None,
+        mental_state: Optional[MentalStateSnapshot] = None,
+    ) -> "CollectorPayload":
+        """One message per tick carrying activity, eeg and mental_state (replaces three sends)."""
+        return cls(type="frame", timestamp=timestamp, eeg=eeg, mental_state=mental_state, activity=activity)
+
     def to_dict(self) -> dict:
         d = {"type": self.type, "timestamp": self.timestamp}
         if self.eeg:
@@ -60,22 +100,33 @@ class CollectorPayload:
                 "focus": ms.focus, "excitement": ms.excitement, "interest": ms.interest,
                 "metrics": ms.metrics,
             }
+            if ms.features:
+                d["mental_state"]["features"] = ms.features
+            if ms.label is not None:
+                d["mental_state"]["label"] = ms.label
+                d["mental_state"]["label_seconds"] = ms.label_seconds
+            # frame: raw met travels once, in eeg.metrics
+            if self.type == "frame" and self.eeg and ms.metrics is self.eeg.metrics:
+                del d["mental_state"]["metrics"]
         if self.mental_command:
             d["mental_command"] = {"action": self.mental_command.action, "power": self.mental_command.power}
         if self.activity:
-            d["activity"] = {
-                "app_name": self.activity.app_name,
-                "window_title": self.activity.window_title,
-                "context_type": self.activity.context_type,
-                "context_id": self.activity.context_id,
-                "reading_section": self.activity.reading_section,
-                "duration_seconds": self.activity.duration_seconds,
-            }
+            d["activity"] = self.activity.to_dict()
         return d
 
     @classmethod
-    def from_dict(cls, d: dict) -> "CollectorPayload":
-        """Parse from JSON (for Jetson processor)."""
+    def decode(cls, data: Union[dict, str, bytes], codec: Optional[str] = None) -> "CollectorPayload":
+        """
+        Parse a payload from a dict, JSON text or a binary frame (for Jetson processor).
+        Text is always JSON; bytes are decoded with `codec` (the one agreed in the hello handshake).
+        """
+        if isinstance(data, dict):
+            d = _unpack_streams(data)
+        elif isinstance(data, (bytes, bytearray, memoryview)) and codec not in (None, "json"):
+            d = get_codec(codec).loads(bytes(data))
+        else:
+            d = json.loads(data)
+
         eeg = None
         if d.get("eeg"):
             m = d["eeg"].get("metrics", d["eeg"]) if isinstance(d["eeg"], dict) else {}
@@ -84,11 +135,18 @@ class CollectorPayload:
         ms = None
         if d.get("mental_state"):
             ms_d = d["mental_state"] if isinstance(d["mental_state"], dict) else {}
+            metrics = ms_d.get("metrics")
+            if metrics is None:
+                # frame: mental_state shares the raw met carried in eeg.metrics
+                metrics = eeg.metrics if eeg is not None and d.get("type") == "frame" else {}
             ms = MentalStateSnapshot(
                 engagement=ms_d.get("engagement"), stress=ms_d.get("stress"),
                 relaxation=ms_d.get("relaxation"), focus=ms_d.get("focus"),
                 excitement=ms_d.get("excitement"), interest=ms_d.get("interest"),
-                metrics=ms_d.get("metrics", {}),
+                metrics=metrics,
+                features=ms_d.get("features") or {},
+                label=ms_d.get("label"),
+                label_seconds=ms_d.get("label_seconds"),
             )
 
         mc = None
@@ -120,3 +178,175 @@ class CollectorPayload:
             mental_command=mc,
             activity=act,
         )
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CollectorPayload":
+        """Parse from a JSON-shaped dict. Same as decode(d)."""
+        return cls.decode(d)
+
+
+# --- Wire codecs ---
+# Text frames are always JSON. After the Jetson advertises its codecs ({"type": "hello", "codecs": [...]})
+# the collector answers {"type": "hello_ack", "codec": name} and sends payloads as binary frames in that codec.
+# Binary codecs pack numeric stream arrays under metrics as little-endian float32:
+#   "met": [true, 0.65, null, ...]  ->  "met": {"f32": <bytes>, "bool": <bitmask bytes, only if any bools>}
+# None travels as NaN; positions flagged in the bitmask come back as bools.
+
+PACKED_STREAMS = ("met", "pow", "eeg")
+_NAN = float("nan")
+
+
+def pack_floats(values: list) -> Optional[dict]:
+    """Pack a list of numbers/bools/None as float32. None if it holds anything else."""
+    out = array.array("f")
+    mask = bytearray((len(values) + 7) // 8)
+    has_bool = False
+    for i, v in enumerate(values):
+        if v is None:
+            out.append(_NAN)
+        elif isinstance(v, bool):
+            out.append(1.0 if v else 0.0)
+            mask[i >> 3] |= 1 << (i & 7)
+            has_bool = True
+        elif isinstance(v, (int, float)):
+            out.append(v)
+        else:
+            return None
+    if sys.byteorder == "big":
+        out.byteswap()
+    packed = {"f32": out.tobytes()}
+    if has_bool:
+        packed["bool"] = bytes(mask)
+    return packed
+
+
+def unpack_floats(packed: dict) -> list:
+    """Inverse of pack_floats (values come back at float32 precision)."""
+    a = array.array("f")
+    a.frombytes(packed["f32"])
+    if sys.byteorder == "big":
+        a.byteswap()
+    mask = packed.get("bool") or b""
+    out = []
+    for i, v in enumerate(a):
+        if v != v:
+            out.append(None)
+        elif mask and mask[i >> 3] & (1 << (i & 7)):
+            out.append(v != 0.0)
+        else:
+            out.append(v)
+    return out
+
+
+def _map_streams(d: dict, fn) -> dict:
+    """Copy of d with fn applied to PACKED_STREAMS values under eeg/mental_state metrics."""
+    out = d
+    for section in ("eeg", "mental_state"):
+        sec = d.get(section)
+        metrics = sec.get("metrics") if isinstance(sec, dict) else None
+        if not isinstance(metrics, dict):
+            continue
+        new_metrics = None
+        for key in PACKED_STREAMS:
+            value = metrics.get(key)
+            if value is None:
+                continue
+            converted = fn(value)
+            if converted is not None:
+                if new_metrics is None:
+                    new_metrics = dict(metrics)
+                new_metrics[key] = converted
+        if new_metrics is not None:
+            if out is d:
+                out = dict(d)
+            out[section] = {**sec, "metrics": new_metrics}
+    return out
+
+
+def _pack_streams(d: dict) -> dict:
+    return _map_streams(d, lambda v: pack_floats(v) if isinstance(v, list) else None)
+
+
+def _unpack_streams(d: dict) -> dict:
+    return _map_streams(d, lambda v: unpack_floats(v) if isinstance(v, dict) and "f32" in v else None)
+
+
+class JsonCodec:
+    """Current behavior: to_dict() + json.dumps, sent as text frames."""
+    name = "json"
+    binary = False
+
+    def dumps(self, d: dict) -> str:
+        return json.dumps(d)
+
+    def loads(self, data) -> dict:
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, d: dict) -> bytes:
+        return msgpack.packb(_pack_streams(d), use_bin_type=True)
+
+    def loads(self, data: bytes) -> dict:
+        return _unpack_streams(msgpack.unpackb(data, raw=False))
+
+
+class CborCodec:
+    name = "cbor"
+    binary = True
+
+    def dumps(self, d: dict) -> bytes:
+        return cbor2.dumps(_pack_streams(d))
+
+    def loads(self, data: bytes) -> dict:
+        return _unpack_streams(cbor2.loads(data))
+
+
+CODECS: dict = {"json": JsonCodec()}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+if cbor2 is not None:
+    CODECS["cbor"] = CborCodec()
+
+# Most compact first
+CODEC_PREFERENCE = ("msgpack", "cbor", "json")
+
+
+def available_codecs() -> list:
+    """Codecs usable in this process, in preference order."""
+    return [name for name in CODEC_PREFERENCE if name in CODECS]
+
+
+def get_codec(name: str):
+    codec = CODECS.get(name)
+    if codec is None:
+        hint = {"msgpack": "pip install msgpack", "cbor": "pip install cbor2"}.get(name, "unknown codec")
+        raise ValueError(f"Codec {name!r} not available ({hint})")
+    return codec
+
+
+def negotiate_codec(offered: list, preferred: Optional[list] = None) -> str:
+    """First of our preferred codecs that the peer offered; JSON if none match."""
+    for name in preferred if preferred is not None else available_codecs():
+        if name in offered and name in CODECS:
+            return name
+    return "json"
+
+
+def hello_message(codecs: Optional[list] = None) -> dict:
+    """Sent by the Jetson on connect to advertise the codecs it can decode."""
+    return {"type": "hello", "codecs": list(codecs if codecs is not None else available_codecs())}
+
+
+def hello_ack_message(codec: str) -> dict:
+    """Collector's answer: binary frames from now on are in `codec`."""
+    return {"type": "hello_ack", "codec": codec}
+
+
+def encode(message: Any, codec: str = "json") -> Union[str, bytes]:
+    """Serialize a CollectorPayload (or plain dict) with the named codec."""
+    d = message.to_dict() if hasattr(message, "to_dict") else message
+    return get_codec(codec).dumps(d)
@@ -18,6 +18,7 @@ class EmotivCortexClient:
         on_metrics=None,
         streams=None,
         profile_name=None,
+        store=None,
     ):
         self.client_id = client_id or config.EMOTIV_CLIENT_ID
         self.client_secret = client_secret or config.EMOTIV_CLIENT_SECRET
@@ -25,15 +26,33 @@ class EmotivCortexClient:
         self.streams = streams or ["met"]
         self.profile_name = profile_name or getattr(config, "EMOTIV_PROFILE", "") or "Elijah"
         self.activity = ActivityMonitor(poll_interval=config.POLL_INTERVAL)
+        self.store = store  # optional stream_store.StreamStore: keeps recent history of subscribed streams
         self._cortex = None
         self._thread = None
 
     def connect(self):
         """Connect to Cortex and start streaming."""
+        self._make_cortex(self.client_id, self.client_secret)
+        self._thread = threading.Thread(target=self._cortex.open, daemon=True)
+        self._thread.start()
+
+    def replay(self, path, speed=1.0):
+        """
+        Stream a Cortex capture (see cortex_capture.py) instead of the headset: same handlers,
+        same on_metrics. speed: 1.0 real time, N times faster, 0 as fast as possible.
+        """
+        from cortex_capture import replay
+
+        self._make_cortex(self.client_id or "replay", self.client_secret or "replay", capture=None)
+        self._thread = threading.Thread(target=replay, args=(path, self._cortex, speed), daemon=True)
+        self._thread.start()
+
+    def _make_cortex(self, client_id, client_secret, **kwargs):
         self._cortex = Cortex(
-            self.client_id,
-            self.client_secret,
+            client_id,
+            client_secret,
             debug_mode=False,
+            **kwargs,
         )
         self._cortex.set_wanted_profile(self.profile_name)
         self._cortex.bind(create_session_done=self._on_create_session)
@@ -42,11 +61,10 @@ class EmotivCortexClient:
         self._cortex.bind(new_met_data=self._on_met)
         self._cortex.bind(new_data_labels=self._on_data_labels)
         self._cortex.bind(inform_error=self._on_error)
+        if self.store is not None:
+            self.store.attach(self._cortex)
         self._met_cols = []  # cols from subscription; order of values in met array
 
-        self._thread = threading.Thread(target=self._cortex.open, daemon=True)
-        self._thread.start()
-
     def _subscribe_streams(self):
         """Subscribe to data streams. Called after profile is loaded."""
         self._cortex.sub_request(self.streams)
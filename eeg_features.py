@@ -0,0 +1,271 @@
+"""
+Windowed EEG features over the stream store (NumPy, incremental).
+
+From the pow stream (per-channel band power, labels like "AF3/theta") and the eeg stream,
+over a sliding window (default 30 s) emitted every hop (default 0.5 s):
+- rolling mean and variance per band/channel and per eeg channel
+- band power averaged over channels, weighted by contact quality from dev (0..4)
+- theta/beta ratio: theta / (betaL + betaH)
+- frontal alpha asymmetry: ln(alpha F4) - ln(alpha F3) (AF4/AF3 if F3/F4 are missing)
+
+Each update only touches samples that entered or left the window since the last one.
+
+Usage:
+  store = StreamStore(); store.attach(cortex)        # subscribe pow (+ eeg, dev)
+  features = FeatureExtractor(store)
+  ms.features = features.update() or features.latest
+"""
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BANDS = ("theta", "alpha", "betaL", "betaH", "gamma")
+# Ratio/asymmetry features are only stable over tens of seconds; the incremental update
+# also only pays off over a naive recompute for windows longer than ~10 s (bench_eeg_features.py)
+DEFAULT_WINDOW_SEC = 30.0
+DEFAULT_HOP_SEC = 0.5
+CQ_MAX = 4.0  # dev contact quality scale: 0 = no contact, 4 = good
+# Recompute window sums from scratch every N updates so add/subtract rounding can't accumulate
+RESYNC_EVERY = 2000
+# eeg columns that are not electrode channels
+EEG_NON_CHANNELS = ("COUNTER", "INTERPOLATED", "RAW_CQ", "MARKER_HARDWARE", "MARKERS")
+ASYMMETRY_PAIRS = (("F4", "F3"), ("AF4", "AF3"))
+_ALPHA = BANDS.index("alpha")
+
+
+class RollingStats:
+    """
+    Per-column mean/variance over the last window_sec of a StreamRing.
+    Keeps running sums of (x - shift) and (x - shift)^2 and per-column counts of finite values,
+    so NaN cells (missing pow values) are left out of their column only; update() adds samples
+    that entered the window and subtracts those that left. window_sec must fit in the ring.
+    """
+
+    def __init__(self, ring, window_sec: float, columns: Optional[list] = None):
+        if np is None:
+            raise RuntimeError("pip install numpy")
+        self.ring = ring
+        self.window_sec = window_sec
+        self.columns = np.asarray(columns if columns is not None else range(len(ring.labels)), dtype=np.intp)
+        self.reset()
+
+    def reset(self) -> None:
+        k = len(self.columns)
+        self._sum = np.zeros(k)
+        self._sumsq = np.zeros(k)
+        self._cnt = np.zeros(k, dtype=np.int64)  # finite values per column
+        self._shift = None
+        self._n = 0  # rows in the window
+        self._t_first = np.inf  # oldest sample added since the sums were last empty
+        self._t_in = -np.inf  # newest sample time already added
+        self._t_out = -np.inf  # samples with time <= this are already removed
+        self._updates = 0
+
+    @property
+    def count(self) -> int:
+        return self._n
+
+    def update(self) -> bool:
+        """Advance the window to the ring's newest sample. False if the ring is empty."""
+        t_end = self.ring.latest_time()
+        if t_end is None:
+            return False
+        self._updates += 1
+        oldest = self.ring.oldest_time()
+        if self._updates % RESYNC_EVERY == 0 or (self._n and oldest > max(self._t_out, self._t_first)):
+            # Periodic resync, or samples still in our sums were overwritten during a long gap
+            self.reset()
+            self._updates = 1
+        if t_end > self._t_in:
+            t, x = self.ring.since(self._t_in, t_end)
+            if len(x):
+                x = x[:, self.columns]
+                if self._shift is None:
+                    self._shift = _first_finite(x)
+                if not self._n:
+                    self._t_first = float(t[0])
+                self._accumulate(x, 1)
+                self._n += len(x)
+            self._t_in = t_end
+        t_start = t_end - self.window_sec
+        if t_start > self._t_out:
+            _, x = self.ring.since(self._t_out, t_start)
+            if len(x):
+                self._accumulate(x[:, self.columns], -1)
+                self._n -= len(x)
+            self._t_out = t_start
+        return True
+
+    def _accumulate(self, x, sign: int) -> None:
+        d = x - self._shift
+        sq = np.einsum("ij,ij->j", d, d)
+        if np.isnan(sq).any():  # NaN cells: leave them out of their column's sums and count
+            finite = np.isfinite(d)
+            d = np.where(finite, d, 0.0)
+            sq = np.einsum("ij,ij->j", d, d)
+            self._cnt += sign * finite.sum(axis=0)
+        else:
+            self._cnt += sign * len(d)
+        self._sum += sign * d.sum(axis=0)
+        self._sumsq += sign * sq
+
+    def mean(self):
+        """Per-column mean; NaN for a column with no finite value in the window."""
+        if not self._n:
+            return None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._shift + self._sum / self._cnt
+
+    def var(self):
+        if not self._n:
+            return None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = self._sum / self._cnt
+            return np.maximum(self._sumsq / self._cnt - m * m, 0.0)
+
+
+def _first_finite(x):
+    """Per column, the first finite value of x (0 for a column with none): the sums' shift."""
+    finite = np.isfinite(x)
+    shift = x[finite.argmax(axis=0), np.arange(x.shape[1])].astype(float)
+    shift[~finite.any(axis=0)] = 0.0
+    return shift
+
+
+def _pow_layout(labels: list):
+    """(channels, grid): grid[b, c] = column of f"{channels[c]}/{BANDS[b]}"; None if incomplete."""
+    channels = []
+    for label in labels:
+        ch, _, band = label.partition("/")
+        if band == BANDS[0]:
+            channels.append(ch)
+    index = {label: i for i, label in enumerate(labels)}
+    try:
+        grid = np.array([[index[f"{ch}/{band}"] for ch in channels] for band in BANDS], dtype=np.intp)
+    except KeyError:
+        return None, None
+    return channels, grid
+
+
+class FeatureExtractor:
+    """Sliding-window features from a StreamStore. update() returns a dict every hop_sec of pow time."""
+
+    def __init__(self, store, window_sec: float = DEFAULT_WINDOW_SEC, hop_sec: float = DEFAULT_HOP_SEC):
+        if np is None:
+            raise RuntimeError("pip install numpy")
+        if window_sec >= store.seconds:
+            raise ValueError("window_sec must be shorter than the store's history (seconds)")
+        self.store = store
+        self.window_sec = window_sec
+        self.hop_sec = hop_sec
+        self.latest: dict = {}
+        self.channels: list = []
+        self.band_means = None  # (bands, channels) for the latest window
+        self.band_vars = None
+        self._pow = None
+        self._eeg = None
+        self._grid = None
+        self._asym = None  # (right, left) channel indices for alpha asymmetry
+        self._dev_ring = None
+        self._dev_cols = None
+        self._weights = None
+        self._weights_at = None
+        self._last_emit = -np.inf
+
+    def _bind(self) -> bool:
+        ring = self.store.ring("pow")
+        if ring is None:
+            return False
+        if self._pow is None or self._pow.ring is not ring:
+            self.channels, self._grid = _pow_layout(ring.labels)
+            if self._grid is None:
+                return False
+            self._dev_ring = None
+            self._asym = next(
+                ((self.channels.index(r), self.channels.index(l)) for r, l in ASYMMETRY_PAIRS
+                 if r in self.channels and l in self.channels),
+                None,
+            )
+            self._pow = RollingStats(ring, self.window_sec)
+        eeg = self.store.ring("eeg")
+        if eeg is not None and (self._eeg is None or self._eeg.ring is not eeg):
+            cols = [i for i, label in enumerate(eeg.labels) if label not in EEG_NON_CHANNELS]
+            self._eeg = RollingStats(eeg, self.window_sec, cols) if cols else None
+        return True
+
+    def update(self, force: bool = False) -> Optional[dict]:
+        """New features if at least hop_sec of pow data arrived since the last ones, else None."""
+        if not self._bind():
+            return None
+        t = self._pow.ring.latest_time()
+        if t is None or (not force and t - self._last_emit < self.hop_sec):
+            return None
+        self._last_emit = t
+        self._pow.update()
+        if self._eeg is not None:
+            self._eeg.update()
+        feats = self._compute(t)
+        if feats is not None:
+            self.latest = feats
+        return feats
+
+    def quality_weights(self):
+        """Per-channel weights in [0, 1] from the newest dev sample (ones if no dev stream)."""
+        dev = self.store.ring("dev")
+        if dev is None or not len(dev):
+            return np.ones(len(self.channels))
+        if self._dev_ring is not dev:
+            # pow channel i -> dev column (-1: channel has no contact-quality reading)
+            self._dev_cols = np.array([dev.labels.index(ch) if ch in dev.labels else -1 for ch in self.channels], dtype=np.intp)
+            self._dev_ring = dev
+            self._weights_at = None
+        t = dev.latest_time()
+        if t != self._weights_at:  # dev arrives at ~2 Hz: recompute only on a new sample
+            row = dev.last_samples(1)[1][0]
+            w = np.where(self._dev_cols >= 0, row[self._dev_cols] / CQ_MAX, 1.0)
+            self._weights = np.clip(np.nan_to_num(w), 0.0, 1.0)
+            self._weights_at = t
+        return self._weights
+
+    def _compute(self, t: float) -> Optional[dict]:
+        mean = self._pow.mean()
+        if mean is None:
+            return None
+        # RollingStats over pow covers every column, so grid indexes its output directly
+        self.band_means = mean[self._grid]
+        self.band_vars = self._pow.var()[self._grid]
+
+        w = self.quality_weights()
+        total = w.sum()
+        if total <= 0:
+            w, total = np.ones_like(w), float(len(w))
+        band_power = self.band_means @ w / total
+        band_var = self.band_vars @ w / total
+        bp = dict(zip(BANDS, band_power.tolist()))
+
+        beta = bp["betaL"] + bp["betaH"]
+        feats = {
+            "time": t,
+            "window_sec": self.window_sec,
+            "samples": self._pow.count,
+            "band_power": bp,
+            "band_var": dict(zip(BANDS, band_var.tolist())),
+            "theta_beta_ratio": bp["theta"] / beta if beta > 0 else None,
+            "alpha_asymmetry": self._alpha_asymmetry(),
+            "signal_quality": float(w.mean()),
+        }
+        if self._eeg is not None and self._eeg.count:
+            eeg_var = self._eeg.var()
+            feats["eeg_var"] = float(eeg_var.mean())
+        return feats
+
+    def _alpha_asymmetry(self) -> Optional[float]:
+        if self._asym is None:
+            return None
+        right, left = self.band_means[_ALPHA, self._asym[0]], self.band_means[_ALPHA, self._asym[1]]
+        if right > 0 and left > 0:
+            return float(np.log(right) - np.log(left))
+        return None
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Export the session history (session_store.py, config.DB_PATH) to day-partitioned files for
+offline analysis.
+
+Each table is read in time order, chunk_rows at a time, and written to
+  <out>/<table>/date=YYYY-MM-DD/part-0.parquet      (pyarrow; one row group per chunk)
+  <out>/<table>/date=YYYY-MM-DD/part-0.csv.gz       (fallback without pyarrow, or --format csv)
+so memory stays bounded by one chunk whatever the history size. Days are local time.
+Re-exporting a day replaces its file.
+
+Usage:
+  python export_sessions.py --out exports
+  python export_sessions.py --out exports --since 2026-02-14 --until 2026-02-16
+  python export_sessions.py --out exports --format csv
+
+  import pandas as pd
+  sessions = pd.read_parquet("exports/sessions")      # all days; `date` column from the partition
+"""
+import argparse
+import csv
+import gzip
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+import config
+
+# table -> time column used for ordering and day partitioning
+TABLES = {
+    "sessions": "started_at",
+    "session_events": "at",
+    "help_requests": "requested_at",
+    "help_responses": "responded_at",
+    "mental_state": "t",
+}
+CHUNK_ROWS = 50000
+FORMATS = ("parquet", "csv")
+
+
+def _arrow_type(declared: str):
+    declared = declared.upper()
+    if "INT" in declared:
+        return pa.int64()
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return pa.float64()
+    return pa.string()
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list[tuple[str, str]]:
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _day_start(d: date) -> float:
+    return datetime(d.year, d.month, d.day).timestamp()
+
+
+class _DayWriter:
+    """Writes one table's rows for one day; rows arrive in chunks."""
+
+    def __init__(self, path: Path, columns: list[tuple[str, str]], fmt: str, day: str):
+        self.path = path
+        self.day = day
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.names = [name for name, _ in columns]
+        self.fmt = fmt
+        self.rows = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if fmt == "parquet":
+            self.schema = pa.schema([(name, _arrow_type(declared)) for name, declared in columns])
+            self._writer = pq.ParquetWriter(self.tmp, self.schema, compression="zstd")
+        else:
+            self._file = gzip.open(self.tmp, "wt", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.names)
+
+    def write(self, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        self.rows += len(rows)
+        if self.fmt == "parquet":
+            cols = list(zip(*rows))
+            arrays = [pa.array(col, type=f.type) for col, f in zip(cols, self.schema)]
+            self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        else:
+            self._writer.writerows(rows)
+
+    def close(self) -> None:
+        if self.fmt == "parquet":
+            self._writer.close()
+        else:
+            self._file.close()
+        os.replace(self.tmp, self.path)
+
+
+def export_table(
+    conn: sqlite3.Connection,
+    table: str,
+    out: Path,
+    fmt: str,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> dict:
+    """Stream one table into per-day files. Returns {day: rows}."""
+    time_col = TABLES[table]
+    columns = _columns(conn, table)
+    if not columns:
+        return {}
+    where, params = [], []
+    if since is not None:
+        where.append(f"{time_col} >= ?")
+        params.append(since)
+    if until is not None:
+        where.append(f"{time_col} < ?")
+        params.append(until)
+    sql = f"SELECT {', '.join(name for name, _ in columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    cur = conn.execute(sql + f" ORDER BY {time_col}", params)
+    t_idx = [name for name, _ in columns].index(time_col)
+    ext = "parquet" if fmt == "parquet" else "csv.gz"
+
+    counts: dict[str, int] = {}
+    writer, day_end = None, None
+    while True:
+        chunk = cur.fetchmany(chunk_rows)
+        if not chunk:
+            break
+        start = 0
+        for i, row in enumerate(chunk):
+            t = row[t_idx]
+            if day_end is not None and t < day_end:
+                continue
+            # Rows are time-ordered: a new day means the previous day's file is complete
+            if writer is not None:
+                writer.write(chunk[start:i])
+                writer.close()
+                counts[writer.day] = writer.rows
+            d = datetime.fromtimestamp(t).date()
+            day_end = _day_start(d + timedelta(days=1))
+            writer = _DayWriter(out / table / f"date={d.isoformat()}" / f"part-0.{ext}", columns, fmt, d.isoformat())
+            start = i
+        writer.write(chunk[start:])
+    if writer is not None:
+        writer.close()
+        counts[writer.day] = writer.rows
+    return counts
+
+
+def export(
+    out,
+    db_path=None,
+    fmt: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    tables=None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> dict:
+    """Export tables (default: all) for days [since, until). Returns {table: {day: rows}}."""
+    fmt = fmt or ("parquet" if pa is not None else "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("pip install pyarrow (or use format='csv')")
+    db_path = Path(db_path or config.DB_PATH)
+    # Read-only: safe while app.py is writing (WAL)
+    conn = sqlite3.connect(db_path.resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        t0 = _day_start(since) if since else None
+        t1 = _day_start(until) if until else None
+        return {
+            table: export_table(conn, table, Path(out), fmt, t0, t1, chunk_rows)
+            for table in (tables or TABLES)
+            if table in present
+        }
+    finally:
+        conn.close()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export session history to day-partitioned Parquet (or CSV.gz)")
+    p.add_argument("--out", required=True, help="Output directory")
+    p.add_argument("--db", default=None, help=f"SQLite database (default: {config.DB_PATH})")
+    p.add_argument("--format", choices=FORMATS, default=None, help="Default: parquet if pyarrow is installed, else csv")
+    p.add_argument("--since", type=date.fromisoformat, default=None, help="First day (YYYY-MM-DD, local)")
+    p.add_argument("--until", type=date.fromisoformat, default=None, help="Day after the last one (YYYY-MM-DD)")
+    p.add_argument("--tables", nargs="+", choices=list(TABLES), default=None)
+    p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = p.parse_args()
+
+    result = export(args.out, args.db, args.format, args.since, args.until, args.tables, args.chunk_rows)
+    for table, days in result.items():
+        total = sum(days.values())
+        print(f"  {table:15s} {total:8d} rows in {len(days)} day(s)")
+
+
+if __name__ == "__main__":
+    main()
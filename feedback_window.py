@@ -12,6 +12,7 @@ import tkinter as tk
 try:
     import requests
     _REQUESTS_AVAILABLE = True
+    from jetson_client import feedback_from, get_client, split_url
 except ImportError:
     _REQUESTS_AVAILABLE = False
 
@@ -88,13 +89,12 @@ class FeedbackWindow:
 
     def _poll(self) -> None:
         """Background thread: poll GET /feedback and update window."""
-        headers = {"ngrok-skip-browser-warning": "1"}
+        client = get_client(split_url(self._poll_url)[0]) if _REQUESTS_AVAILABLE else None
         while self._polling and _REQUESTS_AVAILABLE:
             try:
-                r = requests.get(self._poll_url, headers=headers, timeout=5)
+                r = client.get(self._poll_url, timeout=5)
                 if r.status_code == 200:
-                    data = r.json()
-                    msg = (data.get("feedback") or data.get("message") or "").strip()
+                    msg = (feedback_from(r) or "").strip()
                     if msg and msg != self._last_feedback:
                         self._last_feedback = msg
                         self.update_feedback(msg)
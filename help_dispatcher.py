@@ -0,0 +1,175 @@
+"""
+Off-thread dispatch of help requests (POST /eeg) so a slow Jetson never blocks
+activity polling or session tracking.
+
+- Bounded queue served by a small worker pool
+- Coalescing: a second request for a context_id already queued/in flight is dropped
+- Cancellation: when the user switches context, pending requests for other contexts
+  are removed from the queue (freeing their slots) and late results are discarded
+- Stats: queue depth plus queue-wait and request-latency histograms; every submitted job ends
+  up in exactly one of cancelled/completed/failed
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+@dataclass
+class HelpJob:
+    context_id: str
+    body: dict
+    submitted_at: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram (seconds). Thread-safe."""
+
+    BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, float("inf"))
+
+    def __init__(self):
+        self._counts = [0] * len(self.BUCKETS)
+        self._total = 0.0
+        self._n = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            for i, upper in enumerate(self.BUCKETS):
+                if seconds <= upper:
+                    self._counts[i] += 1
+                    break
+            self._n += 1
+            self._total += seconds
+            self._max = max(self._max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self._n,
+                "mean": self._total / self._n if self._n else None,
+                "max": self._max if self._n else None,
+                "buckets": {("+inf" if u == float("inf") else f"<={u:g}s"): c for u, c in zip(self.BUCKETS, self._counts)},
+            }
+
+
+class HelpDispatcher:
+    """
+    send(body) runs on a worker thread and returns the feedback text (or None); it may raise.
+    on_result(text) is called with non-empty feedback; on_error(exc) on failure.
+    Neither is called for jobs cancelled by a context switch.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[dict], Optional[str]],
+        on_result: Callable[[str], None],
+        on_error: Optional[Callable[[Exception], None]] = None,
+        workers: int = 2,
+        max_queue: int = 8,
+    ):
+        self._send = send
+        self._on_result = on_result
+        self._on_error = on_error
+        self._max_queue = max_queue
+        self._pending: deque[HelpJob] = deque()  # queued, not cancelled
+        self._active: dict[str, HelpJob] = {}  # context_id -> queued or in-flight job
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._stopping = False
+        self._in_flight = 0
+        self.queue_wait = LatencyHistogram()
+        self.latency = LatencyHistogram()
+        self._counters = {"submitted": 0, "coalesced": 0, "dropped": 0, "cancelled": 0, "completed": 0, "failed": 0}
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"HelpDispatcher-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._workers:
+            t.start()
+
+    def submit(self, context_id: str, body: dict) -> bool:
+        """Queue a help request. False if coalesced with an active one or the queue is full."""
+        with self._lock:
+            existing = self._active.get(context_id)
+            if existing is not None and not existing.cancelled:
+                self._counters["coalesced"] += 1
+                return False
+            if len(self._pending) >= self._max_queue:
+                self._counters["dropped"] += 1
+                return False
+            job = HelpJob(context_id=context_id, body=body)
+            self._pending.append(job)
+            self._active[context_id] = job
+            self._counters["submitted"] += 1
+            self._ready.notify()
+            return True
+
+    def cancel_others(self, context_id: str) -> int:
+        """User is now on context_id: cancel queued/in-flight jobs for every other context."""
+        with self._lock:
+            if not self._active or (len(self._active) == 1 and context_id in self._active):
+                return 0
+            n = 0
+            for cid, job in list(self._active.items()):
+                if cid != context_id and not job.cancelled:
+                    job.cancelled = True
+                    del self._active[cid]
+                    n += 1
+            if n:
+                self._pending = deque(job for job in self._pending if not job.cancelled)
+            self._counters["cancelled"] += n
+            return n
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counters)
+            out["queue_depth"] = len(self._pending)
+            out["in_flight"] = self._in_flight
+        out["queue_wait"] = self.queue_wait.snapshot()
+        out["latency"] = self.latency.snapshot()
+        return out
+
+    def stop(self) -> None:
+        """Workers exit once the queued jobs are done."""
+        with self._lock:
+            self._stopping = True
+            self._ready.notify_all()
+
+    def _worker(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopping:
+                    self._ready.wait()
+                if not self._pending:
+                    return
+                job = self._pending.popleft()
+                self._in_flight += 1
+            started = time.monotonic()
+            self.queue_wait.observe(started - job.submitted_at)
+            result, error = None, None
+            try:
+                result = self._send(job.body)
+            except Exception as e:
+                error = e
+            self.latency.observe(time.monotonic() - started)
+            with self._lock:
+                self._in_flight -= 1
+                if self._active.get(job.context_id) is job:
+                    del self._active[job.context_id]
+                cancelled = job.cancelled
+                if not cancelled:  # already counted under "cancelled"
+                    self._counters["failed" if error else "completed"] += 1
+            if cancelled:
+                continue
+            try:
+                if error is not None:
+                    if self._on_error:
+                        self._on_error(error)
+                elif result:
+                    self._on_result(result)
+            except Exception:
+                pass
@@ -0,0 +1,151 @@
+"""
+Shared HTTP client for the Jetson processor (POST /eeg, GET /feedback).
+
+One pooled keep-alive requests.Session per base URL, so repeated calls reuse the
+TCP+TLS connection to the ngrok endpoint instead of handshaking every time.
+Adds jittered-backoff retries, per-endpoint timeouts and optional gzip request bodies.
+
+Retries never duplicate work on the processor: GETs (and POSTs marked idempotent=True) are
+retried on connection failures and proxy 502/503/504; other POSTs (POST /eeg triggers the
+agent) only when the request provably never left this host (connect refused / timed out),
+since a 504 from the tunnel can arrive after the processor already acted.
+
+Usage:
+  client = get_client(config.JETSON_BASE)
+  r = client.post_json("/eeg", body)
+  fb = feedback_from(r)
+"""
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.exceptions import NewConnectionError
+except ImportError:
+    requests = None
+
+# Seconds per endpoint path; anything else uses DEFAULT_TIMEOUT
+ENDPOINT_TIMEOUTS = {"/eeg": 30.0, "/feedback": 5.0}
+DEFAULT_TIMEOUT = 10.0
+# Compress POST bodies at least this large (bytes); 0 disables. Backend must accept Content-Encoding: gzip.
+GZIP_MIN_BYTES = int(os.environ.get("JETSON_GZIP_MIN_BYTES", "0"))
+# Status codes from the tunnel/proxy worth retrying (idempotent requests only: the processor
+# may still have handled the request, e.g. a 504 after it acted)
+RETRY_STATUSES = (502, 503, 504)
+
+
+def split_url(url: str) -> tuple[str, str]:
+    """'https://host/eeg' -> ('https://host', '/eeg')."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}", parts.path or "/"
+
+
+class JetsonClient:
+    """Pooled, retrying HTTP client bound to one Jetson base URL. Thread-safe."""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeouts: Optional[dict] = None,
+        retries: int = 2,
+        backoff_sec: float = 0.25,
+        max_backoff_sec: float = 4.0,
+        gzip_min_bytes: int = GZIP_MIN_BYTES,
+        pool_size: int = 4,
+    ):
+        if requests is None:
+            raise RuntimeError("pip install requests")
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {**ENDPOINT_TIMEOUTS, **(timeouts or {})}
+        self.retries = retries
+        self.backoff_sec = backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+        self.gzip_min_bytes = gzip_min_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"ngrok-skip-browser-warning": "1"})
+        self._sleep = time.sleep
+
+    def post_json(self, path: str, body: dict, timeout: Optional[float] = None, compress: Optional[bool] = None,
+                  idempotent: bool = False):
+        """
+        POST body as JSON. Retried only when it can't have reached the processor, unless
+        idempotent=True (then like GET: connection failures and proxy 502/503/504 too).
+        """
+        data = json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if compress is None:
+            compress = self.gzip_min_bytes > 0 and len(data) >= self.gzip_min_bytes
+        if compress:
+            data = gzip.compress(data, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return self._request("POST", path, timeout, idempotent, data=data, headers=headers)
+
+    def get(self, path: str, timeout: Optional[float] = None, **kwargs):
+        return self._request("GET", path, timeout, True, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _request(self, method: str, path: str, timeout: Optional[float], idempotent: bool, **kwargs):
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+        if timeout is None:
+            url_path = split_url(url)[1].rstrip("/")
+            timeout = next((t for p, t in self.timeouts.items() if url_path.endswith(p)), DEFAULT_TIMEOUT)
+        attempt = 0
+        while True:
+            try:
+                r = self.session.request(method, url, timeout=timeout, **kwargs)
+                if not idempotent or r.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return r
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A read timeout or dropped connection may mean the processor is still working
+                if attempt >= self.retries or not (idempotent or _never_sent(e)):
+                    raise
+            attempt += 1
+            # Full jitter: spread retries so several senders don't hit the tunnel in lockstep
+            self._sleep(random.uniform(0, min(self.max_backoff_sec, self.backoff_sec * (2 ** attempt))))
+
+
+def _never_sent(e: Exception) -> bool:
+    """The connection was never established, so the request can't have reached the processor."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def feedback_from(r) -> Optional[str]:
+    """Agent feedback text from a /eeg or /feedback response, if any."""
+    if r.status_code != 200 or not r.text:
+        return None
+    try:
+        data = r.json()
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return data.get("feedback") or data.get("message")
+
+
+_clients: dict[str, JetsonClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str) -> JetsonClient:
+    """Shared client for base_url. For a full endpoint URL use get_client(split_url(url)[0]).post_json(url, ...)."""
+    base = base_url.rstrip("/")
+    with _clients_lock:
+        client = _clients.get(base)
+        if client is None:
+            client = _clients[base] = JetsonClient(base)
+        return client
@@ -27,6 +27,7 @@ from time_tracker import SessionTracker, SessionEvent, SessionEventType
 try:
     import requests
     _REQUESTS_AVAILABLE = True
+    from jetson_client import feedback_from, get_client, split_url
 except ImportError:
     _REQUESTS_AVAILABLE = False
 
@@ -52,15 +53,8 @@ def _post_for_help(
         "context": context,
     }
     try:
-        r = requests.post(
-            jetson_url,
-            json=body,
-            headers={"Content-Type": "application/json", "ngrok-skip-browser-warning": "1"},
-            timeout=15,
-        )
-        if r.status_code == 200 and r.text:
-            data = r.json()
-            return data.get("feedback") or data.get("message")
+        r = get_client(split_url(jetson_url)[0]).post_json(jetson_url, body, timeout=15)
+        return feedback_from(r)
     except Exception:
         pass
     return None
@@ -8,10 +8,19 @@ Emotiv met stream format (EPOC/Insight/Flex):
 
 Metrics (0-1): eng=engagement, exc=excitement, str=stress, rel=relaxation, int=interest, attention/foc=focus
 """
+import bisect
+import time
+from collections import deque
+from functools import lru_cache
 from typing import Optional
 
 from data_schema import MentalStateSnapshot
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 # Fallback indices for EPOC/Insight/Flex (Cortex API data-sample-object)
 FALLBACK_INDICES = {"eng": 1, "exc": 3, "lex": 4, "str": 6, "rel": 8, "int": 10, "attention": 12, "foc": 12}
@@ -26,47 +35,150 @@ def _indices_from_cols(cols: list) -> dict[str, int]:
     return out
 
 
+# Snapshot field -> met labels to try, in order (a later label is used when the earlier value is falsy,
+# like the `a or b` this replaces)
+_FIELD_LABELS = (
+    ("engagement", ("eng",)),
+    ("stress", ("str", "cognitiveStress")),  # MN8 has cognitiveStress instead of str
+    ("relaxation", ("rel",)),
+    ("focus", ("attention", "foc")),
+    ("excitement", ("exc",)),
+    ("interest", ("int",)),
+)
+
+
+def _number(v):
+    """Float value of a met entry; None for None, bools (isActive flags) and non-numbers."""
+    if type(v) is float:
+        return v
+    if v is None or isinstance(v, bool):
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class MetParser:
+    """
+    met list -> MentalStateSnapshot with the column indices resolved once.
+    Build one per subscription (cols from new_data_labels) or use get_met_parser(cols).
+    """
+
+    def __init__(self, cols: Optional[list] = None):
+        indices = _indices_from_cols(cols) if cols else FALLBACK_INDICES
+        self.cols = tuple(cols) if cols else None
+        # (field, (idx, ...)); -1 for a label this layout doesn't have
+        self._plan = tuple(
+            (name, tuple(indices.get(label, -1) for label in labels))
+            for name, labels in _FIELD_LABELS
+        )
+
+    def values(self, met_arr) -> dict:
+        """Field -> float or None for one met list."""
+        n = len(met_arr)
+        out = {}
+        for name, idxs in self._plan:
+            v = None
+            for idx in idxs:
+                v = _number(met_arr[idx]) if 0 <= idx < n else None
+                if v:
+                    break
+            out[name] = v
+        return out
+
+    def parse(self, metrics: dict) -> MentalStateSnapshot:
+        met_arr = metrics.get("met")
+        if not met_arr or not isinstance(met_arr, (list, tuple)):
+            return MentalStateSnapshot(metrics=metrics)
+        return MentalStateSnapshot(metrics=metrics, **self.values(met_arr))
+
+    def parse_batch(self, samples: list, times: Optional[list] = None) -> dict:
+        """
+        Many met lists (same layout) -> columns: field -> float64 array (nan where missing),
+        plus "time" if times are given. Needs numpy.
+        """
+        if np is None:
+            raise RuntimeError("pip install numpy")
+        if not samples:
+            out = {name: np.empty(0) for name, _ in self._plan}
+        else:
+            try:
+                mat = np.array(samples, dtype=np.float64)
+            except (TypeError, ValueError):
+                # None entries or ragged rows: fill row by row (None -> nan)
+                width = max(len(row) for row in samples)
+                mat = np.full((len(samples), width), np.nan)
+                for i, row in enumerate(samples):
+                    mat[i, :len(row)] = [np.nan if v is None else v for v in row]
+            out = {}
+            width = mat.shape[1]
+            for name, idxs in self._plan:
+                col = None
+                for idx in idxs:
+                    c = mat[:, idx] if 0 <= idx < width else np.full(len(samples), np.nan)
+                    if col is None:
+                        col = c.copy()
+                    else:
+                        fall_through = np.isnan(col) | (col == 0)
+                        col[fall_through] = c[fall_through]
+                out[name] = col
+        if times is not None:
+            out["time"] = np.asarray(times, dtype=np.float64)
+        return out
+
+
+@lru_cache(maxsize=16)
+def _cached_parser(cols: Optional[tuple]) -> MetParser:
+    return MetParser(list(cols) if cols else None)
+
+
+def get_met_parser(cols: Optional[list] = None) -> MetParser:
+    """Shared MetParser for a cols layout (cols only change on subscribe)."""
+    return _cached_parser(tuple(cols) if cols else None)
+
+
 def parse_met_to_mental_state(metrics: dict) -> MentalStateSnapshot:
     """
     Parse raw Cortex met data into MentalStateSnapshot.
     Uses cols from subscription when available (order varies by headset); else fallback indices.
     MN8 has cognitiveStress instead of str.
     """
-    met_arr = metrics.get("met")
-    if not met_arr or not isinstance(met_arr, (list, tuple)):
-        return MentalStateSnapshot(metrics=metrics)
-
-    cols = metrics.get("cols")
-    indices = _indices_from_cols(cols) if cols else FALLBACK_INDICES
-    arr = met_arr
-
-    def _val(label: str):
-        idx = indices.get(label)
-        if idx is not None and 0 <= idx < len(arr):
-            v = arr[idx]
-            if v is not None and not isinstance(v, bool):
-                try:
-                    return float(v)
-                except (TypeError, ValueError):
-                    pass
-        return None
+    return get_met_parser(metrics.get("cols")).parse(metrics)
+
+
+def _classify(eng: float, stress: float, focus: float, current: Optional[str] = None, margin: float = 0.0) -> str:
+    """
+    Rule set behind derive_mental_state_label. With margin > 0 the thresholds act as a Schmitt
+    trigger: rules for `current` are relaxed by margin, rules for any other label tightened by it.
+    """
+    def below(x, threshold, label):
+        return x < threshold + (margin if label == current else -margin)
 
-    stress = _val("str") or _val("cognitiveStress")
-    focus = _val("attention") or _val("foc")
-    engagement = _val("eng")
-    excitement = _val("exc")
-    relaxation = _val("rel")
-    interest = _val("int")
+    def above(x, threshold, label):
+        return x > threshold - (margin if label == current else -margin)
 
-    return MentalStateSnapshot(
-        engagement=engagement,
-        stress=stress,
-        relaxation=relaxation,
-        focus=focus,
-        excitement=excitement,
-        interest=interest,
-        metrics=metrics,
-    )
+    def at_least(x, threshold, label):
+        return x >= threshold - (margin if label == current else -margin)
+
+    # Confused/stuck: not immersed, high tension, can't sustain focus
+    if below(eng, 0.4, "confused") and above(stress, 0.5, "confused"):
+        return "confused"  # or "stuck" - struggling with content
+    if below(eng, 0.35, "stuck") and above(stress, 0.55, "stuck") and below(focus, 0.4, "stuck"):
+        return "stuck"
+
+    # Distracted: low focus, low engagement
+    if below(focus, 0.35, "distracted") and below(eng, 0.45, "distracted"):
+        return "distracted"
+
+    # Focused: engaged, manageable stress
+    if at_least(eng, 0.5, "focused") and at_least(focus, 0.4, "focused") and below(stress, 0.6, "focused"):
+        return "focused"
+
+    # Default: neutral / slight struggle
+    if above(stress, 0.55, "confused"):
+        return "confused"
+    return "focused"
 
 
 def derive_mental_state_label(ms: MentalStateSnapshot | None) -> str:
@@ -77,30 +189,130 @@ def derive_mental_state_label(ms: MentalStateSnapshot | None) -> str:
     - Stuck/Confused: low engagement + high stress + low attention = struggling, can't progress
     - Distracted: low attention/focus, low engagement = mind elsewhere
     - Focused: decent engagement, manageable stress, decent attention
+
+    A snapshot from MentalStateEstimator already carries its stable label; that one is returned.
     """
     if ms is None:
         return "stuck"
+    if ms.label is not None:
+        return ms.label
 
     eng = ms.engagement if ms.engagement is not None else 0.5
     stress = ms.stress if ms.stress is not None else 0.4
     focus = ms.focus if ms.focus is not None else 0.5
-    relaxation = ms.relaxation if ms.relaxation is not None else 0.5
+    return _classify(eng, stress, focus)
 
-    # Confused/stuck: not immersed, high tension, can't sustain focus
-    if eng < 0.4 and stress > 0.5:
-        return "confused"  # or "stuck" - struggling with content
-    if eng < 0.35 and stress > 0.55 and focus < 0.4:
-        return "stuck"
 
-    # Distracted: low focus, low engagement
-    if focus < 0.35 and eng < 0.45:
-        return "distracted"
+# --- Smoothed, stateful labels ---
+METRIC_NAMES = ("engagement", "stress", "relaxation", "focus", "excitement", "interest")
+EMA_ALPHA = 0.3  # weight of the newest (median-filtered) sample
+MEDIAN_WINDOW = 5  # samples (met: ~2 Hz with high-res access, 0.1 Hz on the free tier); drops single-sample spikes
+HYSTERESIS = 0.05  # threshold margin in favour of the current label
+MIN_DWELL_SEC = 3.0  # a new label must hold this long before it replaces the current one
 
-    # Focused: engaged, manageable stress
-    if eng >= 0.5 and focus >= 0.4 and stress < 0.6:
-        return "focused"
 
-    # Default: neutral / slight struggle
-    if stress > 0.55:
-        return "confused"
-    return "focused"
+class _RollingMedian:
+    """Median of the last `size` values; constant work per sample for a fixed window."""
+
+    def __init__(self, size: int):
+        self._window = deque(maxlen=size)
+        self._sorted: list = []
+
+    def push(self, x: float) -> float:
+        if len(self._window) == self._window.maxlen:
+            old = self._window[0]
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._window.append(x)
+        bisect.insort(self._sorted, x)
+        n = len(self._sorted)
+        mid = n // 2
+        return self._sorted[mid] if n % 2 else (self._sorted[mid - 1] + self._sorted[mid]) / 2
+
+
+class MentalStateEstimator:
+    """
+    Stateful wrapper around parse_met_to_mental_state for a stream of met samples.
+
+    Per metric: rolling median over MEDIAN_WINDOW samples (drops spikes), then an EMA.
+    Label: derive_mental_state_label's rules on the smoothed values, with HYSTERESIS margins
+    and a MIN_DWELL_SEC debounce, so it no longer flaps between samples.
+
+    update(metrics) returns a MentalStateSnapshot with the smoothed values (raw met kept in .metrics)
+    and the stable label in .label / .label_seconds; pass that on instead of re-deriving a label.
+    """
+
+    def __init__(
+        self,
+        alpha: float = EMA_ALPHA,
+        median_window: int = MEDIAN_WINDOW,
+        hysteresis: float = HYSTERESIS,
+        min_dwell_sec: float = MIN_DWELL_SEC,
+        clock=time.monotonic,
+    ):
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.min_dwell_sec = min_dwell_sec
+        self._clock = clock
+        self._medians = {name: _RollingMedian(median_window) for name in METRIC_NAMES}
+        self.median: dict[str, Optional[float]] = {name: None for name in METRIC_NAMES}
+        self.smoothed: dict[str, Optional[float]] = {name: None for name in METRIC_NAMES}
+        self.label: Optional[str] = None
+        self.label_since: Optional[float] = None
+        self.dwell_totals: dict[str, float] = {}  # label -> seconds, closed spells only
+        self.transitions = 0
+        self._candidate: Optional[str] = None
+        self._candidate_since: Optional[float] = None
+
+    def update(self, metrics: dict, now: Optional[float] = None) -> MentalStateSnapshot:
+        """Feed one raw met sample ({"met": [...], "cols": [...]}); returns the smoothed snapshot."""
+        now = self._clock() if now is None else now
+        raw = parse_met_to_mental_state(metrics)
+        a = self.alpha
+        for name in METRIC_NAMES:
+            x = getattr(raw, name)
+            if x is None:
+                continue  # metric inactive this sample: hold the previous estimate
+            m = self._medians[name].push(x)
+            self.median[name] = m
+            prev = self.smoothed[name]
+            self.smoothed[name] = m if prev is None else prev + a * (m - prev)
+        self._update_label(now)
+        return MentalStateSnapshot(metrics=metrics, label=self.label, label_seconds=now - self.label_since,
+                                   **self.smoothed)
+
+    def _update_label(self, now: float) -> None:
+        s = self.smoothed
+        eng = s["engagement"] if s["engagement"] is not None else 0.5
+        stress = s["stress"] if s["stress"] is not None else 0.4
+        focus = s["focus"] if s["focus"] is not None else 0.5
+        if self.label is None:
+            self._switch(_classify(eng, stress, focus), now)
+            return
+        candidate = _classify(eng, stress, focus, current=self.label, margin=self.hysteresis)
+        if candidate == self.label:
+            self._candidate = None
+            return
+        if candidate != self._candidate:
+            self._candidate, self._candidate_since = candidate, now
+        if now - self._candidate_since >= self.min_dwell_sec:
+            self._switch(candidate, self._candidate_since)
+
+    def _switch(self, label: str, at: float) -> None:
+        if self.label is not None:
+            self.dwell_totals[self.label] = self.dwell_totals.get(self.label, 0.0) + (at - self.label_since)
+            self.transitions += 1
+        self.label, self.label_since = label, at
+        self._candidate = None
+
+    def dwell_seconds(self, now: Optional[float] = None) -> float:
+        """How long the current label has held."""
+        if self.label_since is None:
+            return 0.0
+        return (self._clock() if now is None else now) - self.label_since
+
+    def dwell_summary(self, now: Optional[float] = None) -> dict[str, float]:
+        """Seconds spent in each label so far, including the current spell."""
+        out = dict(self.dwell_totals)
+        if self.label is not None:
+            out[self.label] = out.get(self.label, 0.0) + self.dwell_seconds(now)
+        return out
@@ -0,0 +1,231 @@
+"""
+Deadline scheduler: run callbacks at given times on one background thread (heap of deadlines).
+
+For timers that must fire on time regardless of how often anything polls (session thresholds,
+retries). Cancellation is O(1) (the entry is skipped when it reaches the top of the heap).
+Callbacks run on the scheduler thread one at a time, so keep them short.
+
+Usage:
+  sched = default_scheduler()                  # shared, started on first use
+  call = sched.call_later(20.0, on_warn)
+  call.cancel()
+  retry = sched.call_every(0.5, poll, backoff=2.0, max_interval=5.0)   # 0.5, 1, 2, 4, 5, 5, ... s
+  retry.reset()                                # back to 0.5 s; retry.cancel() stops it
+
+  sched = DeadlineScheduler(clock=fake_clock)  # not started: drive it with run_pending() (tests)
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Optional
+
+# Rebuild the heap when more than this fraction of its entries are cancelled
+_COMPACT_RATIO = 0.5
+
+
+class ScheduledCall:
+    """Handle returned by call_at/call_later."""
+
+    __slots__ = ("when", "seq", "fn", "args", "cancelled", "_scheduler")
+
+    def __init__(self, when: float, seq: int, fn: Callable, args: tuple, scheduler: "DeadlineScheduler"):
+        self.when = when
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler
+
+    def __lt__(self, other: "ScheduledCall") -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def cancel(self) -> None:
+        scheduler = self._scheduler
+        if scheduler is None:
+            self.cancelled = True
+        else:
+            scheduler._cancel(self)
+
+
+class PeriodicCall:
+    """Handle returned by call_every: fn runs every interval, the interval growing by backoff up to max_interval."""
+
+    def __init__(self, scheduler: "DeadlineScheduler", interval: float, fn: Callable, args: tuple,
+                 backoff: float, max_interval: Optional[float]):
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.fn = fn
+        self.args = args
+        self.delay = interval  # until the next run
+        self.runs = 0
+        self.cancelled = False
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._call: Optional[ScheduledCall] = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            if self._call is not None:
+                self._call.cancel()
+                self._call = None
+
+    def reset(self, delay: Optional[float] = None) -> None:
+        """Restart the backoff; the next run is `delay` (default interval) from now."""
+        with self._lock:
+            if self.cancelled:
+                return
+            if self._call is not None:
+                self._call.cancel()
+            self.delay = self.interval
+            self._schedule(self.interval if delay is None else delay)
+
+    def _schedule(self, delay: float) -> None:
+        self._call = self._scheduler.call_later(delay, self._run)
+
+    def _run(self) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self.runs += 1
+            self.delay = self.delay * self.backoff
+            if self.max_interval is not None:
+                self.delay = min(self.delay, self.max_interval)
+            self._schedule(self.delay)  # before fn, so fn may cancel() or reset() it
+        self.fn(*self.args)
+
+
+class DeadlineScheduler:
+    """Heap-backed timers. Times are in clock() units (default time.monotonic)."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, name: str = "DeadlineScheduler"):
+        self.clock = clock
+        self.name = name
+        self._heap: list[ScheduledCall] = []
+        self._seq = itertools.count()
+        self._n_cancelled = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def call_at(self, when: float, fn: Callable, *args) -> ScheduledCall:
+        call = ScheduledCall(when, next(self._seq), fn, args, self)
+        with self._cond:
+            heapq.heappush(self._heap, call)
+            if self._heap[0] is call:
+                self._cond.notify()  # new earliest deadline: wake the thread to re-arm its wait
+        return call
+
+    def call_later(self, delay: float, fn: Callable, *args) -> ScheduledCall:
+        return self.call_at(self.clock() + delay, fn, *args)
+
+    def call_every(self, interval: float, fn: Callable, *args, backoff: float = 1.0,
+                   max_interval: Optional[float] = None, first_delay: Optional[float] = None) -> PeriodicCall:
+        """Run fn after first_delay (default interval), then repeatedly with the interval multiplied by backoff."""
+        periodic = PeriodicCall(self, interval, fn, args, backoff, max_interval)
+        with periodic._lock:
+            periodic._schedule(interval if first_delay is None else first_delay)
+        return periodic
+
+    def next_deadline(self) -> Optional[float]:
+        with self._cond:
+            self._drop_cancelled_head()
+            return self._heap[0].when if self._heap else None
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap) - self._n_cancelled
+
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """Run every call due at `now` (default clock()), in deadline order. Returns how many ran."""
+        ran = 0
+        while True:
+            with self._cond:
+                call = self._pop_due(self.clock() if now is None else now)
+            if call is None:
+                return ran
+            self._run(call)
+            ran += 1
+
+    def start(self) -> "DeadlineScheduler":
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    self._drop_cancelled_head()
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0].when - self.clock()
+                    if delay <= 0:
+                        call = self._pop()
+                        break
+                    self._cond.wait(delay)
+            self._run(call)
+
+    def _run(self, call: ScheduledCall) -> None:
+        if call.cancelled:  # cancelled between leaving the heap and running
+            return
+        try:
+            call.fn(*call.args)
+        except Exception as e:
+            print(f"  {self.name}: {getattr(call.fn, '__name__', call.fn)} failed: {e}")
+
+    def _pop_due(self, now: float) -> Optional[ScheduledCall]:
+        self._drop_cancelled_head()
+        if self._heap and self._heap[0].when <= now:
+            return self._pop()
+        return None
+
+    def _pop(self) -> ScheduledCall:
+        call = heapq.heappop(self._heap)
+        call._scheduler = None  # no longer counted in _n_cancelled if cancelled from here on
+        return call
+
+    def _drop_cancelled_head(self) -> None:
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+            self._n_cancelled -= 1
+
+    def _cancel(self, call: ScheduledCall) -> None:
+        with self._cond:
+            if call.cancelled:
+                return
+            call.cancelled = True
+            if call._scheduler is not self:  # already popped to run
+                return
+            self._n_cancelled += 1
+            if self._n_cancelled > len(self._heap) * _COMPACT_RATIO:
+                self._heap = [c for c in self._heap if not c.cancelled]
+                heapq.heapify(self._heap)
+                self._n_cancelled = 0
+            self._cond.notify()
+
+
+_default: Optional[DeadlineScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> DeadlineScheduler:
+    """Process-wide scheduler thread, started on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = DeadlineScheduler().start()
+        return _default
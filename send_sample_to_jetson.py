@@ -8,6 +8,7 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 from activity import ActivityMonitor
+from jetson_client import get_client, split_url
 import requests
 
 
@@ -21,6 +22,7 @@ SAMPLE_DEV = {"signal": 1.0, "dev": [4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 1
 def send_sample(jetson_url: str, count: int = 5):
     """Send count sample payloads to Jetson."""
     activity = ActivityMonitor(poll_interval=1.0)
+    jetson = get_client(split_url(jetson_url)[0])
 
     for i in range(count):
         ctx = activity.get_current_activity()
@@ -38,15 +40,7 @@ def send_sample(jetson_url: str, count: int = 5):
         }
 
         try:
-            r = requests.post(
-                jetson_url,
-                json=body,
-                headers={
-                    "Content-Type": "application/json",
-                    "ngrok-skip-browser-warning": "1",
-                },
-                timeout=10,
-            )
+            r = jetson.post_json(jetson_url, body, timeout=10)
             print(f"[{i+1}/{count}] POST {jetson_url} -> {r.status_code}")
             if r.status_code != 200:
                 print(f"         {r.text[:150]}")
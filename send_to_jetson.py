@@ -4,7 +4,6 @@ Sends met, pow, mot, dev plus current app/window/context_type so Jetson agent ca
 decide if user needs feedback (e.g. break, focus aid).
 Shows agent feedback in a small overlay window.
 """
-import json
 import os
 import time
 import threading
@@ -15,6 +14,7 @@ from cortex import Cortex
 import requests
 
 from activity import ActivityMonitor
+from jetson_client import feedback_from, get_client, split_url
 
 
 JETSON_BASE = os.environ.get('JETSON_URL', 'https://8061-68-65-164-46.ngrok-free.app').rstrip('/')
@@ -25,6 +25,7 @@ SEND_INTERVAL_SEC = float(os.environ.get('SEND_INTERVAL', '2.0'))
 class StreamToJetson:
     def __init__(self, app_client_id, app_client_secret, jetson_url=JETSON_URL, feedback_window=None, **kwargs):
         self.jetson_url = jetson_url
+        self.jetson = get_client(split_url(jetson_url)[0])
         self.feedback_window = feedback_window
         self.buffer = {'met': None, 'pow': None, 'mot': None, 'dev': None}
         self.send_count = 0
@@ -68,28 +69,16 @@ class StreamToJetson:
         }
 
         try:
-            r = requests.post(
-                self.jetson_url,
-                json=body,
-                headers={
-                    'Content-Type': 'application/json',
-                    'ngrok-skip-browser-warning': '1',
-                },
-                timeout=5,
-            )
+            r = self.jetson.post_json(self.jetson_url, body, timeout=5)
             self.send_count += 1
             status = r.status_code
             print(f'[{self.send_count}] POST {self.jetson_url} -> {status}')
             if status != 200:
                 print(f'  response: {r.text[:200]}')
-            elif self.feedback_window and r.text:
-                try:
-                    data = r.json()
-                    feedback = data.get('feedback') or data.get('message')
-                    if feedback:
-                        self.feedback_window.root.after(0, lambda t=feedback: self.feedback_window.update_feedback(t))
-                except json.JSONDecodeError:
-                    pass
+            elif self.feedback_window:
+                feedback = feedback_from(r)
+                if feedback:
+                    self.feedback_window.root.after(0, lambda t=feedback: self.feedback_window.update_feedback(t))
         except requests.RequestException as e:
             print(f'[{self.send_count}] POST failed: {e}')
 
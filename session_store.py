@@ -0,0 +1,316 @@
+"""
+Local history in SQLite (config.DB_PATH): tracked sessions, session events, help requests and
+responses, and downsampled mental state. For tuning thresholds from real usage.
+
+Write-behind: record_*() only enqueue a row (never touch disk, never block; rows are dropped
+and counted if the queue is full). One writer thread batches queued rows into a transaction
+per flush, with executemany on fixed SQL (sqlite3 keeps those statements prepared).
+The database runs in WAL mode, so queries from other threads don't wait on the writer.
+
+Usage:
+  store = SessionStore()                      # config.DB_PATH
+  store.attach(session_tracker)               # session start/end + warn/long/follow-up events
+  store.record_mental_state(ms)               # keeps at most one row per mental_state_interval_sec
+  store.sessions(context_id="Chrome::arxiv.org", since=time.time() - 86400)
+  store.close()
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from itertools import groupby
+from pathlib import Path
+from typing import Optional
+
+import config
+from mental_state_parser import derive_mental_state_label
+
+FLUSH_INTERVAL_SEC = 1.0  # how long the writer collects rows before committing
+BATCH_SIZE = 500
+MAX_QUEUE = 10000
+MENTAL_STATE_INTERVAL_SEC = 5.0  # met arrives at ~2 Hz; history only needs a coarse trace
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    context_id TEXT NOT NULL,
+    app_name TEXT,
+    window_title TEXT,
+    context_type TEXT,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    duration_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_context ON sessions (context_id, started_at);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started_at);
+
+CREATE TABLE IF NOT EXISTS session_events (
+    id INTEGER PRIMARY KEY,
+    context_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    duration_seconds REAL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_events_context ON session_events (context_id, at);
+
+CREATE TABLE IF NOT EXISTS help_requests (
+    id INTEGER PRIMARY KEY,
+    context_id TEXT NOT NULL,
+    requested_at REAL NOT NULL,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS help_requests_context ON help_requests (context_id, requested_at);
+
+CREATE TABLE IF NOT EXISTS help_responses (
+    id INTEGER PRIMARY KEY,
+    context_id TEXT NOT NULL,
+    responded_at REAL NOT NULL,
+    feedback TEXT,
+    error TEXT,
+    latency_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS help_responses_context ON help_responses (context_id, responded_at);
+
+CREATE TABLE IF NOT EXISTS mental_state (
+    t REAL NOT NULL,
+    context_id TEXT,
+    engagement REAL,
+    stress REAL,
+    relaxation REAL,
+    focus REAL,
+    excitement REAL,
+    interest REAL,
+    label TEXT
+);
+CREATE INDEX IF NOT EXISTS mental_state_t ON mental_state (t);
+CREATE INDEX IF NOT EXISTS mental_state_context ON mental_state (context_id, t);
+"""
+
+# Statement key -> SQL. Queue entries are (key, params); the writer executemany()s runs of one key.
+_SQL = {
+    "session_start": "INSERT INTO sessions (context_id, app_name, window_title, context_type, started_at) VALUES (?, ?, ?, ?, ?)",
+    "session_end": "UPDATE sessions SET ended_at = ?, duration_seconds = ? - started_at WHERE context_id = ? AND started_at = ?",
+    "event": "INSERT INTO session_events (context_id, event_type, duration_seconds, at) VALUES (?, ?, ?, ?)",
+    "help_request": "INSERT INTO help_requests (context_id, requested_at, body) VALUES (?, ?, ?)",
+    "help_response": "INSERT INTO help_responses (context_id, responded_at, feedback, error, latency_seconds) VALUES (?, ?, ?, ?, ?)",
+    "mental_state": "INSERT INTO mental_state (t, context_id, engagement, stress, relaxation, focus, excitement, interest, label) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+def connect(path) -> sqlite3.Connection:
+    """Connection with WAL and the schema in place (NORMAL sync is durable enough under WAL)."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SessionStore:
+    """Write-behind SQLite store. record_*() are safe to call from any thread."""
+
+    def __init__(
+        self,
+        path=None,
+        flush_interval: float = FLUSH_INTERVAL_SEC,
+        batch_size: int = BATCH_SIZE,
+        max_queue: int = MAX_QUEUE,
+        mental_state_interval_sec: float = MENTAL_STATE_INTERVAL_SEC,
+    ):
+        self.path = Path(path or config.DB_PATH)
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.mental_state_interval_sec = mental_state_interval_sec
+        self._conn = connect(self.path)  # writer thread only, after this
+        self._read_conn = None
+        self._read_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._last_ms_at = float("-inf")
+        self._closed = False
+        self._counters = {"queued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._writer = threading.Thread(target=self._write_loop, name="SessionStore", daemon=True)
+        self._writer.start()
+
+    # --- recording (non-blocking) ---
+
+    def attach(self, tracker) -> None:
+        """Record a SessionTracker's session changes and events."""
+        tracker.on_session_change(self.session_changed)
+        tracker.on_session_event(self.record_event)
+
+    def session_changed(self, previous, current) -> None:
+        """SessionTracker.on_session_change callback: close previous, open current."""
+        if previous is not None:
+            self.end_session(previous, current.started_at)
+        ctx = current.context
+        self._put("session_start", (current.context_id, ctx.app_name, ctx.window_title, ctx.context_type, current.started_at))
+
+    def end_session(self, session, ended_at: Optional[float] = None) -> None:
+        """Close a TrackedSession (e.g. the current one on shutdown)."""
+        if session is None:
+            return
+        t = time.time() if ended_at is None else ended_at
+        self._put("session_end", (t, t, session.context_id, session.started_at))
+
+    def record_event(self, event) -> None:
+        """SessionTracker.on_session_event callback."""
+        self._put("event", (event.context.context_id, event.event_type.value, event.duration_seconds, time.time()))
+
+    def record_help_request(self, context_id: str, body: Optional[dict] = None, t: Optional[float] = None) -> None:
+        self._put("help_request", (context_id, time.time() if t is None else t, json.dumps(body) if body is not None else None))
+
+    def record_help_response(
+        self,
+        context_id: str,
+        feedback: Optional[str] = None,
+        error: Optional[str] = None,
+        latency_seconds: Optional[float] = None,
+        t: Optional[float] = None,
+    ) -> None:
+        self._put("help_response", (context_id, time.time() if t is None else t, feedback, error, latency_seconds))
+
+    def record_mental_state(self, ms, t: Optional[float] = None, context_id: Optional[str] = None, label: Optional[str] = None) -> bool:
+        """
+        Queue a MentalStateSnapshot unless one was kept less than mental_state_interval_sec ago.
+        label defaults to the snapshot's stable label, else one derived from this sample alone.
+        """
+        if ms is None:
+            return False
+        t = time.time() if t is None else t
+        if t - self._last_ms_at < self.mental_state_interval_sec:
+            return False
+        self._last_ms_at = t
+        label = label or derive_mental_state_label(ms)
+        return self._put("mental_state", (t, context_id, ms.engagement, ms.stress, ms.relaxation, ms.focus,
+                                          ms.excitement, ms.interest, label))
+
+    def _put(self, key: str, params: tuple) -> bool:
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((key, params))
+        except queue.Full:
+            self._counters["dropped"] += 1
+            return False
+        self._counters["queued"] += 1
+        return True
+
+    # --- writer ---
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for event in waiters:
+                event.set()
+            if stop:
+                self._conn.close()
+                return
+
+    def _write(self, batch: list) -> None:
+        try:
+            with self._conn:  # one transaction per batch
+                for key, rows in groupby(batch, key=lambda item: item[0]):
+                    self._conn.executemany(_SQL[key], [params for _, params in rows])
+            self._counters["written"] += len(batch)
+            self._counters["batches"] += 1
+        except sqlite3.Error as e:
+            self._counters["errors"] += 1
+            print(f"  SessionStore: write failed ({len(batch)} rows): {e}")
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Block until everything queued so far is committed. For shutdown and tests, not hot paths."""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Commit what's queued and stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+        with self._read_lock:
+            if self._read_conn is not None:
+                self._read_conn.close()
+                self._read_conn = None
+
+    def stats(self) -> dict:
+        out = dict(self._counters)
+        out["queue_depth"] = self._queue.qsize()
+        return out
+
+    # --- history queries (read connection; see rows committed so far) ---
+
+    def query(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._read_lock:
+            if self._read_conn is None:
+                self._read_conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+                self._read_conn.row_factory = sqlite3.Row
+            return [dict(row) for row in self._read_conn.execute(sql, params)]
+
+    def sessions(self, context_id: Optional[str] = None, since: Optional[float] = None,
+                 until: Optional[float] = None, limit: int = 1000) -> list[dict]:
+        """Sessions started in [since, until), newest first."""
+        where, params = _range("started_at", context_id, since, until)
+        return self.query(f"SELECT * FROM sessions{where} ORDER BY started_at DESC LIMIT ?", params + (limit,))
+
+    def events(self, context_id: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None, limit: int = 1000) -> list[dict]:
+        where, params = _range("at", context_id, since, until)
+        return self.query(f"SELECT * FROM session_events{where} ORDER BY at DESC LIMIT ?", params + (limit,))
+
+    def mental_state(self, since: Optional[float] = None, until: Optional[float] = None,
+                     context_id: Optional[str] = None) -> list[dict]:
+        where, params = _range("t", context_id, since, until)
+        return self.query(f"SELECT * FROM mental_state{where} ORDER BY t", params)
+
+    def context_summary(self, since: Optional[float] = None, limit: int = 50) -> list[dict]:
+        """Per context_id: session count, total/mean/max duration of closed sessions, and event counts."""
+        where, params = _range("started_at", None, since, None)
+        return self.query(
+            f"""SELECT s.context_id, COUNT(*) AS sessions, SUM(s.duration_seconds) AS total_seconds,
+                       AVG(s.duration_seconds) AS mean_seconds, MAX(s.duration_seconds) AS max_seconds,
+                       (SELECT COUNT(*) FROM session_events e WHERE e.context_id = s.context_id
+                        AND e.event_type = 'long') AS long_events,
+                       (SELECT COUNT(*) FROM help_requests h WHERE h.context_id = s.context_id) AS help_requests
+                FROM sessions s{where}{' AND' if where else ' WHERE'} s.duration_seconds IS NOT NULL
+                GROUP BY s.context_id ORDER BY total_seconds DESC LIMIT ?""",
+            params + (limit,),
+        )
+
+
+def _range(column: str, context_id: Optional[str], since: Optional[float], until: Optional[float]) -> tuple[str, tuple]:
+    clauses, params = [], []
+    if context_id is not None:
+        clauses.append("context_id = ?")
+        params.append(context_id)
+    if since is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append(f"{column} < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
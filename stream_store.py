@@ -0,0 +1,204 @@
+"""
+Recent-history store for Cortex streams (eeg, pow, mot, met, dev) in preallocated NumPy rings.
+
+One StreamRing per stream, sized from STREAM_RATES_HZ x seconds, with columns from the
+labels Cortex reports on subscribe (new_data_labels / extract_data_labels). Samples are
+written twice (at i and i + capacity), so any window of the most recent samples is one
+contiguous slice: last() and between() return views, not copies (except for a window
+covering the whole ring, which the next append would overwrite).
+
+Usage:
+  store = StreamStore(seconds=60)
+  store.attach(cortex)                         # before sub_request
+  t, x = store.last("eeg", 4.0)                # times (n,), rows (n, channels)
+  alpha = x[:, store.ring("pow").column("AF3/alpha")]
+"""
+import threading
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Upper bound on samples/sec per stream (EPOC X eeg can run at 256 Hz, motion at 64 Hz)
+STREAM_RATES_HZ = {"eeg": 256, "pow": 8, "mot": 64, "met": 2, "dev": 2}
+DEFAULT_SECONDS = 60.0
+
+
+class StreamRing:
+    """
+    Fixed-capacity ring of (time, row) for one stream.
+    A window of n samples returned by last()/between()/since()/last_samples() is a view that
+    stays valid for the next capacity - n appends; call .copy() on it to keep data longer.
+    A window of all capacity samples is returned as a copy.
+    """
+
+    def __init__(self, name: str, labels: list, capacity: int, dtype=None):
+        if np is None:
+            raise RuntimeError("pip install numpy")
+        self.name = name
+        self.labels = list(labels)
+        self.capacity = max(1, int(capacity))
+        self._index = {label: i for i, label in enumerate(self.labels)}
+        self._times = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._data = np.zeros((2 * self.capacity, len(self.labels)), dtype=dtype or np.float64)
+        self._head = 0  # next write position in [0, capacity)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def column(self, label: str) -> int:
+        """Column index of a label (KeyError if the stream has no such column)."""
+        return self._index[label]
+
+    def append(self, t: float, values) -> None:
+        """Add one sample. None in values becomes nan."""
+        with self._lock:
+            i = self._head
+            j = i + self.capacity
+            self._times[i] = self._times[j] = t
+            self._data[i] = values
+            self._data[j] = self._data[i]
+            self._head = (i + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def _span(self) -> tuple[int, int]:
+        start = (self._head - self._count) % self.capacity
+        return start, start + self._count
+
+    def _window(self, a: int, b: int):
+        if b - a >= self.capacity:  # includes the slot the next append writes
+            return self._times[a:b].copy(), self._data[a:b].copy()
+        return self._times[a:b], self._data[a:b]
+
+    def latest_time(self) -> Optional[float]:
+        with self._lock:
+            if not self._count:
+                return None
+            return float(self._times[(self._head - 1) % self.capacity])
+
+    def oldest_time(self) -> Optional[float]:
+        with self._lock:
+            if not self._count:
+                return None
+            return float(self._times[self._span()[0]])
+
+    def last_samples(self, n: int):
+        """(times, rows) views of the newest n samples (fewer if not yet filled)."""
+        with self._lock:
+            start, end = self._span()
+            start = max(start, end - max(0, int(n)))
+            return self._window(start, end)
+
+    def last(self, n_seconds: float):
+        """(times, rows) views of samples with time > latest - n_seconds."""
+        with self._lock:
+            start, end = self._span()
+            if start == end:
+                return self._window(start, end)
+            times = self._times[start:end]
+            a = start + int(np.searchsorted(times, times[-1] - n_seconds, side="right"))
+            return self._window(a, end)
+
+    def between(self, t0: float, t1: float):
+        """(times, rows) views of samples with t0 <= time <= t1 (Cortex time)."""
+        with self._lock:
+            start, end = self._span()
+            times = self._times[start:end]
+            a = start + int(np.searchsorted(times, t0, side="left"))
+            b = start + int(np.searchsorted(times, t1, side="right"))
+            return self._window(a, b)
+
+    def since(self, t0: float, t1: Optional[float] = None):
+        """(times, rows) views of samples with t0 < time <= t1 (t1 default: newest). For incremental readers."""
+        with self._lock:
+            start, end = self._span()
+            times = self._times[start:end]
+            a = start + int(np.searchsorted(times, t0, side="right"))
+            b = end if t1 is None else start + int(np.searchsorted(times, t1, side="right"))
+            return self._window(a, b)
+
+
+def _sample(stream: str, data):
+    """(time, values) from a new_<stream>_data payload in any Cortex stream_format."""
+    if isinstance(data, tuple):
+        t, values = data
+        if stream == "dev":
+            values = values[2]  # per-channel contact quality, as in the dict format
+        return t, values
+    return data.get("time"), data.get(stream)
+
+
+class StreamStore:
+    """Per-stream rings fed from Cortex events. Thread-safe for one writer (the Cortex thread)."""
+
+    def __init__(self, seconds: float = DEFAULT_SECONDS, rates: Optional[dict] = None):
+        if np is None:
+            raise RuntimeError("pip install numpy")
+        self.seconds = seconds
+        self.rates = {**STREAM_RATES_HZ, **(rates or {})}
+        self._rings: dict[str, StreamRing] = {}
+        self._labels: dict[str, list] = {}
+        self.dropped = 0  # samples whose width didn't match the stream's labels
+
+    def attach(self, cortex) -> None:
+        """Bind to a Cortex instance's label and stream events. Call before sub_request."""
+        cortex.bind(new_data_labels=self._on_labels)
+        cortex.bind(new_eeg_data=lambda *a, **kw: self.add("eeg", kw.get("data")))
+        cortex.bind(new_pow_data=lambda *a, **kw: self.add("pow", kw.get("data")))
+        cortex.bind(new_mot_data=lambda *a, **kw: self.add("mot", kw.get("data")))
+        cortex.bind(new_met_data=lambda *a, **kw: self.add("met", kw.get("data")))
+        cortex.bind(new_dev_data=lambda *a, **kw: self.add("dev", kw.get("data")))
+
+    def ring(self, stream: str) -> Optional[StreamRing]:
+        return self._rings.get(stream)
+
+    def streams(self) -> list:
+        return list(self._rings)
+
+    def add(self, stream: str, data) -> None:
+        """Add one new_<stream>_data payload."""
+        if not data:
+            return
+        t, values = _sample(stream, data)
+        if t is None or values is None:
+            return
+        ring = self._rings.get(stream)
+        if ring is None:
+            labels = self._labels.get(stream) or [str(i) for i in range(len(values))]
+            ring = self._make_ring(stream, labels)
+        if len(values) != len(ring.labels):
+            self.dropped += 1
+            return
+        ring.append(t, values)
+
+    def last(self, stream: str, n_seconds: float):
+        """(times, rows) views for the last n_seconds of a stream; None if nothing received yet."""
+        ring = self._rings.get(stream)
+        return ring.last(n_seconds) if ring is not None else None
+
+    def between(self, stream: str, t0: float, t1: float):
+        ring = self._rings.get(stream)
+        return ring.between(t0, t1) if ring is not None else None
+
+    def _make_ring(self, stream: str, labels: list) -> StreamRing:
+        capacity = int(self.rates.get(stream, 32) * self.seconds)
+        ring = StreamRing(stream, labels, capacity)
+        self._rings[stream] = ring
+        return ring
+
+    def _on_labels(self, *args, **kwargs):
+        data = kwargs.get("data") or {}
+        stream = data.get("streamName")
+        labels = data.get("labels")
+        if stream not in self.rates or not isinstance(labels, list):
+            return
+        self._labels[stream] = labels
+        ring = self._rings.get(stream)
+        if ring is None or ring.labels != labels:
+            # (Re)subscribe: new layout, start a fresh ring
+            self._make_ring(stream, labels)
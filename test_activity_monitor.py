@@ -0,0 +1,116 @@
+"""
+Test ActivityMonitor push mode with a stubbed detector: one sampler thread fans each sample out to
+every subscriber, peek() returns the cached sample, stop() joins the thread and start() works again.
+
+Usage:
+  python test_activity_monitor.py
+  python -m pytest -q test_activity_monitor.py
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity import ActivityContext, ActivityMonitor
+
+
+class StubDetector:
+    """get_current_activity() replacement: a new context per call, counted."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        return ActivityContext(app_name="Code", window_title=f"file{n}.py", context_type="coding",
+                               context_id=f"Code::file{n}.py")
+
+
+class Subscriber:
+    def __init__(self, expected: int):
+        self.samples = []
+        self.expected = expected
+        self.done = threading.Event()
+
+    def __call__(self, ctx):
+        self.samples.append(ctx)
+        if len(self.samples) >= self.expected:
+            self.done.set()
+
+
+def _monitor(poll_interval=0.01):
+    monitor = ActivityMonitor(poll_interval=poll_interval)
+    monitor.get_current_activity = StubDetector()
+    return monitor
+
+
+def test_fan_out_and_peek():
+    monitor = _monitor(poll_interval=30.0)  # one sample right after start(), the next in 30 s
+    assert monitor.peek().window_title == "file1.py"  # not started: detects on the spot
+    first, second = Subscriber(1), Subscriber(1)
+    monitor.subscribe(first)
+    monitor.subscribe(second)
+    monitor.start()
+    monitor.start()  # idempotent: still one sampler
+    assert first.done.wait(5) and second.done.wait(5)
+    assert first.samples[0] is second.samples[0] and first.samples[0].window_title == "file2.py"
+    for _ in range(3):  # cached: same object, no detection
+        assert monitor.peek() is first.samples[0]
+    assert monitor.get_current_activity.calls == 2
+    monitor.stop()
+
+
+def test_stop_joins_and_restart():
+    monitor = _monitor(poll_interval=30.0)  # stop() must not wait out the poll interval
+    sub = Subscriber(1)
+    monitor.subscribe(sub)
+    monitor.start()
+    assert sub.done.wait(5)
+    thread = monitor._sampler
+    started = time.monotonic()
+    monitor.stop()
+    assert not thread.is_alive() and monitor._sampler is None and time.monotonic() - started < 5
+    calls = monitor.get_current_activity.calls
+    time.sleep(0.05)
+    assert monitor.get_current_activity.calls == calls  # nothing sampling after stop()
+
+    again = Subscriber(1)
+    monitor.subscribe(again)
+    monitor.start()
+    assert again.done.wait(5) and monitor._sampler is not thread
+    monitor.stop()
+
+
+def test_stop_from_a_subscriber():
+    monitor = _monitor()
+    stopped = threading.Event()
+
+    def on_sample(ctx):
+        monitor.stop()  # on the sampler thread itself: no self-join
+        stopped.set()
+
+    monitor.subscribe(on_sample)
+    monitor.start()
+    assert stopped.wait(5)
+    assert monitor._sampler is None
+
+
+def main():
+    failed = 0
+    for t in (test_fan_out_and_peek, test_stop_joins_and_restart, test_stop_from_a_subscriber):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Test AsyncCortex against a local fake Cortex server (plain ws://): startup, requests, stream backpressure.
+
+Usage:
+  python test_async_cortex.py
+  python -m pytest -q test_async_cortex.py
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from async_cortex import AsyncCortex
+from cortex import CortexError
+
+MET_COLS = ["eng.isActive", "eng", "str.isActive", "str"]
+N_FRAMES = 20
+
+RESULTS = {
+    "hasAccessRight": {"accessGranted": True},
+    "authorize": {"cortexToken": "tok"},
+    "controlDevice": {"command": "refresh"},
+    "queryHeadsets": [{"id": "EPOCX-1", "status": "connected", "connectedBy": "dongle"}],
+    "createSession": {"id": "sess-1"},
+    "getCortexInfo": {"version": "fake"},
+    "subscribe": {"success": [{"streamName": "met", "cols": MET_COLS, "sid": "sess-1"}], "failure": []},
+}
+
+
+async def fake_cortex(ws):
+    async for text in ws:
+        req = json.loads(text)
+        method = req["method"]
+        if method not in RESULTS:
+            await ws.send(json.dumps({"id": req["id"], "error": {"code": -32601, "message": "Method not found"}}))
+            continue
+        if method == "getCortexInfo":
+            await asyncio.sleep(0.05)  # answered after requests sent later
+        await ws.send(json.dumps({"id": req["id"], "result": RESULTS[method]}))
+        if method == "subscribe":
+            for i in range(N_FRAMES):
+                await ws.send(json.dumps({"sid": "sess-1", "time": float(i), "met": [True, i / N_FRAMES, True, 0.5]}))
+
+
+async def _run(check):
+    async with websockets.serve(fake_cortex, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        async with AsyncCortex("id", "secret", url=f"ws://127.0.0.1:{port}", stream_format="tuple") as cortex:
+            await check(cortex)
+
+
+async def _prepare_and_requests(cortex):
+    assert await cortex.prepare() == "sess-1"
+    assert cortex.auth == "tok" and cortex.headset_id == "EPOCX-1"
+    # Out-of-order replies land on the right awaiter
+    info, profiles = await asyncio.gather(cortex.get_cortex_info(), cortex.request("queryHeadsets"))
+    assert info == {"version": "fake"} and profiles[0]["id"] == "EPOCX-1"
+    try:
+        await cortex.query_profile()
+        assert False, "expected CortexError"
+    except CortexError as e:
+        assert e.code == -32601 and e.method == "queryProfile"
+    assert cortex.stats()["pending"] == 0
+
+
+async def _drop_oldest(cortex):
+    await cortex.prepare()
+    met = cortex.stream("met", maxsize=4)
+    await cortex.subscribe(["met"])
+    await cortex.get_cortex_info()  # answered after every frame was read
+    assert cortex.labels["met"] == MET_COLS
+    assert (met.received, met.dropped) == (N_FRAMES, N_FRAMES - 4)
+    met.close()
+    times = [t async for t, values in met]
+    assert times == [16.0, 17.0, 18.0, 19.0]
+
+
+async def _block(cortex):
+    await cortex.prepare()
+    met = cortex.stream("met", maxsize=2, overflow="block")
+    await cortex.subscribe(["met"])
+    times = []
+    async for t, values in met:
+        times.append(t)
+        await asyncio.sleep(0.001)  # slow consumer: the reader waits instead of dropping
+        if len(times) == N_FRAMES:
+            break
+    assert times == [float(i) for i in range(N_FRAMES)] and met.dropped == 0
+
+
+def _check(coro_fn):
+    if websockets is None:
+        print("  (skipped: pip install websockets)")
+        return
+    asyncio.run(_run(coro_fn))
+
+
+def test_prepare_and_requests():
+    _check(_prepare_and_requests)
+
+
+def test_stream_drop_oldest():
+    _check(_drop_oldest)
+
+
+def test_stream_block_backpressure():
+    _check(_block)
+
+
+def main():
+    failed = 0
+    for t in (test_prepare_and_requests, test_stream_drop_oldest, test_stream_block_backpressure):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Test the rule-table context classifier (defaults, user rule files, large catalogs).
+
+Usage:
+  python test_classifier.py
+  python -m pytest -q test_classifier.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity.classifier import DEFAULT_RULES, ContextClassifier, ContextRule, infer_context_type, load_rules, yaml
+
+
+def test_defaults_match_previous_rules():
+    cases = {
+        ("Google Chrome", "https://example.com/foo"): "website",
+        ("Google Chrome", "Stanford CS224N"): "browser",
+        ("Safari", "news at www.bbc.co.uk"): "website",
+        ("Firefox", "github.com - repo"): "website",
+        ("Cursor", "main.py"): "file",
+        ("Code", "main.py - proj"): "file",
+        ("Terminal", "zsh"): "terminal",
+        ("iTerm2", "zsh"): "terminal",
+        ("Preview", "paper.pdf"): "app",
+        ("", ""): "app",
+    }
+    for (app, title), expected in cases.items():
+        assert infer_context_type(app, title) == expected, (app, title)
+
+
+def test_domains_and_user_rules_first():
+    clf = ContextClassifier(
+        [ContextRule("lecture", titles=(r"CS\s?224N",)), ContextRule("notes", apps=("obsidian",), titles=("week \\d+",))]
+        + list(DEFAULT_RULES)
+    )
+    assert clf.classify("Google Chrome", "Stanford CS224N") == "lecture"
+    assert clf.classify("Obsidian", "Week 3 - vault") == "notes"
+    assert clf.classify("Obsidian", "Ideas") == "app"  # both fields must match
+    assert clf.classify("Google Chrome", "x", "https://www.arxiv.org/abs/1706.03762") == "paper"
+    assert clf.classify("Google Chrome", "x", "https://m.youtube.com/watch?v=1") == "video"
+    assert clf.classify("Google Chrome", "x", "https://youtube.com/feed") == "website"  # path prefix not matched
+    assert clf.classify("Google Chrome", "x", "https://canvas.instructure.com/courses/1") == "lecture"
+    assert clf.classify("Google Chrome", "x") == "browser"
+    assert clf.classify("Google Chrome", "x", "https://arxiv.org/abs/1") is clf.classify("Google Chrome", "x", "https://arxiv.org/abs/1")
+    assert clf.cache_info().hits >= 1
+
+
+def test_rule_files_and_large_catalog():
+    with tempfile.TemporaryDirectory() as tmp:
+        toml = Path(tmp) / "rules.toml"
+        toml.write_text('[[rules]]\ntype = "lecture"\ntitles = ["lecture \\\\d+"]\n\n'
+                        '[[rules]]\ntype = "paper"\ndomains = ["openreview.net"]\n')
+        rules = load_rules(toml)
+        assert [r.context_type for r in rules] == ["lecture", "paper"] and rules[0].titles == (r"lecture \d+",)
+        if yaml is not None:
+            yml = Path(tmp) / "rules.yaml"
+            yml.write_text("rules:\n  - type: video\n    domains: [lectures.example.edu/video]\n")
+            assert load_rules(yml)[0].domains == ("lectures.example.edu/video",)
+
+    # Course catalog: 500 title rules + 500 domain rules
+    catalog = [ContextRule("lecture", titles=(rf"\bCS\s?{n}\b",)) for n in range(100, 600)]
+    catalog += [ContextRule("docs", domains=(f"course{n}.example.edu/notes",)) for n in range(500)]
+    clf = ContextClassifier(catalog + list(DEFAULT_RULES))
+    assert clf.classify("Google Chrome", "CS 431 - Lecture 7") == "lecture"
+    assert clf.classify("Google Chrome", "x", "https://course42.example.edu/notes/3") == "docs"
+    assert clf.classify("Google Chrome", "Weather") == "browser"
+    started = time.perf_counter()
+    for i in range(2000):
+        clf.classify("Google Chrome", f"Unrelated page {i}")
+    assert (time.perf_counter() - started) / 2000 < 1e-3  # uncached, 1000 rules: well under a poll
+
+
+def test_inline_flags_and_backreferences():
+    with tempfile.TemporaryDirectory() as tmp:
+        toml = Path(tmp) / "rules.toml"
+        toml.write_text('[[rules]]\ntype = "lecture"\ntitles = ["(?i)cs224n"]\n\n'
+                        '[[rules]]\ntype = "echo"\ntitles = ["(b)\\\\1", "(c)\\\\1"]\n')
+        rules = load_rules(toml)
+    clf = ContextClassifier(rules + list(DEFAULT_RULES))  # "(?i)" mid-alternation used to raise re.error
+    assert clf.classify("Google Chrome", "Stanford CS224N") == "lecture"
+    assert clf.classify("app", "bb") == "echo" and clf.classify("app", "cc") == "echo"
+    assert clf.classify("app", "bc") == "app"
+    assert clf.classify("Google Chrome", "https://example.com") == "website"  # prefilter still used for the rest
+
+
+def main():
+    failed = 0
+    for t in (test_defaults_match_previous_rules, test_domains_and_user_rules_first, test_rule_files_and_large_catalog,
+              test_inline_flags_and_backreferences):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Test Cortex capture and replay: segment files (rotation, truncated tail), capture from on_message,
+replay into a fresh Cortex and EmotivCortexClient, paced replay, zstd blocks (if installed).
+
+Usage:
+  python test_cortex_capture.py
+  python -m pytest -q test_cortex_capture.py
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import cortex_capture
+from cortex import Cortex, QUERY_PROFILE_ID
+from cortex_capture import CaptureWriter, read_frames, replay
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, text):
+        self.sent.append(json.loads(text))
+
+    def close(self):
+        pass
+
+
+class Recorder:
+    """Event sink (Dispatcher only binds methods, and keeps weak references to them)."""
+
+    def __init__(self):
+        self.calls = []
+
+    def on_event(self, *args, **kwargs):
+        self.calls.append(kwargs)
+
+
+def _met_frame(i):
+    return json.dumps({"sid": "s", "time": 100.0 + i * 0.5, "met": [True, i / 10] + [None] * 11})
+
+
+def test_segments_roundtrip_and_truncated_tail():
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = [_met_frame(i) for i in range(500)] + ['{"warning": {"code": 0, "message": "ünïcode"}}']
+        with CaptureWriter(tmp, compress=None, block_bytes=1024, segment_bytes=8 * 1024) as w:
+            for i, frame in enumerate(frames):
+                w.write(frame, t=float(i))
+        assert w.stats()["frames"] == len(frames) and len(w.segments) > 3
+        got = list(read_frames(tmp))
+        assert [text for _, text in got] == frames and [t for t, _ in got] == [float(i) for i in range(len(frames))]
+
+        last = w.segments[-1]  # capture cut off mid-block: complete blocks still read
+        size = last.stat().st_size
+        with open(last, "r+b") as f:
+            f.truncate(size - 5)
+        got = list(read_frames(tmp))
+        assert 0 < len(frames) - len(got) < 40, len(frames) - len(got)
+        assert [text for _, text in got] == frames[:len(got)]
+
+
+def test_capture_from_on_message_and_replay_into_cortex():
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        live = Cortex("id", "secret", request_timeout=None, capture=CaptureWriter(tmp, compress=None))
+        live.ws = FakeWebSocket()
+        live.auth = "tok"
+        live.query_profile()
+        req_id = live.ws.sent[-1]["id"]
+        live.on_message(None, json.dumps({"jsonrpc": "2.0", "id": req_id, "result": [{"name": "p1", "readOnly": False}]}))
+        for i in range(20):
+            live.on_message(None, _met_frame(i))
+        live.stop_capture()
+
+        # The response is stored under its handler id, so it replays without the request
+        stored = [json.loads(text) for _, text in read_frames(tmp)]
+        assert req_id != QUERY_PROFILE_ID and stored[0]["id"] == QUERY_PROFILE_ID and len(stored) == 21
+
+        fresh = Cortex("id", "secret", stream_format="tuple")
+        profiles, met = Recorder(), Recorder()
+        fresh.bind(query_profile_done=profiles.on_event, new_met_data=met.on_event)
+        stats = replay(tmp, fresh, speed=0)
+    assert stats["frames"] == 21 and stats["capture_seconds"] >= 0
+    assert profiles.calls[0]["data"] == ["p1"] and [c["data"][1][1] for c in met.calls[:3]] == [0.0, 0.1, 0.2]
+
+
+def test_late_response_captured_under_handler_id():
+    from scheduler import DeadlineScheduler
+
+    now = [0.0]
+    scheduler = DeadlineScheduler(clock=lambda: now[0])  # not started: timeouts run on run_pending()
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        live = Cortex("id", "secret", request_timeout=5.0, scheduler=scheduler,
+                      capture=CaptureWriter(tmp, compress=None))
+        live.ws = FakeWebSocket()
+        live.auth = "tok"
+        live.query_profile()
+        req_id = live.ws.sent[-1]["id"]
+        now[0] = 5.0
+        scheduler.run_pending()  # timed out before the response came
+        live.on_message(None, json.dumps({"jsonrpc": "2.0", "id": req_id, "result": [{"name": "p1", "readOnly": False}]}))
+        live.stop_capture()
+        assert [json.loads(text)["id"] for _, text in read_frames(tmp)] == [QUERY_PROFILE_ID]
+
+        fresh = Cortex("id", "secret")
+        profiles = Recorder()
+        fresh.bind(query_profile_done=profiles.on_event)
+        replay(tmp, fresh, speed=0)
+    assert profiles.calls and profiles.calls[0]["data"] == ["p1"]
+
+
+def test_replay_pacing_and_eeg_client():
+    from eeg import EmotivCortexClient
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with CaptureWriter(tmp, compress=None) as w:
+            for i in range(5):
+                w.write(_met_frame(i), t=10.0 + i * 2.0)
+            w.write(_met_frame(5), t=1.0)  # clock went backwards (next capture): no gap
+        slept = []
+        now = [0.0]
+
+        def sleep(s):
+            slept.append(s)
+            now[0] += s
+
+        stats = replay(tmp, lambda text: None, speed=4.0, clock=lambda: now[0], sleep=sleep)
+        assert stats["frames"] == 6 and stats["capture_seconds"] == 8.0 and abs(sum(slept) - 2.0) < 1e-9
+
+        got = []
+        done = threading.Event()
+
+        def on_metrics(metrics):
+            got.append(metrics["met"][1])
+            if len(got) == 6:
+                done.set()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = EmotivCortexClient("id", "secret", on_metrics=on_metrics)
+            client.replay(tmp, speed=0)
+            assert done.wait(5)
+        assert got == [0.0, 0.1, 0.2, 0.3, 0.4, 0.5]
+
+
+def test_stop_early_on_uncompressed_capture():
+    with tempfile.TemporaryDirectory() as tmp:
+        with CaptureWriter(tmp, compress=None) as w:
+            for i in range(50):
+                w.write(_met_frame(i))
+        unraisable = []
+        hook, sys.unraisablehook = sys.unraisablehook, unraisable.append
+        try:
+            assert replay(tmp, lambda text: None, speed=0, limit=5)["frames"] == 5
+            frames = read_frames(tmp)
+            next(frames)
+            frames.close()  # no BufferError: the mmap closes with no views left
+        finally:
+            sys.unraisablehook = hook
+        assert unraisable == [], unraisable[0].exc_value
+        assert len(list(read_frames(tmp))) == 50
+
+
+def test_zstd_blocks():
+    if cortex_capture.zstd is None:
+        print("  (skipped: pip install zstandard)")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = [_met_frame(i) for i in range(2000)]
+        with CaptureWriter(tmp, compress="zstd", block_bytes=16 * 1024) as w:
+            for frame in frames:
+                w.write(frame)
+        assert w.stats()["bytes_written"] < w.stats()["bytes_raw"] / 2
+        assert [text for _, text in read_frames(tmp)] == frames
+        assert sum(os.path.getsize(p) for p in w.segments) < sum(len(f) for f in frames) / 2
+
+
+def main():
+    failed = 0
+    for t in (test_segments_roundtrip_and_truncated_tail, test_capture_from_on_message_and_replay_into_cortex,
+              test_late_response_captured_under_handler_id, test_replay_pacing_and_eeg_client,
+              test_stop_early_on_uncompressed_capture, test_zstd_blocks):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Test Cortex request ids (per-request ids, futures, timeouts, legacy handler events) and headset discovery.
+No Cortex service needed: a fake websocket records what is sent and replies are fed to on_message.
+
+Usage:
+  python test_cortex_requests.py
+  python -m pytest -q test_cortex_requests.py
+"""
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cortex import (Cortex, CortexError, FIRST_REQUEST_ID, HEADSET_CONNECTED, HEADSET_CONNECTING,
+                    HEADSET_SCANNING)
+from scheduler import DeadlineScheduler
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.on_send = None
+
+    def send(self, text):
+        msg = json.loads(text)
+        self.sent.append(msg)
+        if self.on_send is not None:
+            self.on_send(msg)
+
+
+class Recorder:
+    """Event sink (Dispatcher only binds methods, and keeps weak references to them)."""
+
+    def __init__(self):
+        self.calls = []
+
+    def on_event(self, *args, **kwargs):
+        self.calls.append(kwargs)
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _client(**kwargs):
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(clock=clock)  # not started: timeouts run on run_pending()
+    c = Cortex("id", "secret", scheduler=scheduler, **kwargs)
+    c.ws = FakeWebSocket()
+    return c, clock, scheduler
+
+
+def _reply(c, req_id, result=None, error=None):
+    msg = {"jsonrpc": "2.0", "id": req_id}
+    if error is not None:
+        msg["error"] = error
+    else:
+        msg["result"] = result
+    c.on_message(None, json.dumps(msg))
+
+
+def test_ids_unique_and_out_of_order_replies():
+    c, _, _ = _client()
+    a = c.get_cortex_info()
+    b = c.get_cortex_info()
+    ids = [m["id"] for m in c.ws.sent]
+    assert ids[0] != ids[1] and min(ids) >= FIRST_REQUEST_ID
+    assert set(c.pending_requests().values()) == {"getCortexInfo"}
+    _reply(c, ids[1], {"version": "b"})
+    _reply(c, ids[0], {"version": "a"})
+    assert a.result(0) == {"version": "a"} and b.result(0) == {"version": "b"}
+    assert c.pending_requests() == {}
+
+
+def test_legacy_handler_runs_before_future():
+    c, _, _ = _client(auto_create_session=False)
+    events = Recorder()
+    c.bind(authorize_done=events.on_event)
+    future = c.authorize()
+    seen = []
+    future.add_done_callback(lambda f: seen.append(c.auth))
+    _reply(c, c.ws.sent[-1]["id"], {"cortexToken": "tok"})
+    assert len(events.calls) == 1 and seen == ["tok"]
+
+
+def test_error_and_timeout():
+    c, clock, scheduler = _client(request_timeout=5.0)
+    errors = Recorder()
+    c.bind(inform_error=errors.on_event)
+    c.auth = "tok"
+    failed = c.query_profile()
+    _reply(c, c.ws.sent[-1]["id"], error={"code": -32002, "message": "Invalid token"})
+    try:
+        failed.result(0)
+        assert False, "expected CortexError"
+    except CortexError as e:
+        assert e.code == -32002 and e.method == "queryProfile"
+    assert errors.calls and errors.calls[0]["error_data"]["code"] == -32002
+
+    slow = c.get_cortex_info()
+    clock.t = 4.9
+    scheduler.run_pending()
+    assert not slow.done()
+    clock.t = 5.0
+    scheduler.run_pending()
+    assert isinstance(slow.exception(0), TimeoutError) and c.pending_requests() == {}
+
+
+def test_late_response_reaches_handler():
+    c, clock, scheduler = _client(request_timeout=5.0)
+    profiles, errors = Recorder(), Recorder()
+    c.bind(query_profile_done=profiles.on_event, inform_error=errors.on_event)
+    c.auth = "tok"
+    slow = c.query_profile()
+    req_id = c.ws.sent[-1]["id"]
+    clock.t = 5.0
+    scheduler.run_pending()
+    assert isinstance(slow.exception(0), TimeoutError)
+    _reply(c, req_id, [{"name": "p1", "readOnly": False}])  # after the timeout: still handled
+    assert profiles.calls and profiles.calls[0]["data"] == ["p1"]
+
+    c.query_profile()
+    req_id = c.ws.sent[-1]["id"]
+    clock.t = 10.0
+    scheduler.run_pending()
+    _reply(c, req_id, error={"code": -32002, "message": "Invalid token"})
+    assert errors.calls[-1]["error_data"]["code"] == -32002
+    _reply(c, req_id, [])  # answered once: a repeat is not routed again
+    assert len(profiles.calls) == 1
+
+
+def test_blocking_call_from_another_thread():
+    c, _, _ = _client()
+    # Reply from a separate thread, the way the websocket thread would
+    c.ws.on_send = lambda msg: threading.Timer(0.01, _reply, (c, msg["id"], {"echo": msg["params"]})).start()
+    assert c.call("queryRecords", {"limit": 1}, timeout=2.0) == {"echo": {"limit": 1}}
+
+
+def _headsets(c, status):
+    req = [m for m in c.ws.sent if m["method"] == "queryHeadsets"][-1]
+    _reply(c, req["id"], [{"id": "EPOCX-1", "status": status, "connectedBy": "dongle"}] if status else [])
+
+
+def _methods(c):
+    return [m["method"] for m in c.ws.sent]
+
+
+def test_headset_discovery_without_sleep():
+    c, clock, scheduler = _client(request_timeout=None)
+    started = time.perf_counter()
+    c.authorize()
+    _reply(c, c.ws.sent[-1]["id"], {"cortexToken": "tok"})
+    assert _methods(c)[-2:] == ["controlDevice", "queryHeadsets"] and c.headset_state == HEADSET_SCANNING
+
+    _headsets(c, None)  # nothing yet: re-queried on the backoff timer, not by sleeping
+    n = len(c.ws.sent)
+    clock.t = 0.5
+    scheduler.run_pending()
+    assert len(c.ws.sent) == n + 1 and _methods(c)[-1] == "queryHeadsets"
+
+    _headsets(c, "discovered")  # first headset becomes the wanted one and is connected right away
+    assert c.headset_id == "EPOCX-1" and _methods(c)[-1] == "controlDevice" and c.headset_state == HEADSET_CONNECTING
+    _headsets(c, "connecting")
+    assert _methods(c).count("controlDevice") == 2  # refresh + one connect
+
+    c.on_message(None, json.dumps({"warning": {"code": 104, "message": "connected"}}))  # HEADSET_CONNECTED
+    assert _methods(c)[-1] == "queryHeadsets"
+    _headsets(c, "connected")
+    assert _methods(c)[-1] == "createSession" and c.headset_state == HEADSET_CONNECTED
+    assert time.perf_counter() - started < 1.0
+
+    n = len(c.ws.sent)
+    clock.t = 100.0
+    scheduler.run_pending()  # retry timer cancelled once connected
+    assert len(c.ws.sent) == n and len(scheduler) == 0
+
+
+def main():
+    failed = 0
+    for t in (test_ids_unique_and_out_of_order_replies, test_legacy_handler_runs_before_future,
+              test_error_and_timeout, test_late_response_reaches_handler, test_blocking_call_from_another_thread,
+              test_headset_discovery_without_sleep):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
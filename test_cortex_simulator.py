@@ -0,0 +1,163 @@
+"""
+Test the Cortex simulator with both clients: threaded Cortex startup chain, AsyncCortex faults, replay.
+
+Usage:
+  python test_cortex_simulator.py
+  python -m pytest -q test_cortex_simulator.py
+"""
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from cortex import Cortex, CortexError
+
+
+class _MetListener:
+    """Mirrors eeg.py: subscribe once the session exists, count met samples."""
+
+    def __init__(self, cortex):
+        self.cortex = cortex
+        self.met = []
+        self.got_met = threading.Event()
+        cortex.bind(create_session_done=self.on_session, new_met_data=self.on_met)
+
+    def on_session(self, *args, **kwargs):
+        self.cortex.sub_request(["met", "eeg"])
+
+    def on_met(self, *args, **kwargs):
+        self.met.append(kwargs["data"])
+        if len(self.met) >= 3:
+            self.got_met.set()
+
+
+def test_threaded_cortex_startup_chain():
+    if websockets is None:
+        print("  (skipped: pip install websockets)")
+        return
+    from cortex_simulator import CortexSimulator
+    sim = CortexSimulator(port=0, speed=20, connect_delay=0.1)  # headset starts 'discovered'
+    url = sim.start_in_thread()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cortex = Cortex("id", "secret", url=url)
+            listener = _MetListener(cortex)
+            threading.Thread(target=cortex.open, daemon=True).start()
+            assert listener.got_met.wait(10), "no met data"
+            cortex.close()
+        assert cortex.headset_state == "idle" and cortex.session_id
+        assert len(listener.met[0]["met"]) == 13
+        assert sim.stats()["samples_sent"] > len(listener.met)
+    finally:
+        sim.stop_in_thread()
+
+
+async def _async_faults():
+    from async_cortex import AsyncCortex
+    from cortex_simulator import CortexSimulator, Faults
+    sim = CortexSimulator(port=0, speed=8, headset_status="connected",
+                          faults=Faults(fail_methods=frozenset({"queryProfile"})))
+    url = await sim.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            async with AsyncCortex("id", "secret", url=url, stream_format="tuple") as cortex:
+                await cortex.prepare()
+                try:
+                    await cortex.query_profile()
+                    assert False, "expected CortexError"
+                except CortexError as e:
+                    assert e.method == "queryProfile"
+                eeg = cortex.stream("eeg", maxsize=4096)
+                await cortex.subscribe(["eeg"])
+                assert len(cortex.labels["eeg"]) == 18  # MARKERS dropped
+                await asyncio.sleep(0.5)  # 128 Hz x 8 -> ~512 samples
+                assert 200 <= eeg.received <= 900 and eeg.dropped == 0, eeg.received
+                record = await cortex.create_record("sim")
+                marker = await cortex.inject_marker_request(1, "1", "blink")
+                assert marker["marker"]["label"] == "blink"
+                await cortex.stop_record()
+                exported = await cortex.export_record("/tmp", ["EEG"], "CSV", [record["record"]["uuid"]], "V2")
+                assert exported["success"][0]["recordId"] == record["record"]["uuid"]
+    finally:
+        await sim.stop()
+
+    # Requests that are never answered time out on the client
+    sim = CortexSimulator(port=0, faults=Faults(drop_rate=1.0))
+    url = await sim.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            async with AsyncCortex("id", "secret", url=url, request_timeout=0.2) as cortex:
+                try:
+                    await cortex.has_access_right()
+                    assert False, "expected TimeoutError"
+                except TimeoutError:
+                    pass
+    finally:
+        await sim.stop()
+
+
+def test_async_client_faults_and_rates():
+    if websockets is None:
+        print("  (skipped: pip install websockets)")
+        return
+    asyncio.run(_async_faults())
+
+
+async def _replay(path):
+    from async_cortex import AsyncCortex
+    from cortex_simulator import CortexSimulator
+    sim = CortexSimulator(port=0, speed=0, headset_status="connected", replay=path)
+    url = await sim.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            async with AsyncCortex("id", "secret", url=url, stream_format="tuple") as cortex:
+                await cortex.prepare()
+                met = cortex.stream("met", maxsize=100, overflow="block")
+                await cortex.subscribe(["met"])
+                values = []
+                async for t, v in met:
+                    values.append(v[1])
+                    if len(values) == 6:
+                        break
+        return values
+    finally:
+        await sim.stop()
+
+
+def test_replay_loops_recorded_frames():
+    if websockets is None:
+        print("  (skipped: pip install websockets)")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "frames.jsonl"
+        with open(path, "w") as f:
+            for i in range(3):
+                f.write(json.dumps({"sid": "s", "time": 100.0 + i * 0.5, "met": [True, i / 10] + [None] * 11}) + "\n")
+        assert asyncio.run(_replay(path)) == [0.0, 0.1, 0.2, 0.0, 0.1, 0.2]
+
+
+def main():
+    failed = 0
+    for t in (test_threaded_cortex_startup_chain, test_async_client_faults_and_rates, test_replay_loops_recorded_frames):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Test the collector payload schema: activity snapshots, wire dicts, agent requests.
+
+Usage:
+  python test_data_schema.py
+  python -m pytest -q test_data_schema.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from agent_request import build_agent_request
+from data_schema import (ActivitySnapshot, CollectorPayload, EEGMetricsSnapshot, MentalStateSnapshot, available_codecs,
+                         get_codec)
+
+
+def _activity(duration=None):
+    return ActivitySnapshot(app_name="Google Chrome", window_title="Lecture 5", context_type="lecture",
+                            context_id="Google Chrome::Lecture 5", reading_section="chain-rule",
+                            duration_seconds=duration)
+
+
+def test_activity_to_dict_per_tick():
+    a, b = _activity(12.34), _activity(13.0)
+    assert a.to_dict() == {"app_name": "Google Chrome", "window_title": "Lecture 5", "context_type": "lecture",
+                           "context_id": "Google Chrome::Lecture 5", "reading_section": "chain-rule",
+                           "duration_seconds": 12.34}  # not rounded
+    assert b.to_dict()["duration_seconds"] == 13.0 and a.to_dict() is not a.to_dict()
+    payload = CollectorPayload(type="activity", timestamp=1.0, activity=a).to_dict()
+    payload["activity"]["window_title"] = "changed"
+    assert a.to_dict()["window_title"] == "Lecture 5"
+
+
+def test_agent_request_activity_is_not_shared():
+    act = _activity(5.0)
+    first = build_agent_request(act, None, timestamp=1.0)
+    first["activity"]["duration_seconds"] = 999
+    second = build_agent_request(act, None, timestamp=2.0)
+    assert second["activity"]["duration_seconds"] == 5.0 and act.duration_seconds == 5.0
+
+
+def test_frame_round_trip_per_codec():
+    met = {"met": [True, 0.5, None, 0.25, 0.75], "time": 10.0}
+    ms = MentalStateSnapshot(engagement=0.5, stress=0.25, metrics=met)
+    frame = CollectorPayload.frame(10.0, _activity(3.0), EEGMetricsSnapshot(metrics=met), ms)
+    d = frame.to_dict()
+    assert "metrics" not in d["mental_state"] and d["eeg"]["metrics"] is met  # raw met sent once
+    other = CollectorPayload.frame(10.0, None, EEGMetricsSnapshot(metrics=met), MentalStateSnapshot(metrics={"met": [1.0]}))
+    assert other.to_dict()["mental_state"]["metrics"] == {"met": [1.0]}  # different met: kept
+    for name in available_codecs():
+        got = CollectorPayload.decode(get_codec(name).dumps(d), codec=name)
+        assert got.type == "frame" and got.timestamp == 10.0, name
+        assert got.eeg.metrics == met, (name, got.eeg.metrics)
+        assert got.mental_state.metrics is got.eeg.metrics and got.mental_state.engagement == 0.5, name
+        assert got.activity == _activity(3.0), name
+    single = CollectorPayload.decode(CollectorPayload(type="mental_state", timestamp=1.0, mental_state=ms).to_dict())
+    assert single.mental_state.metrics == met and single.eeg is None
+
+
+def main():
+    failed = 0
+    for t in (test_activity_to_dict_per_tick, test_agent_request_activity_is_not_shared, test_frame_round_trip_per_codec):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
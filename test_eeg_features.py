@@ -0,0 +1,94 @@
+"""
+Test incremental windowed EEG features against a direct NumPy recompute (no headset needed).
+
+Usage:
+  python test_eeg_features.py
+  python -m pytest -q test_eeg_features.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import numpy as np
+    from eeg_features import BANDS, FeatureExtractor, RollingStats
+    from stream_store import StreamStore
+except ImportError:
+    np = None
+
+CHANNELS = ["AF3", "F3", "F4", "AF4"]
+
+
+def test_features_match_direct_recompute():
+    if np is None:
+        print("  (skipped: pip install numpy)")
+        return
+    store = StreamStore(seconds=10)
+    store._on_labels(data={"streamName": "pow", "labels": [f"{ch}/{b}" for ch in CHANNELS for b in BANDS]})
+    store._on_labels(data={"streamName": "dev", "labels": CHANNELS})
+    fx = FeatureExtractor(store, window_sec=2.0, hop_sec=0.25)
+    rng = np.random.default_rng(1)
+    for i in range(8 * 30):  # 30 s of pow at 8 Hz: the window slides ~14 ring lengths
+        t = i / 8
+        store.add("pow", {"pow": rng.uniform(1, 10, len(CHANNELS) * len(BANDS)).tolist(), "time": t})
+        store.add("dev", {"dev": [4, 2, 4, 0], "time": t})
+        fx.update()
+    feats = fx.update(force=True)
+
+    _, x = store.last("pow", 2.0)
+    assert feats["samples"] == len(x) == 16
+    ring = store.ring("pow")
+    means = np.array([[x[:, ring.column(f"{ch}/{b}")].mean() for ch in CHANNELS] for b in BANDS])
+    w = np.array([1.0, 0.5, 1.0, 0.0])  # contact quality / 4
+    expected = means @ w / w.sum()
+    assert np.allclose([feats["band_power"][b] for b in BANDS], expected)
+    beta = expected[BANDS.index("betaL")] + expected[BANDS.index("betaH")]
+    assert np.isclose(feats["theta_beta_ratio"], expected[0] / beta)
+    alpha = means[BANDS.index("alpha")]
+    assert np.isclose(feats["alpha_asymmetry"], np.log(alpha[2]) - np.log(alpha[1]))  # F4 vs F3
+    assert np.isclose(feats["signal_quality"], w.mean())
+
+
+def test_nan_cells_skipped_and_no_resets_during_warm_up():
+    if np is None:
+        print("  (skipped: pip install numpy)")
+        return
+    store = StreamStore(seconds=10)
+    store._on_labels(data={"streamName": "pow", "labels": ["AF3/theta", "AF3/alpha"]})
+    ring = store.ring("pow")
+    stats = RollingStats(ring, window_sec=2.0)
+    rng = np.random.default_rng(2)
+    for i in range(8 * 6):
+        t = i / 8
+        row = rng.uniform(1, 10, 2).tolist()
+        if i in (0, 20):
+            row[0] = None  # missing value: NaN in the ring
+        store.add("pow", {"pow": row, "time": t})
+        stats.update()
+        if t < 2.0:  # window not full yet: incremental, never reset and recomputed
+            assert stats._updates == i + 1, (i, stats._updates)
+        _, x = store.last("pow", 2.0)
+        assert stats.count == len(x)
+        if i == 0:
+            assert np.isnan(stats.mean()[0]) and np.isfinite(stats.mean()[1])  # first row NaN: shift still finite
+            continue
+        assert np.allclose(stats.mean(), np.nanmean(x, axis=0)), (i, stats.mean())
+        assert np.allclose(stats.var(), np.nanvar(x, axis=0)), (i, stats.var())
+    assert np.isfinite(stats.mean()).all() and not np.isnan(x).any()  # NaN row has left the window
+
+
+def main():
+    failed = 0
+    for t in (test_features_match_direct_recompute, test_nan_cells_skipped_and_no_resets_during_warm_up):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
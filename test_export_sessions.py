@@ -0,0 +1,84 @@
+"""
+Test the day-partitioned history export (Parquet via pyarrow, and the CSV.gz fallback).
+
+Usage:
+  python test_export_sessions.py
+  python -m pytest -q test_export_sessions.py
+"""
+import csv
+import gzip
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from data_schema import MentalStateSnapshot
+from export_sessions import export, pa
+from session_store import SessionStore
+
+DAY1 = datetime(2026, 2, 14, 23, 59, 0).timestamp()
+
+
+def _fill(db: Path) -> None:
+    store = SessionStore(db, mental_state_interval_sec=0)
+    for i in range(300):  # 0.5 s apart: straddles midnight
+        store.record_mental_state(MentalStateSnapshot(engagement=i / 300), t=DAY1 + i * 0.5, context_id="a")
+    store.record_help_request("a", {"n": 1}, t=DAY1)
+    store.close()
+
+
+def test_parquet_partitioned_by_day():
+    if pa is None:
+        print("  (skipped: pip install pyarrow)")
+        return
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db, out = Path(tmp) / "sessions.db", Path(tmp) / "out"
+        _fill(db)
+        result = export(out, db, "parquet", chunk_rows=64)  # several chunks per day
+        assert result["mental_state"] == {"2026-02-14": 120, "2026-02-15": 180}
+        assert result["help_requests"] == {"2026-02-14": 1}
+        assert result["sessions"] == {}
+
+        table = pq.read_table(out / "mental_state")  # whole dataset, `date` from the partition dirs
+        assert table.num_rows == 300
+        assert sorted(set(table.column("date").to_pylist())) == ["2026-02-14", "2026-02-15"]
+        day2 = pq.ParquetFile(out / "mental_state" / "date=2026-02-15" / "part-0.parquet")
+        assert day2.metadata.num_row_groups > 1
+        assert day2.schema_arrow.field("engagement").type == pa.float64()
+
+        # Re-export replaces a day rather than appending to it
+        export(out, db, "parquet", tables=["mental_state"])
+        assert pq.read_table(out / "mental_state").num_rows == 300
+
+
+def test_csv_fallback():
+    with tempfile.TemporaryDirectory() as tmp:
+        db, out = Path(tmp) / "sessions.db", Path(tmp) / "out"
+        _fill(db)
+        since = datetime(2026, 2, 15).date()
+        result = export(out, db, "csv", since=since, tables=["mental_state"])
+        assert result == {"mental_state": {"2026-02-15": 180}}
+        with gzip.open(out / "mental_state" / "date=2026-02-15" / "part-0.csv.gz", "rt") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 180 and rows[0]["context_id"] == "a"
+        assert float(rows[0]["t"]) == datetime(2026, 2, 15).timestamp()
+
+
+def main():
+    failed = 0
+    for t in (test_parquet_partitioned_by_day, test_csv_fallback):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
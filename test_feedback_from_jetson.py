@@ -10,6 +10,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 from activity import ActivityMonitor
 from feedback_window import FeedbackWindow
+from jetson_client import feedback_from, get_client, split_url
 import requests
 
 
@@ -25,6 +26,7 @@ SEND_INTERVAL = 2.0
 def _send_and_show_feedback(eeg_url: str, window: FeedbackWindow):
     """POST to /eeg, parse response for feedback, update window."""
     activity = ActivityMonitor(poll_interval=1.0)
+    jetson = get_client(split_url(eeg_url)[0])
     count = 0
     while True:
         count += 1
@@ -32,22 +34,12 @@ def _send_and_show_feedback(eeg_url: str, window: FeedbackWindow):
         context = ctx.to_dict() if ctx else {}
         body = {"timestamp": time.time(), "streams": SAMPLE_STREAMS, "context": context}
         try:
-            r = requests.post(
-                eeg_url,
-                json=body,
-                headers={"Content-Type": "application/json", "ngrok-skip-browser-warning": "1"},
-                timeout=10,
-            )
+            r = jetson.post_json(eeg_url, body, timeout=10)
             print(f"[{count}] POST {eeg_url} -> {r.status_code}")
-            if r.status_code == 200 and r.text:
-                try:
-                    data = r.json()
-                    feedback = data.get("feedback") or data.get("message")
-                    if feedback:
-                        window.root.after(0, lambda t=feedback: window.update_feedback(t))
-                        print(f"      feedback: {feedback[:60]}...")
-                except ValueError:
-                    pass
+            feedback = feedback_from(r)
+            if feedback:
+                window.root.after(0, lambda t=feedback: window.update_feedback(t))
+                print(f"      feedback: {feedback[:60]}...")
         except requests.RequestException as e:
             print(f"[{count}] POST failed: {e}")
         time.sleep(SEND_INTERVAL)
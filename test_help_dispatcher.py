@@ -0,0 +1,166 @@
+"""
+Test the off-thread help dispatcher: coalescing, cancellation, queue limits, late results, histograms.
+send() blocks on events the test releases, so every step is deterministic.
+
+Usage:
+  python test_help_dispatcher.py
+  python -m pytest -q test_help_dispatcher.py
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from help_dispatcher import HelpDispatcher, LatencyHistogram
+
+
+class GatedSend:
+    """send(body) that waits until release(context_id); records what started."""
+
+    def __init__(self):
+        self.started = []
+        self._gates: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.any_started = threading.Semaphore(0)
+
+    def _gate(self, cid: str) -> threading.Event:
+        with self._lock:
+            return self._gates.setdefault(cid, threading.Event())
+
+    def __call__(self, body: dict):
+        cid = body["context_id"]
+        self.started.append(cid)
+        self.any_started.release()
+        assert self._gate(cid).wait(5)
+        if body.get("fail"):
+            raise ConnectionError("jetson down")
+        return f"help for {cid}"
+
+    def release(self, cid: str) -> None:
+        self._gate(cid).set()
+
+
+class Results:
+    def __init__(self):
+        self.results, self.errors = [], []
+        self.done = threading.Semaphore(0)
+
+    def on_result(self, text):
+        self.results.append(text)
+        self.done.release()
+
+    def on_error(self, exc):
+        self.errors.append(exc)
+        self.done.release()
+
+
+def _wait_until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _dispatcher(workers=1, max_queue=8):
+    send, res = GatedSend(), Results()
+    d = HelpDispatcher(send, res.on_result, res.on_error, workers=workers, max_queue=max_queue)
+    return d, send, res
+
+
+def test_coalesce_and_errors():
+    d, send, res = _dispatcher()
+    assert d.submit("a", {"context_id": "a"})
+    assert send.any_started.acquire(timeout=5)
+    assert not d.submit("a", {"context_id": "a"})  # in flight: coalesced
+    send.release("a")
+    assert res.done.acquire(timeout=5) and res.results == ["help for a"]
+    _wait_until(lambda: d.stats()["in_flight"] == 0)
+    assert d.submit("a", {"context_id": "a"})  # finished: a new request is accepted
+    assert res.done.acquire(timeout=5)
+    assert d.submit("b", {"context_id": "b", "fail": True})
+    send.release("b")
+    assert res.done.acquire(timeout=5) and isinstance(res.errors[0], ConnectionError)
+    st = d.stats()
+    assert (st["submitted"], st["coalesced"], st["completed"], st["failed"]) == (3, 1, 2, 1)
+    d.stop()
+
+
+def test_cancel_others_discards_late_results_and_frees_slots():
+    d, send, res = _dispatcher(workers=1, max_queue=2)
+    d.submit("a", {"context_id": "a"})
+    assert send.any_started.acquire(timeout=5)  # a in flight, the only worker busy
+    assert d.submit("b", {"context_id": "b"}) and d.submit("c", {"context_id": "c"})
+    assert not d.submit("d", {"context_id": "d"}) and d.stats()["dropped"] == 1  # queue full
+    assert d.cancel_others("e") == 3
+    assert d.stats()["queue_depth"] == 0  # cancelled jobs don't hold queue slots
+    assert d.submit("e", {"context_id": "e"}) and d.submit("f", {"context_id": "f"})
+    assert d.cancel_others("e") == 1 and d.cancel_others("e") == 0
+
+    send.release("a")  # late result of a cancelled job: dropped
+    assert send.any_started.acquire(timeout=5)
+    assert send.started == ["a", "e"]  # b, c and f never sent
+    send.release("e")
+    assert res.done.acquire(timeout=5)
+    assert res.results == ["help for e"] and res.errors == []
+    _wait_until(lambda: d.stats()["in_flight"] == 0)
+    st = d.stats()
+    assert st["cancelled"] == 4 and st["completed"] == 1 and st["failed"] == 0  # a counted once, as cancelled
+    assert st["submitted"] == st["cancelled"] + st["completed"] + st["failed"]
+    d.stop()
+
+
+def test_cancelled_in_flight_failure_counted_once():
+    d, send, res = _dispatcher()
+    d.submit("a", {"context_id": "a", "fail": True})
+    assert send.any_started.acquire(timeout=5)
+    assert d.cancel_others("b") == 1
+    send.release("a")
+    _wait_until(lambda: d.stats()["in_flight"] == 0)
+    st = d.stats()
+    assert (st["submitted"], st["cancelled"], st["completed"], st["failed"]) == (1, 1, 0, 0)
+    assert res.errors == [] and d.latency.snapshot()["count"] == 1
+    d.stop()
+
+
+def test_burst_of_cancellations_does_not_fill_queue():
+    d, send, _ = _dispatcher(workers=1, max_queue=4)
+    d.submit("busy", {"context_id": "busy"})
+    assert send.any_started.acquire(timeout=5)
+    accepted = 0
+    for i in range(50):  # user flips through pages faster than the worker drains
+        accepted += d.submit(f"p{i}", {"context_id": f"p{i}"})
+        d.cancel_others(f"p{i}")
+    assert accepted == 50 and d.stats()["queue_depth"] == 1
+    send.release("busy")
+    d.stop()
+
+
+def test_latency_histogram():
+    h = LatencyHistogram()
+    assert h.snapshot()["mean"] is None
+    for s in (0.05, 0.3, 0.3, 45.0):
+        h.observe(s)
+    snap = h.snapshot()
+    assert snap["count"] == 4 and snap["max"] == 45.0 and abs(snap["mean"] - 11.4125) < 1e-9
+    assert snap["buckets"]["<=0.1s"] == 1 and snap["buckets"]["<=0.5s"] == 2 and snap["buckets"]["+inf"] == 1
+    assert sum(snap["buckets"].values()) == 4
+
+
+def main():
+    failed = 0
+    for t in (test_coalesce_and_errors, test_cancel_others_discards_late_results_and_frees_slots,
+              test_cancelled_in_flight_failure_counted_once, test_burst_of_cancellations_does_not_fill_queue,
+              test_latency_histogram):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
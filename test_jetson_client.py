@@ -0,0 +1,139 @@
+"""
+Test the Jetson HTTP client's retry/backoff policy, gzip bodies and per-endpoint timeouts.
+No network: the pooled session is replaced by a stub that replays scripted outcomes.
+
+Usage:
+  python test_jetson_client.py
+  python -m pytest -q test_jetson_client.py
+"""
+import gzip
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import requests
+    from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+    from jetson_client import JetsonClient
+except ImportError:
+    requests = None
+
+
+class StubResponse:
+    def __init__(self, status_code: int, text: str = ""):
+        self.status_code = status_code
+        self.text = text
+
+
+class StubSession:
+    """session.request() that returns/raises the scripted outcomes in order and records calls."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append({"method": method, "url": url, "timeout": timeout, **kwargs})
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return StubResponse(outcome)
+
+    def close(self):
+        pass
+
+
+def _client(*outcomes, **kwargs):
+    client = JetsonClient("https://jetson.example", **kwargs)
+    client.session = StubSession(*outcomes)
+    client.sleeps = []
+    client._sleep = client.sleeps.append
+    return client
+
+
+def _refused():
+    reason = NewConnectionError(None, "Failed to establish a new connection: [Errno 111] Connection refused")
+    return requests.ConnectionError(MaxRetryError(None, "/eeg", reason))
+
+
+def test_status_retries_only_for_idempotent_requests():
+    if requests is None:
+        print("  (skipped: pip install requests)")
+        return
+    client = _client(504)  # tunnel timeout after the processor may have acted: no duplicate agent call
+    assert client.post_json("/eeg", {"a": 1}).status_code == 504 and len(client.session.calls) == 1
+
+    client = _client(502, 503, 200, retries=2)
+    assert client.get("/feedback").status_code == 200 and len(client.session.calls) == 3
+
+    client = _client(503, 200)
+    assert client.post_json("/notes", {"a": 1}, idempotent=True).status_code == 200 and len(client.session.calls) == 2
+
+    client = _client(503, 503, 503, retries=2)  # retries exhausted: last response returned
+    assert client.get("/feedback").status_code == 503 and len(client.session.calls) == 3
+
+
+def test_post_retries_only_when_never_sent():
+    if requests is None:
+        print("  (skipped: pip install requests)")
+        return
+    client = _client(_refused(), requests.ConnectTimeout("connect timed out"), 200)
+    assert client.post_json("/eeg", {}).status_code == 200 and len(client.session.calls) == 3
+
+    for error in (requests.ReadTimeout("read timed out"), requests.ConnectionError("Connection aborted")):
+        client = _client(error, 200)
+        try:
+            client.post_json("/eeg", {})
+            assert False, "expected the error"
+        except requests.RequestException as e:
+            assert e is error and len(client.session.calls) == 1
+
+    client = _client(requests.ReadTimeout("read timed out"), 200)  # GET: safe to resend
+    assert client.get("/feedback").status_code == 200
+
+
+def test_backoff_is_jittered_and_capped():
+    if requests is None:
+        print("  (skipped: pip install requests)")
+        return
+    client = _client(*[_refused()] * 6, 200, retries=6, backoff_sec=0.5, max_backoff_sec=2.0)
+    assert client.post_json("/eeg", {}).status_code == 200
+    caps = [min(2.0, 0.5 * 2 ** attempt) for attempt in range(1, 7)]
+    assert len(client.sleeps) == 6 and all(0 <= s <= cap for s, cap in zip(client.sleeps, caps))
+
+
+def test_gzip_body_and_timeouts():
+    if requests is None:
+        print("  (skipped: pip install requests)")
+        return
+    body = {"context": {"window_title": "x" * 2000}}
+    client = _client(200, 200, 200, 200, gzip_min_bytes=1024)
+    client.post_json("/eeg", body)
+    client.post_json("/eeg", {"small": 1})
+    client.get("/feedback")
+    client.get("https://jetson.example/other", timeout=1.5)
+    big, small, fb, other = client.session.calls
+    assert big["headers"]["Content-Encoding"] == "gzip" and json.loads(gzip.decompress(big["data"])) == body
+    assert "Content-Encoding" not in small["headers"] and json.loads(small["data"]) == {"small": 1}
+    assert big["url"] == "https://jetson.example/eeg"
+    assert (big["timeout"], fb["timeout"], other["timeout"]) == (30.0, 5.0, 1.5)
+
+
+def main():
+    failed = 0
+    for t in (test_status_retries_only_for_idempotent_requests, test_post_retries_only_when_never_sent,
+              test_backoff_is_jittered_and_capped, test_gzip_body_and_timeouts):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
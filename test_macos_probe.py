@@ -0,0 +1,128 @@
+"""
+Test the batched macOS probe against a fake osascript (runs on Linux, no Mac needed).
+
+Usage:
+  python test_macos_probe.py
+  python -m pytest -q test_macos_probe.py
+"""
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity.macos import FIELD_SEP, OsascriptProbe, get_reading_section_macos
+
+FIELDS = ["Google Chrome", "Lecture 5 — Backprop", "https://cs224n.stanford.edu/notes#chain-rule", "", ""]
+
+# Fake osascript: `-e script` prints FIELDS once; `-l JavaScript` answers one line per stdin line.
+# Every start is appended to $FAKE_OSASCRIPT_LOG so tests can count processes.
+FAKE_OSASCRIPT = f"""#!{sys.executable}
+import os, sys
+with open(os.environ["FAKE_OSASCRIPT_LOG"], "a") as f:
+    f.write(" ".join(a for a in sys.argv[1:] if a.startswith("-")) + "\\n")
+out = {FIELD_SEP.join(FIELDS)!r}
+if os.environ.get("FAKE_OSASCRIPT_HANG"):
+    import time; time.sleep(10)
+if "-l" in sys.argv:
+    for line in sys.stdin:
+        sys.stdout.write(out + "\\x1e\\n")
+        sys.stdout.flush()
+else:
+    print(out)
+"""
+
+
+def _make_fake(tmp: Path) -> Path:
+    exe = tmp / "osascript"
+    exe.write_text(FAKE_OSASCRIPT)
+    exe.chmod(exe.stat().st_mode | stat.S_IXUSR)
+    os.environ["FAKE_OSASCRIPT_LOG"] = str(tmp / "calls.log")
+    return exe
+
+
+def _starts(tmp: Path) -> int:
+    log = tmp / "calls.log"
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+def test_single_shot_probe():
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        probe = OsascriptProbe(osascript=str(_make_fake(tmp)))
+        res = probe.probe()
+        assert res is not None
+        assert res.app_name == "Google Chrome"
+        assert res.window_title == "Lecture 5 — Backprop"
+        assert res.url == "https://cs224n.stanford.edu/notes#chain-rule"
+        assert res.selected_text is None and res.focused_value is None
+        assert res.window.context_id == "Google Chrome::Lecture 5 — Backprop"
+        assert _starts(tmp) == 1  # window + URL + selection + focus in one process
+
+
+def test_persistent_probe_reuses_process():
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        probe = OsascriptProbe(persistent=True, osascript=str(_make_fake(tmp)))
+        try:
+            for _ in range(20):
+                res = probe.probe()
+                assert res is not None and res.app_name == "Google Chrome"
+        finally:
+            probe.close()
+        assert _starts(tmp) == 1
+
+
+def test_persistent_probe_timeout_restarts():
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        probe = OsascriptProbe(persistent=True, osascript=str(_make_fake(tmp)), timeout=0.3)
+        os.environ["FAKE_OSASCRIPT_HANG"] = "1"
+        try:
+            t0 = time.monotonic()
+            assert probe.probe() is None
+            assert time.monotonic() - t0 < 2
+        finally:
+            del os.environ["FAKE_OSASCRIPT_HANG"]
+        try:
+            assert probe.probe() is not None
+        finally:
+            probe.close()
+        assert _starts(tmp) == 2
+
+
+def test_reading_section_from_probe():
+    with tempfile.TemporaryDirectory() as d:
+        res = OsascriptProbe(osascript=str(_make_fake(Path(d)))).probe()
+    assert get_reading_section_macos(res.app_name, res.window_title, probe=res) == "chain-rule"
+
+
+def test_missing_osascript():
+    assert OsascriptProbe(osascript="/nonexistent/osascript").probe() is None
+    assert OsascriptProbe(persistent=True, osascript="/nonexistent/osascript").probe() is None
+
+
+def main():
+    tests = [
+        test_single_shot_probe,
+        test_persistent_probe_reuses_process,
+        test_persistent_probe_timeout_restarts,
+        test_reading_section_from_probe,
+        test_missing_osascript,
+    ]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
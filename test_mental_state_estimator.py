@@ -0,0 +1,106 @@
+"""
+Test MentalStateEstimator smoothing, hysteresis and dwell (no headset needed).
+
+Usage:
+  python test_mental_state_estimator.py
+  python -m pytest -q test_mental_state_estimator.py
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from agent_request import build_agent_request
+from data_schema import ActivitySnapshot, CollectorPayload, MentalStateSnapshot
+from mental_state_parser import MentalStateEstimator, derive_mental_state_label, parse_met_to_mental_state
+
+
+def _met(eng: float, stress: float, focus: float) -> dict:
+    return {"met": [True, eng, True, 0.4, 0.3, True, stress, True, 0.5, True, 0.4, True, focus]}
+
+
+def test_noisy_boundary_does_not_flap():
+    rnd = random.Random(0)
+    est = MentalStateEstimator()
+    raw_changes, prev = 0, None
+    for i in range(600):  # 5 min at 2 Hz around the confused/focused boundary
+        m = _met(0.45 + rnd.gauss(0, 0.08), 0.52 + rnd.gauss(0, 0.08), 0.45 + rnd.gauss(0, 0.08))
+        label = derive_mental_state_label(parse_met_to_mental_state(m))
+        raw_changes += label != prev
+        prev = label
+        est.update(m, now=i * 0.5)
+    assert raw_changes > 100
+    assert est.transitions <= 2, est.transitions
+
+
+def test_sustained_change_switches_after_dwell():
+    est = MentalStateEstimator(min_dwell_sec=3.0)
+    for i in range(20):
+        est.update(_met(0.7, 0.3, 0.7), now=i * 0.5)
+    assert est.label == "focused"
+    t = 10.0
+    while est.label == "focused" and t < 30:
+        est.update(_met(0.2, 0.8, 0.2), now=t)
+        t += 0.5
+    assert est.label == "confused"
+    assert 3.0 <= t - 10.0 <= 8.0, t  # median + EMA lag, then the 3 s dwell
+    summary = est.dwell_summary(now=t)
+    assert summary["focused"] > 0 and est.dwell_seconds(now=t) >= 0
+
+
+def test_spike_is_filtered():
+    est = MentalStateEstimator()
+    for i in range(10):
+        est.update(_met(0.6, 0.3, 0.6), now=i)
+    ms = est.update(_met(0.0, 1.0, 0.0), now=10)  # one bad sample
+    assert abs(ms.engagement - 0.6) < 1e-9 and abs(ms.stress - 0.3) < 1e-9
+
+
+def test_downstream_label_is_the_stable_one():
+    import tempfile
+    from session_store import SessionStore
+
+    rnd = random.Random(1)
+    est = MentalStateEstimator()
+    act = ActivitySnapshot(app_name="Chrome", window_title="Lecture", context_type="lecture", context_id="a")
+    requests, wire, rederived = [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(Path(tmp) / "sessions.db", mental_state_interval_sec=0.0)
+        for i in range(240):  # 2 min at 2 Hz around the confused/focused boundary, as app.py feeds it
+            m = _met(0.45 + rnd.gauss(0, 0.08), 0.52 + rnd.gauss(0, 0.08), 0.45 + rnd.gauss(0, 0.08))
+            ms = est.update(m, now=i * 0.5)
+            assert ms.label == est.label and ms.label_seconds == est.dwell_seconds(now=i * 0.5)
+            store.record_mental_state(ms, t=float(i), context_id="a", label=ms.label)
+            requests.append(build_agent_request(act, ms, timestamp=float(i))["mental_state"]["label"])
+            wire.append(CollectorPayload.decode(CollectorPayload(type="mental_state", mental_state=ms).to_dict()))
+            # The label recomputed from the smoothed values alone (no hysteresis, no dwell)
+            rederived.append(derive_mental_state_label(MentalStateSnapshot(
+                engagement=ms.engagement, stress=ms.stress, focus=ms.focus)))
+        assert store.flush()
+        stored = [r["label"] for r in store.mental_state(context_id="a")]
+        store.close()
+
+    def changes(labels):
+        return sum(a != b for a, b in zip(labels, labels[1:]))
+
+    assert len(stored) == 240 and changes(stored) <= est.transitions <= 2
+    assert requests == stored and [w.mental_state.label for w in wire] == stored
+    assert changes(rederived) > changes(stored), (changes(rederived), changes(stored))
+
+
+def main():
+    failed = 0
+    for t in (test_noisy_boundary_does_not_flap, test_downstream_label_is_the_stable_one,
+              test_sustained_change_switches_after_dwell, test_spike_is_filtered):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
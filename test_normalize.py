@@ -0,0 +1,86 @@
+"""
+Test context normalization: noisy title variants of one page map to one context_id.
+
+Usage:
+  python test_normalize.py
+  python -m pytest -q test_normalize.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity.normalize import canonicalize_url, normalize
+
+
+def _ids(app: str, titles: list, url: str = None) -> set:
+    return {normalize(app, t, url).context_id for t in titles}
+
+
+def test_title_noise_gives_one_id():
+    assert _ids("Google Chrome", [
+        "Inbox - me@gmail.com - Gmail",
+        "(3) Inbox - me@gmail.com - Gmail",
+        "Inbox (12) - me@gmail.com - Gmail - Google Chrome",
+    ]) == {"Google Chrome::Inbox - me@gmail.com - Gmail"}
+    assert len(_ids("Code", ["main.py - proj - Visual Studio Code", "● main.py - proj - Visual Studio Code"])) == 1
+    assert len(_ids("Google Chrome", ["⠋ Deploying - Vercel", "⠙ Deploying - Vercel", "Deploying - Vercel"])) == 1
+    assert len(_ids("Focus", ["Pomodoro 24:59", "Pomodoro 24:58"])) == 1
+    assert len(_ids("Terminal", ["elijah — -zsh — 80×24", "elijah — -zsh — 120×40"])) == 1
+    # Different pages stay different
+    assert len(_ids("Google Chrome", ["Inbox - Gmail", "Drafts - Gmail"])) == 2
+
+
+def test_pdf_page_kept_out_of_id():
+    a = normalize("Preview", "Neurable_Whitepaper.pdf — Page 3 of 42")
+    b = normalize("Preview", "Neurable_Whitepaper.pdf (page 4 of 42)")
+    assert a.context_id == b.context_id == "Preview::Neurable_Whitepaper.pdf"
+    assert (a.page_number, a.page_count, a.page_label) == (3, 42, "Page 3 of 42")
+    assert b.page_number == 4
+    c = normalize("Google Chrome", "paper.pdf", "file:///Users/x/paper.pdf#page=7")
+    assert c.context_id == "Google Chrome::/Users/x/paper.pdf" and c.page_number == 7
+
+
+def test_page_and_marker_rules_are_app_scoped():
+    # A web page's "page N of M" is part of what the user is reading, not a PDF viewer page
+    web = normalize("Google Chrome", "Search results - page 2 of 5 - Google Chrome")
+    assert web.page_number is None and web.context_id == "Google Chrome::Search results - page 2 of 5"
+    assert len(_ids("Firefox", ["Forum thread - Page 1 of 9", "Forum thread - Page 2 of 9"])) == 2
+    pdf = normalize("Google Chrome", "paper.pdf - Page 3 of 12 - Google Chrome")  # browser PDF viewer
+    assert pdf.context_id == "Google Chrome::paper.pdf" and pdf.page_number == 3
+    # Leading * / ! are unsaved markers only in editors
+    assert len(_ids("Code", ["main.py - proj - Visual Studio Code", "*main.py - proj - Visual Studio Code"])) == 1
+    assert len(_ids("Sublime Text", ["notes.md", "! notes.md"])) == 1
+    assert normalize("Google Chrome", "*NSYNC - Wikipedia").context_id == "Google Chrome::*NSYNC - Wikipedia"
+    assert normalize("Terminal", "!important todo").title == "!important todo"
+    assert len(_ids("Slack", ["! general (Channel) - Acme", "general (Channel) - Acme"])) == 1
+
+
+def test_url_canonicalization_and_cache():
+    assert canonicalize_url("https://www.ArXiv.org/abs/1234.5678/?utm_source=tw#sec2") == "arxiv.org/abs/1234.5678"
+    assert canonicalize_url("https://www.youtube.com/watch?t=30s&v=abc") == "youtube.com/watch?v=abc"
+    assert canonicalize_url("chrome://newtab/") is None
+    # The URL wins over the (churning) title
+    assert _ids("Google Chrome", ["(1) Paper", "(2) Paper - Google Chrome"], "https://arxiv.org/abs/1") == {
+        "Google Chrome::arxiv.org/abs/1"}
+    # Cached: same inputs, same object, interned id
+    a = normalize("Safari", "(5) Feed", "https://news.ycombinator.com/")
+    assert normalize("Safari", "(5) Feed", "https://news.ycombinator.com/") is a
+    assert a.context_id is sys.intern("Safari::news.ycombinator.com")
+
+
+def main():
+    failed = 0
+    for t in (test_title_noise_gives_one_id, test_pdf_page_kept_out_of_id, test_page_and_marker_rules_are_app_scoped,
+              test_url_canonicalization_and_cache):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,8 @@ except ImportError:
     print("Error: pip install requests")
     sys.exit(1)
 
+from jetson_client import get_client, split_url
+
 # Simulated context: user reading Neurable Whitepaper PDF
 PDF_PATH = "/Users/elijah/neurofocus_complete_resources/signal_processing_methods/Neurable_Whitepaper.pdf"
 PDF_NAME = "Neurable_Whitepaper.pdf"
@@ -54,12 +56,7 @@ def send_stuck_request(jetson_url: str, page: int, total_pages: int, count: int)
         "streams": {"met": {"met": [True, 0.4, True, 0.5, 0.4, True, 0.5], "time": time.time()}},
         "context": ctx,
     }
-    r = requests.post(
-        jetson_url,
-        json=body,
-        headers={"Content-Type": "application/json", "ngrok-skip-browser-warning": "1"},
-        timeout=15,
-    )
+    r = get_client(split_url(jetson_url)[0]).post_json(jetson_url, body, timeout=15)
     return r, ctx
 
 
@@ -0,0 +1,93 @@
+"""
+Test the write-behind SQLite session store against a temp database.
+
+Usage:
+  python test_session_store.py
+  python -m pytest -q test_session_store.py
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity import ActivityContext
+from data_schema import MentalStateSnapshot
+from scheduler import DeadlineScheduler
+from session_store import SessionStore
+from time_tracker import SessionTracker
+
+
+def _ctx(context_id: str) -> ActivityContext:
+    return ActivityContext(app_name="Chrome", window_title=context_id, context_type="website", context_id=context_id)
+
+
+def test_session_lifecycle_and_events():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(Path(tmp) / "sessions.db", flush_interval=0.05)
+        scheduler = DeadlineScheduler()  # not started: timers run on run_pending()
+        tracker = SessionTracker(warn_threshold_sec=0, long_threshold_sec=0, follow_up_interval_sec=0, scheduler=scheduler)
+        store.attach(tracker)
+        tracker.update(_ctx("a"))
+        scheduler.run_pending()  # thresholds of 0: warn + long events
+        tracker.update(_ctx("b"))
+        store.record_help_request("a", {"activity": {"context_id": "a"}})
+        store.record_help_response("a", feedback="try the diagram", latency_seconds=0.4)
+        assert store.flush()
+
+        rows = store.sessions()
+        assert [r["context_id"] for r in rows] == ["b", "a"]
+        a = rows[1]
+        assert a["ended_at"] == rows[0]["started_at"] and a["duration_seconds"] >= 0
+        assert rows[0]["ended_at"] is None  # still open
+        assert sorted(e["event_type"] for e in store.events(context_id="a")) == ["long", "warn"]
+        summary = store.context_summary()
+        assert summary[0]["context_id"] == "a" and summary[0]["help_requests"] == 1
+        store.close()
+
+        conn = sqlite3.connect(str(Path(tmp) / "sessions.db"))
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("SELECT feedback FROM help_responses").fetchone()[0] == "try the diagram"
+        plan = " ".join(r[-1] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE context_id = ? AND started_at >= ?", ("a", 0)))
+        assert "sessions_context" in plan
+        conn.close()
+
+
+def test_mental_state_downsampled_and_nonblocking():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(Path(tmp) / "sessions.db", max_queue=50, mental_state_interval_sec=5.0)
+        ms = MentalStateSnapshot(engagement=0.7, stress=0.3, focus=0.6)
+        kept = sum(store.record_mental_state(ms, t=i * 0.5, context_id="a") for i in range(40))  # 20 s at 2 Hz
+        assert kept == 4
+        assert store.flush()
+        rows = store.mental_state(context_id="a")
+        assert [r["t"] for r in rows] == [0.0, 5.0, 10.0, 15.0]
+        assert rows[0]["label"] == "focused"
+
+        # A full queue drops (and counts) instead of blocking the caller
+        started = time.perf_counter()
+        for i in range(5000):
+            store.record_help_request("a", None, t=i)
+        assert time.perf_counter() - started < 1.0
+        store.close()
+        st = store.stats()
+        assert st["dropped"] > 0 and st["written"] == st["queued"]
+
+
+def main():
+    failed = 0
+    for t in (test_session_lifecycle_and_events, test_mental_state_downsampled_and_nonblocking):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
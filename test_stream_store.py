@@ -0,0 +1,85 @@
+"""
+Test the NumPy stream store (no headset needed).
+
+Usage:
+  python test_stream_store.py
+  python -m pytest -q test_stream_store.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import numpy as np
+    from stream_store import StreamRing, StreamStore
+except ImportError:
+    np = None
+
+
+def test_ring_wraps_and_windows_are_views():
+    if np is None:
+        print("  (skipped: pip install numpy)")
+        return
+    ring = StreamRing("pow", ["a", "b"], capacity=8)
+    for i in range(20):  # wraps more than twice
+        ring.append(float(i), [i, -i])
+    assert len(ring) == 8
+    t, x = ring.last(3.0)
+    assert t.tolist() == [17.0, 18.0, 19.0]
+    assert x[:, ring.column("b")].tolist() == [-17.0, -18.0, -19.0]
+    assert np.shares_memory(x, ring._data)  # zero-copy
+    t, x = ring.between(13.5, 16.0)
+    assert t.tolist() == [14.0, 15.0, 16.0]
+    t, _ = ring.last(100.0)
+    assert t.tolist() == [float(i) for i in range(12, 20)]
+    assert ring.last_samples(2)[0].tolist() == [18.0, 19.0]
+
+
+def test_views_survive_capacity_minus_n_appends():
+    if np is None:
+        print("  (skipped: pip install numpy)")
+        return
+    ring = StreamRing("met", ["a"], capacity=4)
+    for i in range(4):
+        ring.append(float(i), [i])
+    whole, _ = ring.last(100.0)  # full ring: copied, the next append would overwrite it
+    part, x = ring.last_samples(2)
+    assert not np.shares_memory(whole, ring._times) and np.shares_memory(x, ring._data)
+    for i in range(4, 6):  # capacity - n = 2 appends
+        ring.append(float(i), [i])
+    assert whole.tolist() == [0.0, 1.0, 2.0, 3.0] and part.tolist() == [2.0, 3.0]
+
+
+def test_store_uses_labels_and_both_stream_formats():
+    if np is None:
+        print("  (skipped: pip install numpy)")
+        return
+    store = StreamStore(seconds=2)
+    store._on_labels(data={"streamName": "met", "labels": ["eng.isActive", "eng", "str"]})
+    store.add("met", {"met": [True, 0.5, None], "time": 1.0})
+    store.add("met", (1.5, [False, 0.25, 0.75]))  # stream_format='tuple'
+    store.add("met", {"met": [True, 0.5], "time": 2.0})  # wrong width
+    ring = store.ring("met")
+    assert ring.capacity == 4 and store.dropped == 1
+    t, x = store.last("met", 10)
+    assert t.tolist() == [1.0, 1.5]
+    assert x[0, ring.column("eng.isActive")] == 1.0 and np.isnan(x[0, ring.column("str")])
+    assert store.last("eeg", 1) is None
+
+
+def main():
+    failed = 0
+    for t in (test_ring_wraps_and_windows_are_views, test_views_survive_capacity_minus_n_appends,
+              test_store_uses_labels_and_both_stream_formats):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
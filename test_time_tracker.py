@@ -0,0 +1,160 @@
+"""
+Test the deadline-scheduled SessionTracker: thresholds fire at exact times without polling.
+
+Usage:
+  python test_time_tracker.py
+  python -m pytest -q test_time_tracker.py
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity import ActivityContext, idle
+from scheduler import DeadlineScheduler
+from time_tracker import SessionEventType, SessionTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _ctx(context_id: str) -> ActivityContext:
+    return ActivityContext(app_name="Chrome", window_title=context_id, context_type="website", context_id=context_id)
+
+
+def test_thresholds_fire_on_schedule_and_cancel_on_change():
+    clock = FakeClock()
+    sched = DeadlineScheduler(clock=clock)
+    tracker = SessionTracker(warn_threshold_sec=20, long_threshold_sec=30, follow_up_interval_sec=10, scheduler=sched)
+    fired = []
+    tracker.on_session_event(lambda e: fired.append((clock.t - 1000.0, e.event_type, e.context.context_id)))
+
+    tracker.update(_ctx("a"))  # the only update for "a": no polling in between
+    for step in range(1, 56):
+        clock.t = 1000.0 + step
+        sched.run_pending()
+    assert fired == [
+        (20, SessionEventType.WARN_THRESHOLD, "a"),
+        (30, SessionEventType.LONG_THRESHOLD, "a"),
+        (40, SessionEventType.FOLLOW_UP, "a"),
+        (50, SessionEventType.FOLLOW_UP, "a"),
+    ], fired
+
+    fired.clear()
+    tracker.update(_ctx("b"))  # at t=55: a's follow-up at 60 is cancelled, b's warn is due at 75
+    clock.t = 1070.0
+    assert sched.run_pending() == 0 and fired == []
+    assert sched.next_deadline() == 1075.0
+    assert len(sched) == 1  # only b's next threshold is armed
+
+    tracker.close()
+    clock.t = 2000.0
+    assert sched.run_pending() == 0 and fired == []
+
+
+def test_dwell_survives_alt_tab_and_pauses_when_idle():
+    clock = FakeClock()
+    sched = DeadlineScheduler(clock=clock)
+    last_input = [clock.t]
+    tracker = SessionTracker(warn_threshold_sec=150, long_threshold_sec=300, follow_up_interval_sec=0, scheduler=sched,
+                             idle_source=lambda: clock.t - last_input[0], idle_threshold_sec=60,
+                             half_life_sec=120, max_contexts=2)
+    fired = []
+    tracker.on_session_event(lambda e: fired.append((clock.t - 1000.0, e.event_type, e.duration_seconds)))
+
+    def advance(to: float, typing: bool = True):
+        while clock.t < 1000.0 + to:
+            clock.t += 1
+            if typing:
+                last_input[0] = clock.t
+            sched.run_pending()
+
+    tracker.update(_ctx("paper"))
+    advance(90)
+    tracker.update(_ctx("terminal"))  # 10 s alt-tab: 90 s decays to 90 * 0.5 ** (10 / 120), not 0
+    advance(100)
+    tracker.update(_ctx("paper"))
+    kept = 90 * 0.5 ** (10 / 120)
+    assert abs(tracker.dwell_seconds() - kept) < 1e-9 and kept > 84
+    assert tracker.dwell_seconds("terminal") == 10
+
+    # Last input at t=105. The warn deadline (t~165) finds 60 s of idle: the clock stopped at 105
+    advance(105)
+    advance(400, typing=False)
+    assert fired == [] and tracker.idle
+    assert abs(tracker.dwell_seconds() - (kept + 5)) < 1e-9
+
+    # Input again at t=401: the clock resumes and warn fires once dwell reaches 150
+    advance(401)
+    tracker.update(_ctx("paper"))
+    advance(500)
+    assert [e for _, e, _ in fired] == [SessionEventType.WARN_THRESHOLD], fired
+    assert abs(fired[0][0] - (401 + 150 - (kept + 5))) <= 1 and fired[0][2] >= 150
+
+    # LRU: with max_contexts=2, the least recently visited context is forgotten
+    tracker.update(_ctx("slides"))
+    assert tracker.dwell_seconds("terminal") is None and tracker.dwell_seconds("paper") is not None
+
+
+def test_macos_ioreg_idle_is_read_once_per_interval():
+    clock = FakeClock()
+    forks = []
+
+    def ioreg():
+        forks.append(clock.t)
+        return 3.0 + len(forks)
+
+    source = idle.CachedIdleSource(ioreg, max_age=5.0, clock=clock)
+    tracker = SessionTracker(scheduler=DeadlineScheduler(clock=clock), idle_source=source, idle_threshold_sec=60)
+    for _ in range(12):  # one sample per second, plus a dwell read each time
+        tracker.update(_ctx("paper"))
+        tracker.dwell_seconds("paper")
+        clock.t += 1.0
+    assert forks == [1000.0, 1005.0, 1010.0] and source() == 6.0
+
+
+def test_scheduler_thread_fires_without_updates():
+    sched = DeadlineScheduler().start()
+    tracker = SessionTracker(warn_threshold_sec=0.05, long_threshold_sec=0.1, follow_up_interval_sec=0, scheduler=sched)
+    done = threading.Event()
+    fired = []
+
+    def on_event(e):
+        fired.append((e.event_type, e.duration_seconds))
+        if e.event_type == SessionEventType.LONG_THRESHOLD:
+            done.set()
+
+    tracker.on_session_event(on_event)
+    tracker.update(_ctx("a"))
+    assert done.wait(2.0)
+    assert [t for t, _ in fired] == [SessionEventType.WARN_THRESHOLD, SessionEventType.LONG_THRESHOLD]
+    assert fired[0][1] >= 0.05 and fired[1][1] >= 0.1
+    sched.stop()
+
+
+def main():
+    failed = 0
+    for t in (
+        test_thresholds_fire_on_schedule_and_cancel_on_change,
+        test_dwell_survives_alt_tab_and_pauses_when_idle,
+        test_macos_ioreg_idle_is_read_once_per_interval,
+        test_scheduler_thread_fires_without_updates,
+    ):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
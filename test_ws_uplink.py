@@ -0,0 +1,171 @@
+"""
+Test WebSocketUplink against a local WebSocket server stand-in that we kill and restart.
+Requires: pip install websockets (server side only).
+
+Usage:
+  python test_ws_uplink.py
+  python -m pytest -q test_ws_uplink.py
+"""
+import json
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from data_schema import ActivitySnapshot, CollectorPayload, EEGMetricsSnapshot, available_codecs, hello_message
+from ws_uplink import WebSocketUplink
+
+try:
+    from websockets.sync.server import serve
+except ImportError:
+    serve = None
+
+
+class StandInServer:
+    """
+    Records every payload it receives (as dicts). start()/kill() can be repeated on the same port.
+    With hello_codecs it advertises them on connect and decodes binary frames with the acked codec.
+    """
+
+    def __init__(self, port: int, hello_codecs: list = None):
+        self.port = port
+        self.hello_codecs = hello_codecs
+        self.received: list[dict] = []
+        self.acks: list[str] = []
+        self.binary_frames = 0
+        self._server = None
+
+    def start(self):
+        def handler(conn):
+            codec = "json"
+            if self.hello_codecs is not None:
+                conn.send(json.dumps(hello_message(self.hello_codecs)))
+            for msg in conn:
+                if isinstance(msg, bytes):
+                    self.binary_frames += 1
+                    self.received.append(CollectorPayload.decode(msg, codec).to_dict())
+                    continue
+                d = json.loads(msg)
+                if d.get("type") == "hello_ack":
+                    codec = d["codec"]
+                    self.acks.append(codec)
+                else:
+                    self.received.append(d)
+
+        self._server = serve(handler, "127.0.0.1", self.port)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def kill(self):
+        self._server.shutdown()
+        self._server = None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait(cond, timeout=5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return cond()
+
+
+def _activity(n: int) -> CollectorPayload:
+    return CollectorPayload(type="activity", timestamp=n, activity=ActivitySnapshot(app_name="Chrome", context_id=f"c{n}"))
+
+
+def _eeg(n: int) -> CollectorPayload:
+    return CollectorPayload(type="eeg", timestamp=n, eeg=EEGMetricsSnapshot(metrics={"met": [n]}))
+
+
+def test_buffer_and_replay_across_restart():
+    if serve is None:
+        print("  (skipped: pip install websockets)")
+        return
+    port = _free_port()
+    server = StandInServer(port)
+    server.start()
+    up = WebSocketUplink(f"ws://127.0.0.1:{port}", backoff_initial_sec=0.05, backoff_max_sec=0.2, ping_interval=0)
+    up.start()
+    try:
+        assert _wait(lambda: up.connected)
+        up.send(_eeg(1))
+        assert _wait(lambda: len(server.received) == 1)
+
+        server.kill()
+        assert _wait(lambda: not up.connected)
+        for n in range(2, 7):
+            up.send(_activity(n))  # latest-only: only activity 6 survives
+        up.send(_eeg(7))
+        up.send(_eeg(8))
+        st = up.stats()
+        assert st["buffered"] == 3, st
+        assert st["dropped"] == 4, st
+
+        server.start()
+        assert _wait(lambda: len(server.received) == 4), server.received
+        assert [m["timestamp"] for m in server.received] == [1, 6, 7, 8]
+        st = up.stats()
+        assert st["buffered"] == 0 and st["sent"] == 4 and st["reconnects"] >= 1, st
+    finally:
+        up.stop()
+        server.kill()
+
+
+def test_ring_drops_oldest_when_full():
+    up = WebSocketUplink("ws://127.0.0.1:9", max_buffer=3)  # never started: everything buffers
+    for n in range(5):
+        up.send(_eeg(n))
+    st = up.stats()
+    assert st["buffered"] == 3 and st["dropped"] == 2, st
+    assert [m.timestamp for _, m in up._buffer] == [2, 3, 4]
+
+
+def test_codec_negotiation():
+    if serve is None:
+        print("  (skipped: pip install websockets)")
+        return
+    binary = [c for c in available_codecs() if c != "json"]
+    if not binary:
+        print("  (skipped: pip install msgpack or cbor2)")
+        return
+    port = _free_port()
+    server = StandInServer(port, hello_codecs=[binary[-1], "json"])
+    server.start()
+    up = WebSocketUplink(f"ws://127.0.0.1:{port}", backoff_initial_sec=0.05, ping_interval=0)
+    up.start()
+    try:
+        assert _wait(lambda: server.acks == [binary[-1]]), server.acks
+        met = [True, 0.65, None, 0.42]
+        up.send(CollectorPayload(type="eeg", timestamp=1, eeg=EEGMetricsSnapshot(metrics={"met": met})))
+        assert _wait(lambda: len(server.received) == 1)
+        assert server.binary_frames == 1 and up.stats()["codec"] == binary[-1]
+        got = server.received[0]["eeg"]["metrics"]["met"]
+        assert got[0] is True and got[2] is None and abs(got[1] - 0.65) < 1e-6, got
+    finally:
+        up.stop()
+        server.kill()
+
+
+def main():
+    failed = 0
+    for t in (test_buffer_and_replay_across_restart, test_ring_drops_oldest_when_full, test_codec_negotiation):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Test the Linux active-window backends without an X server: the python-xlib watcher against a fake
+display (PropertyNotify on _NET_ACTIVE_WINDOW and on the title, stop() wakes and joins the event
+thread), the xdotool fallback when python-xlib or $DISPLAY is missing, and ACTIVITY_X11_BACKEND=xlib.
+
+Usage:
+  python test_x11_watcher.py
+  python -m pytest -q test_x11_watcher.py
+"""
+import contextlib
+import os
+import queue
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from activity import linux
+from activity.linux import X11WindowWatcher, get_active_window_x11
+
+if linux.xdisplay is not None:
+    from Xlib import X, Xatom
+
+
+class FakeWindow:
+    def __init__(self, display, wid, title="", wm_class=None):
+        self.display = display
+        self.id = wid
+        self.title = title
+        self.wm_class = wm_class
+        self.event_mask = 0
+        self.props = {}
+
+    def change_attributes(self, event_mask=None, onerror=None):
+        self.event_mask = event_mask
+
+    def create_window(self, *args, event_mask=0, **kwargs):
+        win = self.display.add_window("")
+        win.event_mask = event_mask
+        return win
+
+    def get_full_property(self, atom, prop_type):
+        if atom == self.display.atoms["_NET_WM_NAME"]:
+            return SimpleNamespace(value=self.title.encode("utf-8"))
+        value = self.props.get(atom)
+        return None if value is None else SimpleNamespace(value=value)
+
+    def get_wm_name(self):
+        return self.title
+
+    def get_wm_class(self):
+        return self.wm_class
+
+    def change_property(self, atom, prop_type, fmt, data, onerror=None):
+        self.props[atom] = data
+        self.display.notify(self, atom)
+
+    def set_title(self, title):
+        self.title = title
+        self.display.notify(self, self.display.atoms["_NET_WM_NAME"])
+
+
+class FakeDisplay:
+    """Just enough of Xlib.display.Display: atoms, windows, a blocking event queue."""
+
+    def __init__(self):
+        self.atoms = {}
+        self.windows = {}
+        self.events = queue.Queue()
+        self.closed = False
+        self.root = FakeWindow(self, 1)
+        self.windows[1] = self.root
+
+    def screen(self):
+        return SimpleNamespace(root=self.root)
+
+    def intern_atom(self, name):
+        return self.atoms.setdefault(name, 100 + len(self.atoms))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def add_window(self, title, wm_class=("app", "App")):
+        win = FakeWindow(self, 10 + len(self.windows), title, wm_class)
+        self.windows[win.id] = win
+        return win
+
+    def create_resource_object(self, kind, wid):
+        return self.windows[wid]
+
+    def activate(self, win):
+        self.root.change_property(self.intern_atom("_NET_ACTIVE_WINDOW"), Xatom.WINDOW, 32, [win.id])
+
+    def notify(self, win, atom):
+        if win.event_mask & X.PropertyChangeMask:
+            self.events.put(SimpleNamespace(type=X.PropertyNotify, window=win, atom=atom))
+
+    def next_event(self):
+        return self.events.get()
+
+
+def _wait_until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@contextlib.contextmanager
+def _patched(obj, **attrs):
+    saved = {name: getattr(obj, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(obj, name, value)
+
+
+@contextlib.contextmanager
+def _display_env(value):
+    saved = os.environ.get("DISPLAY")
+    if value is None:
+        os.environ.pop("DISPLAY", None)
+    else:
+        os.environ["DISPLAY"] = value
+    try:
+        yield
+    finally:
+        if saved is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = saved
+
+
+def _fake_xdotool(cmd, **kwargs):
+    out = {"getactivewindow": "4242\n", "getwindowname": "notes.txt - Editor\n"}.get(cmd[1], "")
+    if cmd[0] == "xprop":
+        out = 'WM_CLASS(STRING) = "editor", "Editor"\n'
+    return subprocess.CompletedProcess(cmd, 0, stdout=out, stderr="")
+
+
+def _watcher_with(fake):
+    with _patched(linux.xdisplay, Display=lambda name=None: fake):
+        return X11WindowWatcher()
+
+
+def test_property_notify_updates_cache_and_stop_joins():
+    if linux.xdisplay is None:
+        print("  (skipped: pip install python-xlib)")
+        return
+    fake = FakeDisplay()
+    a = fake.add_window("paper.pdf - Viewer", ("evince", "Evince"))
+    b = fake.add_window("main.py - Code", ("code", "Code"))
+    fake.activate(a)
+    w = _watcher_with(fake)
+    w.start()
+    assert w.get_active_window().window_title == "paper.pdf - Viewer" and a.event_mask == X.PropertyChangeMask
+
+    fake.activate(b)  # PropertyNotify(_NET_ACTIVE_WINDOW) on root
+    _wait_until(lambda: w.get_active_window().app_name == "Code")
+    assert a.event_mask == X.NoEventMask and b.event_mask == X.PropertyChangeMask  # title watch moved
+
+    b.set_title("util.py - Code")  # PropertyNotify(_NET_WM_NAME) on the active window
+    _wait_until(lambda: w.get_active_window().window_title == "util.py - Code")
+    a.set_title("ignored")  # no longer watched
+    assert w.get_active_window().window_id == str(b.id)
+
+    thread = w._thread
+    w.stop()
+    assert not thread.is_alive() and fake.closed and not w.alive and w.get_active_window() is None
+
+
+def test_xdotool_fallback_without_xlib_or_display():
+    with _patched(linux, _watcher=None, _watcher_failed=False, X11_BACKEND="auto"), \
+            _patched(subprocess, run=_fake_xdotool):
+        with _patched(linux, xdisplay=None), _display_env(":0"):
+            assert linux._get_watcher() is None
+            info = get_active_window_x11()
+            assert (info.app_name, info.window_title, info.window_id) == ("Editor", "notes.txt - Editor", "4242")
+        with _display_env(None):
+            assert linux._get_watcher() is None
+            assert get_active_window_x11().app_name == "Editor"
+        with _display_env(":0"), _patched(linux, X11_BACKEND="xdotool"):
+            assert linux._get_watcher() is None
+
+
+def test_xlib_backend_fails_loudly():
+    with _patched(linux, _watcher=None, _watcher_failed=False, X11_BACKEND="xlib"):
+        with _patched(linux, xdisplay=None), _display_env(":0"):
+            try:
+                linux._get_watcher()
+                assert False, "expected RuntimeError"
+            except RuntimeError as e:
+                assert "python-xlib" in str(e), e
+        if linux.xdisplay is None:
+            return
+        with _display_env(None):
+            try:
+                linux._get_watcher()
+                assert False, "expected RuntimeError"
+            except RuntimeError as e:
+                assert "$DISPLAY" in str(e), e
+        fake = FakeDisplay()
+        fake.activate(fake.add_window("t"))
+        with _display_env(":0"), _patched(linux.xdisplay, Display=lambda name=None: fake):
+            w = linux._get_watcher()
+            assert w.get_active_window().window_title == "t"
+            w.stop()
+
+
+def main():
+    failed = 0
+    for t in (test_property_notify_updates_cache_and_stop_joins, test_xdotool_fallback_without_xlib_or_display,
+              test_xlib_backend_fails_loudly):
+        try:
+            t()
+            print(f"  [OK]   {t.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  [FAIL] {t.__name__}: {e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
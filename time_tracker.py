@@ -1,11 +1,21 @@
 """Track time spent in each activity context. Fires warn/long/follow-up events."""
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Callable, Optional
 
 # ActivityContext is from activity module
 from activity import ActivityContext
+from scheduler import DeadlineScheduler, ScheduledCall, default_scheduler
+
+IDLE_THRESHOLD_SEC = 60.0  # no keyboard/mouse input for this long pauses the dwell clock
+# Time away from a context halves its accumulated dwell every DWELL_HALF_LIFE_SEC, so a quick
+# alt-tab barely dents it while a long break effectively starts over
+DWELL_HALF_LIFE_SEC = 120.0
+MAX_CONTEXTS = 64  # recent contexts whose dwell is remembered (least recently visited dropped first)
+_FOLLOW_UP_ORDER = 2  # tie-break order of threshold kinds at equal dwell: warn 0, long 1, follow-up 2
 
 
 class SessionEventType(Enum):
@@ -29,13 +39,28 @@ class TrackedSession:
 
     @property
     def duration_seconds(self) -> float:
+        """Length of this visit (wall clock). For accumulated, idle-excluded time see SessionTracker.dwell_seconds()."""
         return time.time() - self.started_at
 
 
+@dataclass(slots=True)
+class _Dwell:
+    """Per-context accumulated active time."""
+    seconds: float = 0.0  # closed segments only; the running one is added by SessionTracker
+    fired: tuple = (-1.0, 0)  # (dwell level, order) of the last threshold event; the next one sorts after it
+    left_at: Optional[float] = None  # clock() when the user last left this context
+
+
 class SessionTracker:
     """
     Tracks how long the user stays in each context.
     Fires events at warn_sec, long_sec, and optionally follow-up intervals.
+
+    Time counts as dwell per context_id: leaving a context pauses its clock and returning
+    resumes it, decayed by DWELL_HALF_LIFE_SEC per unit of time away. With an idle_source
+    (activity.idle), dwell also pauses once there has been no input for idle_threshold_sec
+    (backdated to the last input). The next threshold is a deadline timer, so events fire on time
+    however often update() is called; they are emitted from the scheduler thread.
     """
 
     def __init__(
@@ -43,53 +68,177 @@ class SessionTracker:
         warn_threshold_sec: float = 20,
         long_threshold_sec: float = 30,
         follow_up_interval_sec: float = 30,
+        scheduler: Optional[DeadlineScheduler] = None,
+        idle_source: Optional[Callable[[], Optional[float]]] = None,
+        idle_threshold_sec: float = IDLE_THRESHOLD_SEC,
+        half_life_sec: float = DWELL_HALF_LIFE_SEC,
+        max_contexts: int = MAX_CONTEXTS,
     ):
         self.warn_threshold_sec = warn_threshold_sec
         self.long_threshold_sec = long_threshold_sec
         self.follow_up_interval_sec = follow_up_interval_sec
+        self.idle_source = idle_source
+        self.idle_threshold_sec = idle_threshold_sec
+        self.half_life_sec = half_life_sec
+        self.max_contexts = max(1, max_contexts)
+        self.idle = False
+        self._scheduler = scheduler if scheduler is not None else default_scheduler()
         self._callbacks: list[Callable[[SessionEvent], None]] = []
+        self._change_callbacks: list[Callable[[Optional[TrackedSession], TrackedSession], None]] = []
         self._current: Optional[TrackedSession] = None
-        self._last_long_at: float = 0
-        self._last_follow_up_at: float = 0
+        self._dwell: "OrderedDict[str, _Dwell]" = OrderedDict()
+        self._entry: Optional[_Dwell] = None  # dwell of the current context
+        self._running_since: Optional[float] = None  # clock() of the current segment; None while paused
+        self._timer: Optional[ScheduledCall] = None
+        self._lock = threading.Lock()
 
     def on_session_event(self, callback: Callable[[SessionEvent], None]):
         self._callbacks.append(callback)
 
+    def on_session_change(self, callback: Callable[[Optional[TrackedSession], TrackedSession], None]):
+        """callback(previous, current) when the context changes; previous is None for the first session."""
+        self._change_callbacks.append(callback)
+
     def update(self, ctx: Optional[ActivityContext]) -> None:
-        """Call periodically with current context. Fires events when thresholds hit."""
+        """Call with the current context (any rate). Switches dwell clocks and applies idle state."""
         if ctx is None:
             return
+        idle_for = self._idle_for()
+
+        with self._lock:
+            now = self._scheduler.clock()
+            if self._current is not None and self._current.context_id == ctx.context_id:
+                self._apply_idle(idle_for, now)
+                return
+            previous = self._current
+            self._leave(now)
+            self._entry = self._enter(ctx.context_id, now)
+            self._current = TrackedSession(context_id=ctx.context_id, context=ctx, started_at=time.time())
+            self._running_since = now
+            self.idle = False
+            self._apply_idle(idle_for, now)
+            self._arm(now)
+            current = self._current
+
+        for cb in self._change_callbacks:
+            try:
+                cb(previous, current)
+            except Exception:
+                pass
 
-        now = time.time()
-        context_id = ctx.context_id
-
-        if self._current is None or self._current.context_id != context_id:
-            self._current = TrackedSession(context_id=context_id, context=ctx, started_at=now)
-            self._last_long_at = 0
-            self._last_follow_up_at = 0
+    def dwell_seconds(self, context_id: Optional[str] = None) -> Optional[float]:
+        """Accumulated active seconds in context_id (default: current context); None if unknown."""
+        with self._lock:
+            if context_id is None or (self._current is not None and context_id == self._current.context_id):
+                if self._entry is None:
+                    return None
+                return self._dwell_now(self._scheduler.clock())
+            entry = self._dwell.get(context_id)
+            return entry.seconds if entry is not None else None
+
+    def _idle_for(self) -> Optional[float]:
+        if self.idle_source is None:
+            return None
+        try:
+            return self.idle_source()
+        except Exception:
+            return None
+
+    def _dwell_now(self, now: float) -> float:
+        running = now - self._running_since if self._running_since is not None else 0.0
+        return self._entry.seconds + running
+
+    def _leave(self, now: float) -> None:
+        if self._entry is None:
             return
-
-        dur = self._current.duration_seconds
-
-        # Warn threshold (fire once per session)
-        if dur >= self.warn_threshold_sec and dur < self.warn_threshold_sec + 0.5:
-            self._emit(SessionEvent(ctx, SessionEventType.WARN_THRESHOLD, dur))
-
-        # Long threshold (fire once, then start follow-ups)
-        if dur >= self.long_threshold_sec:
-            if self._last_long_at == 0:
-                self._last_long_at = now
-                self._emit(SessionEvent(ctx, SessionEventType.LONG_THRESHOLD, dur))
-
-            # Follow-ups every follow_up_interval_sec after long threshold
-            if self.follow_up_interval_sec > 0:
-                if self._last_follow_up_at == 0:
-                    self._last_follow_up_at = now  # Start count from first long
-                else:
-                    elapsed = now - self._last_follow_up_at
-                    if elapsed >= self.follow_up_interval_sec:
-                        self._last_follow_up_at = now
-                        self._emit(SessionEvent(ctx, SessionEventType.FOLLOW_UP, dur))
+        if self._running_since is not None:
+            self._entry.seconds += now - self._running_since
+            self._running_since = None
+        self._entry.left_at = now
+        self._cancel_timer()
+
+    def _enter(self, context_id: str, now: float) -> _Dwell:
+        entry = self._dwell.get(context_id)
+        if entry is None:
+            entry = self._dwell[context_id] = _Dwell()
+            if len(self._dwell) > self.max_contexts:
+                self._dwell.popitem(last=False)
+            return entry
+        self._dwell.move_to_end(context_id)
+        if entry.left_at is not None and self.half_life_sec > 0:
+            entry.seconds *= 0.5 ** ((now - entry.left_at) / self.half_life_sec)
+            # Thresholds the decayed dwell fell back below can fire again
+            entry.fired = min(entry.fired, (entry.seconds, _FOLLOW_UP_ORDER))
+        return entry
+
+    def _apply_idle(self, idle_for: Optional[float], now: float) -> None:
+        idle = idle_for is not None and idle_for >= self.idle_threshold_sec
+        if idle == self.idle:
+            return
+        self.idle = idle
+        if idle:
+            if self._running_since is not None:
+                # Dwell stopped at the last input, not when we noticed
+                stopped = max(self._running_since, now - idle_for)
+                self._entry.seconds += stopped - self._running_since
+                self._running_since = None
+            self._cancel_timer()
+        elif self._entry is not None and self._running_since is None:
+            self._running_since = now
+            self._arm(now)
+
+    def _next_target(self, fired: tuple) -> tuple[Optional[tuple], Optional[SessionEventType]]:
+        """
+        Next threshold after `fired` as ((dwell level, order), type): warn, long, then follow-ups
+        every follow_up_interval_sec once long has fired. order breaks ties between equal levels.
+        """
+        warn = (self.warn_threshold_sec, 0)
+        long = (self.long_threshold_sec, 1)
+        targets = []
+        if warn > fired:
+            targets.append((warn, SessionEventType.WARN_THRESHOLD))
+        if long > fired:
+            targets.append((long, SessionEventType.LONG_THRESHOLD))
+        elif self.follow_up_interval_sec > 0:
+            k = int((fired[0] - self.long_threshold_sec) // self.follow_up_interval_sec) + 1
+            level = self.long_threshold_sec + k * self.follow_up_interval_sec
+            targets.append(((level, _FOLLOW_UP_ORDER), SessionEventType.FOLLOW_UP))
+        return min(targets, key=lambda t: t[0]) if targets else (None, None)
+
+    def _arm(self, now: float) -> None:
+        self._cancel_timer()
+        if self._running_since is None:
+            return
+        target, event_type = self._next_target(self._entry.fired)
+        if target is None:
+            return
+        delay = max(0.0, target[0] - self._dwell_now(now))
+        self._timer = self._scheduler.call_at(now + delay, self._fire, self._entry, target, event_type)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _fire(self, entry: _Dwell, target: tuple, event_type: SessionEventType) -> None:
+        idle_for = self._idle_for()
+        with self._lock:
+            if entry is not self._entry or self._running_since is None or target <= entry.fired:
+                return  # context changed / paused after this timer was popped
+            now = self._scheduler.clock()
+            self._apply_idle(idle_for, now)
+            if self.idle:
+                return  # user went idle before reaching the threshold: wait for input
+            entry.fired = target
+            event = SessionEvent(self._current.context, event_type, self._dwell_now(now))
+            self._arm(now)
+        self._emit(event)
+
+    def close(self) -> None:
+        """Cancel the pending timer (no further events)."""
+        with self._lock:
+            self._cancel_timer()
+            self._running_since = None
 
     def _emit(self, event: SessionEvent) -> None:
         for cb in self._callbacks:
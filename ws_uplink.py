@@ -0,0 +1,253 @@
+"""
+Reconnecting, buffered WebSocket uplink to the Jetson processor.
+
+Replaces the one-shot `ws.run_forever()` + "drop if not connected" pattern:
+- Reconnects with exponential backoff (jittered, capped)
+- Buffers unsent CollectorPayloads in a bounded ring; when full the oldest is dropped
+- latest_only_types (default: activity) keep only the newest buffered message of that type
+- Replays the buffer in order on reconnect, before any new message
+- Exposes sent / dropped / buffered / reconnect counters via stats()
+- Codec negotiation: JSON text until the Jetson sends {"type": "hello", "codecs": [...]}, then
+  answers hello_ack and sends binary frames in the best shared codec (see data_schema codecs)
+"""
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from data_schema import available_codecs, encode as encode_payload, hello_ack_message, negotiate_codec
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+
+def _message_type(message: Any) -> str:
+    if hasattr(message, "type"):
+        return message.type
+    return message.get("type", "") if isinstance(message, dict) else ""
+
+
+class WebSocketUplink:
+    """
+    send() accepts a CollectorPayload (anything with to_dict()) or a plain dict.
+    Callbacks: on_message(text), on_open(), on_close() – all run on the uplink thread.
+    codecs: codecs we may switch to when the Jetson advertises them (default: all installed).
+    A custom encode(message) disables negotiation.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        on_message: Optional[Callable[[str], None]] = None,
+        on_open: Optional[Callable[[], None]] = None,
+        on_close: Optional[Callable[[], None]] = None,
+        max_buffer: int = 256,
+        latest_only_types: tuple = ("activity",),
+        backoff_initial_sec: float = 0.5,
+        backoff_max_sec: float = 30.0,
+        encode: Optional[Callable[[Any], Any]] = None,
+        ping_interval: float = 20,
+        codecs: Optional[list] = None,
+    ):
+        if websocket is None:
+            raise RuntimeError("pip install websocket-client")
+        self.url = url
+        self.on_message = on_message
+        self.on_open = on_open
+        self.on_close = on_close
+        self.max_buffer = max_buffer
+        self.latest_only_types = frozenset(latest_only_types)
+        self.backoff_initial_sec = backoff_initial_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.encode = encode
+        self.ping_interval = ping_interval
+        self.codecs = list(codecs) if codecs is not None else available_codecs()
+        self.codec = "json"  # per connection; set by the hello handshake
+
+        self._buffer: deque = deque()  # (type, message) in send order; encoded when sent
+        self._latest: dict[str, tuple] = {}  # type -> its buffered entry, for latest_only_types
+        self._lock = threading.Lock()
+        self._ws = None
+        self._connected = False
+        self._session_open = False  # between on_open and on_close, even if a send failed
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="WebSocketUplink", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def send(self, message: Any) -> bool:
+        """Send now if connected, else buffer. True if sent immediately."""
+        mtype = _message_type(message)
+        with self._lock:
+            if self._connected and not self._buffer:
+                if self._send_now(message):
+                    return True
+            self._enqueue(mtype, message)
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connected": self._connected,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "buffered": len(self._buffer),
+                "reconnects": self.reconnects,
+                "codec": self.codec,
+            }
+
+    # --- internals (call with self._lock held) ---
+
+    def _encode(self, message: Any):
+        if self.encode is not None:
+            return self.encode(message)
+        return encode_payload(message, self.codec)
+
+    def _send_now(self, message) -> bool:
+        data = self._encode(message)
+        try:
+            if isinstance(data, bytes):
+                self._ws.send(data, opcode=websocket.ABNF.OPCODE_BINARY)
+            else:
+                self._ws.send(data)
+        except Exception:
+            self._connected = False
+            return False
+        self.sent += 1
+        return True
+
+    def _enqueue(self, mtype: str, message) -> None:
+        entry = (mtype, message)
+        if mtype in self.latest_only_types:
+            old = self._latest.get(mtype)
+            if old is not None:
+                try:
+                    self._buffer.remove(old)
+                    self.dropped += 1
+                except ValueError:
+                    pass
+            self._latest[mtype] = entry
+        if len(self._buffer) >= self.max_buffer:
+            oldest = self._buffer.popleft()
+            if self._latest.get(oldest[0]) is oldest:
+                del self._latest[oldest[0]]
+            self.dropped += 1
+        self._buffer.append(entry)
+
+    def _flush(self) -> None:
+        while self._buffer:
+            entry = self._buffer[0]
+            try:
+                if not self._send_now(entry[1]):
+                    return
+            except Exception:
+                self.dropped += 1  # unencodable: don't let it block the rest
+            self._buffer.popleft()
+            if self._latest.get(entry[0]) is entry:
+                del self._latest[entry[0]]
+
+    # --- connection loop ---
+
+    def _run(self) -> None:
+        backoff = self.backoff_initial_sec
+        first = True
+        while self._running:
+            if not first:
+                self.reconnects += 1
+            first = False
+            opened = threading.Event()
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=lambda ws: self._handle_open(opened),
+                on_message=lambda ws, msg: self._handle_message(msg),
+                on_close=lambda ws, *a: self._handle_close(),
+                on_error=lambda ws, err: None,
+            )
+            try:
+                self._ws.run_forever(ping_interval=self.ping_interval, ping_timeout=(self.ping_interval / 2) or None)
+            except Exception:
+                pass
+            self._handle_close()
+            if not self._running:
+                break
+            if opened.is_set():
+                backoff = self.backoff_initial_sec
+            time.sleep(random.uniform(backoff / 2, backoff))
+            backoff = min(self.backoff_max_sec, backoff * 2)
+
+    def _handle_open(self, opened: threading.Event) -> None:
+        opened.set()
+        with self._lock:
+            self._connected = True
+            self._session_open = True
+            self.codec = "json"  # until this server says hello
+            self._flush()
+        if self.on_open:
+            try:
+                self.on_open()
+            except Exception:
+                pass
+
+    def _handle_message(self, message) -> None:
+        if isinstance(message, str) and '"hello"' in message and self._handle_hello(message):
+            return
+        if self.on_message:
+            try:
+                self.on_message(message)
+            except Exception:
+                pass
+
+    def _handle_hello(self, message: str) -> bool:
+        try:
+            d = json.loads(message)
+        except ValueError:
+            return False
+        if not isinstance(d, dict) or d.get("type") != "hello":
+            return False
+        if self.encode is not None:
+            codec = "json"
+        else:
+            codec = negotiate_codec(d.get("codecs") or [], self.codecs)
+        with self._lock:
+            try:
+                self._ws.send(json.dumps(hello_ack_message(codec)))
+            except Exception:
+                return True
+            self.codec = codec
+        return True
+
+    def _handle_close(self) -> None:
+        with self._lock:
+            was_open = self._session_open
+            self._connected = False
+            self._session_open = False
+        if was_open and self.on_close:
+            try:
+                self.on_close()
+            except Exception:
+                pass